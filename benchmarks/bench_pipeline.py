@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+End-to-end benchmark of the three download scripts against fake_origin.py.
+
+Each script runs as a real subprocess (fresh output folder, sequential and
+then each --parallel worker count), exactly as from the command line:
+
+  download_notebookvip_assets.py   runtime with --chunks JS + CSS chunks, /jsb-wap/
+  download_fjii_assets.py          same runtime under /wap/, publicPath detected
+  download_images_keep_path.py     2 x --chunks image URLs from a --urls-file
+
+and a library row times http_get_bytes on one session for comparison.
+
+Reported per run: assets/s, MB/s, p50/p99 per-asset latency and the peak RSS
+of the process (os.wait4). Latency is taken from the origin's arrival time
+of the (last) request for a URL to the time the client's journal recorded
+it done, so it includes retries' final attempt, the disk write and fsync,
+but not time spent queued for a worker.
+
+Run from the repo root:
+  python3 benchmarks/bench_pipeline.py
+  python3 benchmarks/bench_pipeline.py --chunks 500 --latency 0.03 --error-rate 0.02 --parallel 4 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_origin import FakeOrigin  # noqa: E402
+
+from webmirror import http_get_bytes, new_session  # noqa: E402
+from webmirror.journal import JOURNAL_NAME  # noqa: E402
+
+
+@dataclass
+class Row:
+    name: str
+    mode: str
+    ok: int
+    fail: int
+    seconds: float
+    mbytes: float
+    latencies: list[float]
+    rss_mb: float | None
+
+    def cells(self) -> str:
+        lat = sorted(self.latencies)
+        p50 = pct(lat, 0.50) * 1000
+        p99 = pct(lat, 0.99) * 1000
+        rss = f"{self.rss_mb:.0f}" if self.rss_mb is not None else "-"
+        return (
+            f"{self.name:<14} {self.mode:<6} {self.ok:>6} {self.fail:>5} {self.seconds:>7.2f} "
+            f"{self.ok / self.seconds:>9.1f} {self.mbytes / self.seconds:>6.1f} "
+            f"{p50:>7.1f} {p99:>7.1f} {rss:>7}"
+        )
+
+
+HEADER = (
+    f"{'script':<14} {'mode':<6} {'ok':>6} {'fail':>5} {'secs':>7} "
+    f"{'assets/s':>9} {'MB/s':>6} {'p50 ms':>7} {'p99 ms':>7} {'RSS MB':>7}"
+)
+
+
+def pct(xs: list[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+def run_script(cmd: list[str], cwd: str) -> tuple[int, float, float]:
+    """(exit code, seconds, peak RSS in MB) of one subprocess."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - t0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+    return proc.returncode, elapsed, rss
+
+
+def journal_stats(out: str, origin: FakeOrigin) -> tuple[int, int, float, list[float]]:
+    """(done, failed, MB, latencies) from every journal under out."""
+    done = failed = 0
+    size = 0
+    lat: list[float] = []
+    for dirpath, _, files in os.walk(out):
+        if JOURNAL_NAME not in files:
+            continue
+        with open(os.path.join(dirpath, JOURNAL_NAME), "r", encoding="utf-8") as f:
+            for line in f:
+                rec = json.loads(line)
+                if rec["state"] != "done":
+                    failed += 1
+                    continue
+                done += 1
+                size += rec.get("size", 0)
+                arrived = origin.arrivals.get(urlparse(rec["url"]).path)
+                if arrived is not None and rec.get("status") == "OK":
+                    lat.append(max(0.0, rec["t"] - arrived))
+    return done, failed, size / 1e6, lat
+
+
+def bench_script(name: str, mode: str, cmd: list[str], origin: FakeOrigin) -> Row:
+    origin.reset_stats()
+    with tempfile.TemporaryDirectory() as tmp:
+        code, elapsed, rss = run_script(cmd + ["--out", os.path.join(tmp, "out")], tmp)
+        ok, fail, mb, lat = journal_stats(os.path.join(tmp, "out"), origin)
+    if code not in (0, 2):
+        print(f"[!] {name} {mode}: exit code {code}")
+    return Row(name, mode, ok, fail, elapsed, mb, lat, rss)
+
+
+def bench_http_get_bytes(urls: list[str], origin: FakeOrigin) -> Row:
+    origin.reset_stats()
+    session = new_session("bench")
+    lat = []
+    size = 0
+    fail = 0
+    t0 = time.perf_counter()
+    for url in urls:
+        t = time.perf_counter()
+        try:
+            size += len(http_get_bytes(url, session, retries=4))
+        except Exception:
+            fail += 1
+            continue
+        lat.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - t0
+    return Row("http_get_bytes", "seq", len(urls) - fail, fail, elapsed, size / 1e6, lat, None)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=200, help="JS and CSS chunks in the runtime (default: 200)")
+    ap.add_argument("--size", type=int, default=16384, help="Typical body size in bytes (default: 16384)")
+    ap.add_argument("--latency", type=float, default=0.01, help="Origin response delay in seconds (default: 0.01)")
+    ap.add_argument("--jitter", type=float, default=0.005, help="+/- random delay in seconds (default: 0.005)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 503 (default: 0)")
+    ap.add_argument(
+        "--parallel",
+        type=int,
+        nargs="*",
+        default=[8],
+        metavar="N",
+        help="--concurrency values to run after the sequential run (default: 8)",
+    )
+    ap.add_argument(
+        "--only",
+        choices=("notebookvip", "fjii", "images"),
+        action="append",
+        help="Limit to one script (repeatable).",
+    )
+    args = ap.parse_args()
+
+    origin = FakeOrigin(
+        chunks=args.chunks,
+        size=args.size,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    ).start()
+
+    py = sys.executable
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(origin.image_urls(args.chunks * 2)) + "\n")
+        urls_file = f.name
+
+    scripts = {
+        "notebookvip": [
+            py, os.path.join(ROOT, "download_notebookvip_assets.py"),
+            "--runtime-url", origin.runtime_url("/jsb-wap/"), "--public-path", "/jsb-wap/",
+        ],
+        "fjii": [py, os.path.join(ROOT, "download_fjii_assets.py"), "--runtime-url", origin.runtime_url("/wap/")],
+        "images": [py, os.path.join(ROOT, "download_images_keep_path.py"), "--urls-file", urls_file],
+    }
+
+    print(
+        f"[+] fake origin {origin.base}: {args.chunks} JS + {args.chunks} CSS chunks, ~{args.size} B, "
+        f"{args.latency * 1000:.0f}+/-{args.jitter * 1000:.0f} ms, error rate {args.error_rate:g}"
+    )
+    print(HEADER)
+    try:
+        print(bench_http_get_bytes(origin.image_urls(args.chunks), origin).cells())
+        for name, cmd in scripts.items():
+            if args.only and name not in args.only:
+                continue
+            print(bench_script(name, "seq", cmd + ["--concurrency", "1"], origin).cells())
+            for n in args.parallel:
+                extra = ["--concurrency", str(n), "--per-host", str(n)]
+                print(bench_script(name, f"x{n}", cmd + extra, origin).cells())
+    finally:
+        origin.stop()
+        os.unlink(urls_file)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Time webmirror.runtime.parse_runtime on synthetic runtimes of growing size.
+
+Two shapes are generated per size:
+  maps   - N-entry JS and CSS hash maps plus ordinary minified code
+  parens - many `f({a:1})` / `g({b:"x"})` calls before the maps (the input that made the
+           old `\\(\\{(.*?)\\}\\[e\\]\\|\\|e\\)` search quadratic)
+
+Run from the repo root:
+  python3 benchmarks/bench_runtime_parser.py
+Time per MB should stay roughly constant as the size doubles.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webmirror.runtime import parse_runtime  # noqa: E402
+
+
+def runtime_maps(n: int) -> str:
+    m = ",".join(f'{i}:"{i:020x}"' for i in range(n))
+    return (
+        '!function(e){var x={a:1};'
+        + "function f(a,b){return a+b*2-(c||d)}" * n
+        + 'r.p="/jsb-wap/";n.src=function(e){return r.p+"static/js/"+e+"."+{' + m + '}[e]+".js"};'
+        + 'var d="static/css/"+({1:"Vote"}[e]||e)+"."+{' + m + '}[e]+".css"}'
+    )
+
+
+def runtime_parens(n: int) -> str:
+    return (
+        'r.p="/jsb-wap/";'
+        + "f({a:1});g({b:\"x\"});" * n
+        + 'n.src=r.p+"static/js/"+e+"."+{1:"0123456789abcdef0123"}[e]+".js";'
+        + 'd="static/css/"+({1:"Vote"}[e]||e)+"."+{1:"0123456789abcdef0123"}[e]+".css"'
+    )
+
+
+def bench(label: str, text: str, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        info = parse_runtime(text)
+        best = min(best, time.perf_counter() - t0)
+    mb = len(text) / 1e6
+    print(
+        f"{label:<8} {mb:8.2f} MB  {best * 1000:9.1f} ms  {best / mb * 1000:7.1f} ms/MB"
+        f"  js={len(info.js.hashes) if info.js else 0}"
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", type=int, default=5000, help="Smallest N (default: 5000)")
+    ap.add_argument("--steps", type=int, default=4, help="Number of doublings (default: 4)")
+    ap.add_argument("--repeat", type=int, default=3, help="Best-of repeats (default: 3)")
+    args = ap.parse_args()
+
+    for shape, make in (("maps", runtime_maps), ("parens", runtime_parens)):
+        n = args.start
+        for _ in range(args.steps):
+            bench(shape, make(n), args.repeat)
+            n *= 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
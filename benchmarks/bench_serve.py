@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Large-asset throughput of `python3 -m webmirror serve` under many parallel clients.
+
+A temporary tree holds --files vendor-sized JS chunks (--size-kb each, like
+11.fd39655f86fc9a763440.js / 14.b51abf56b2ff75f1353d.js) and one --media-mb
+video. The server runs as a subprocess in each mode:
+
+  sendfile   default: bodies above --max-cached-kb leave with os.sendfile()
+             from the open-file cache
+  mmap       --no-sendfile: the same files, copied from their mapping
+  in-memory  --max-cached-kb above every file: bodies held as bytes in the
+             LRU and written from Python (how serve treated anything up to
+             2 MB before)
+
+--clients keep-alive HTTP/1.1 clients (threads spread over --procs client
+processes) fetch random chunks in full and random 1 MB ranges of the video,
+identity encoding, for --seconds. Reported: MB/s, requests/s, p50/p99 per
+request, and the server's peak and final RSS from /proc (Linux).
+
+Run from the repo root:
+  python3 benchmarks/bench_serve.py
+  python3 benchmarks/bench_serve.py --clients 64 --procs 4 --seconds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RANGE = 1 << 20
+
+
+def make_tree(folder: str, files: int, size_kb: int, media_mb: int) -> tuple[list[str], str, int]:
+    """(chunk URL paths, media URL path, media size)"""
+    js = os.path.join(folder, "jsb-wap", "static", "js")
+    media = os.path.join(folder, "jsb-wap", "static", "media")
+    os.makedirs(js)
+    os.makedirs(media)
+    chunks = []
+    for i in range(files):
+        name = f"{i}.{random.getrandbits(80):020x}.js"
+        with open(os.path.join(js, name), "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+        chunks.append(f"/jsb-wap/static/js/{name}")
+    with open(os.path.join(media, "intro.mp4"), "wb") as f:
+        for _ in range(media_mb):
+            f.write(os.urandom(1 << 20))
+    return chunks, "/jsb-wap/static/media/intro.mp4", media_mb << 20
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> tuple[float | None, float | None]:
+    """(peak, current) resident set size of pid in MB, from /proc."""
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None, None
+    kb = lambda k: int(fields[k].split()[0]) / 1024 if k in fields else None  # noqa: E731
+    return kb("VmHWM"), kb("VmRSS")
+
+
+def client_proc(task: tuple[int, list[str], str, int, int, float]) -> tuple[int, int, list[float]]:
+    """(bytes, errors, latencies) of `threads` keep-alive clients until the deadline."""
+    port, chunks, media, media_size, threads, deadline = task
+    total = [0, 0]
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def worker() -> None:
+        rnd = random.Random()
+        buf = bytearray(1 << 20)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        got = errors = 0
+        lat = []
+        while time.time() < deadline:
+            headers = {"Accept-Encoding": "identity"}
+            if rnd.random() < 0.25:
+                path = media
+                start = rnd.randrange(0, media_size - RANGE)
+                headers["Range"] = f"bytes={start}-{start + RANGE - 1}"
+            else:
+                path = rnd.choice(chunks)
+            t0 = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                r = conn.getresponse()
+                while True:
+                    n = r.readinto(buf)
+                    if not n:
+                        break
+                    got += n
+                if r.status not in (200, 206):
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            lat.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            total[0] += got
+            total[1] += errors
+            latencies.extend(lat)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return total[0], total[1], latencies
+
+
+def run_mode(label: str, extra: list[str], tree: str, work: tuple, args: argparse.Namespace) -> str:
+    chunks, media, media_size = work
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "webmirror", "serve", "--root", tree, "--port", str(port),
+         "--quiet", "--no-precompress", "--no-early-hints", *extra],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):  # wait for the listener
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        base_rss = rss_mb(server.pid)[1]
+        per_proc = [args.clients // args.procs + (i < args.clients % args.procs) for i in range(args.procs)]
+        deadline = time.time() + args.seconds
+        tasks = [(port, chunks, media, media_size, n, deadline) for n in per_proc if n]
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=len(tasks)) as ex:
+            results = list(ex.map(client_proc, tasks))
+        elapsed = time.perf_counter() - t0
+        peak, now = rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    got = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    lat = sorted(x for r in results for x in r[2])
+    p = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else 0.0  # noqa: E731
+    if peak is not None:
+        mem = f"{base_rss or 0:8.0f} {peak:8.0f} {now or 0:8.0f}"
+    else:
+        mem = f"{'-':>8s} {'-':>8s} {'-':>8s}"
+    return (
+        f"{label:10s} {got / elapsed / 1e6:9.1f} {len(lat) / elapsed:8.0f} {p(0.5):8.1f} {p(0.99):8.1f}"
+        f" {errors:6d} {mem}"
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=8, help="Vendor-sized chunks (default: 8)")
+    ap.add_argument("--size-kb", type=int, default=960, help="Size of each chunk in KB (default: 960)")
+    ap.add_argument("--media-mb", type=int, default=64, help="Size of the video in MB (default: 64)")
+    ap.add_argument("--clients", type=int, default=32, help="Parallel keep-alive clients (default: 32)")
+    ap.add_argument("--procs", type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                    help="Client processes the clients are spread over (default: CPUs, at most 4)")
+    ap.add_argument("--seconds", type=float, default=5.0, help="Duration per mode (default: 5)")
+    ap.add_argument(
+        "--only",
+        choices=("sendfile", "mmap", "in-memory"),
+        action="append",
+        help="Limit to one mode (repeatable).",
+    )
+    args = ap.parse_args()
+    args.procs = max(1, min(args.procs, args.clients))
+
+    modes = {
+        "sendfile": [],
+        "mmap": ["--no-sendfile"],
+        "in-memory": ["--max-cached-kb", str(max(args.size_kb, 1024) * 2), "--cache-mb", str(args.files * args.size_kb // 1024 + 64)],
+    }
+    with tempfile.TemporaryDirectory() as tree:
+        work = make_tree(tree, args.files, args.size_kb, args.media_mb)
+        print(
+            f"[+] {args.files} x {args.size_kb} KB chunks + {args.media_mb} MB video (1 MB ranges), "
+            f"{args.clients} clients in {args.procs} processes, {args.seconds:g}s per mode"
+        )
+        print(f"{'mode':10s} {'MB/s':>9s} {'req/s':>8s} {'p50 ms':>8s} {'p99 ms':>8s} {'errors':>6s}"
+              f" {'idle MB':>8s} {'peak MB':>8s} {'end MB':>8s}")
+        for label, extra in modes.items():
+            if args.only and label not in args.only:
+                continue
+            print(run_mode(label, extra, tree, work, args), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cold-start regression check for the CLIs, from `python3 -X importtime`.
+
+Each case runs as a fresh interpreter (best of --repeat runs, interleaved):
+
+  offline  `import webmirror`, the runtime parser, and the commands that
+           only read local files (runtime, diff, verify, an index query,
+           serve/pack imports).
+           None of them may load the HTTP stack (requests, urllib3, httpx),
+           and their import time must stay within --budget-ms.
+  network  the fetch pool and the download scripts, reported for comparison;
+           they need requests anyway, but must not load httpx unless
+           --transport http2 is used.
+
+Import time is what -X importtime reports for everything outside the
+interpreter's own startup (site, encodings, ...), so the numbers do not
+depend on which .pth files the environment has. Wall time is the whole
+process, next to `python3 -c pass`.
+
+Run from the repo root:
+  python3 benchmarks/bench_startup.py
+  python3 benchmarks/bench_startup.py --budget-ms 40 --repeat 10
+Exit code 1 when an offline case goes over budget or imports the HTTP stack.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HTTP_STACK = ("requests", "urllib3", "httpx")
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+RUNTIME = (
+    '!function(e){var r={};r.p="/jsb-wap/";'
+    'n.src=r.p+"static/js/"+e+"."+{%s}[e]+".js";'
+    'var d="static/css/"+({1:"Vote"}[e]||e)+"."+{%s}[e]+".css"}([]);'
+)
+
+
+def write_runtime(folder: str, n: int = 200) -> str:
+    m = ",".join(f'{i}:"{i:020x}"' for i in range(n))
+    path = os.path.join(folder, "runtime.0123456789abcdef0123.js")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(RUNTIME % (m, m))
+    return path
+
+
+def run(argv: list[str], startup: frozenset[str] = frozenset()) -> tuple[float, float, set[str]]:
+    """
+    (wall seconds, import seconds, package names) of one cold run; imports
+    named in startup (the interpreter's own, see main()) are not counted.
+    """
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)}: exit code {proc.returncode}\n{proc.stderr[-2000:]}")
+    total_us = 0
+    modules: set[str] = set()
+    top: set[str] = set()
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m is None:
+            continue
+        name = m.group(4)
+        modules.add(name.split(".")[0])
+        if not m.group(3):  # top level: its cumulative time covers what it imported
+            top.add(name)
+            if name not in startup:
+                total_us += int(m.group(2))
+    return wall, total_us / 1e6, modules if startup else top
+
+
+def bench(cases: list[list[str]], repeat: int, startup: frozenset[str]) -> list[tuple[float, float, set[str]]]:
+    """
+    Best (wall, import) and the package names of each case. The repeats go
+    round-robin over the cases, so a burst of load on the machine costs one
+    run of several cases rather than every run of one.
+    """
+    runs: list[list[tuple[float, float, set[str]]]] = [[] for _ in cases]
+    for _ in range(repeat):
+        for i, argv in enumerate(cases):
+            runs[i].append(run(argv, startup))
+    return [(min(r[0] for r in rs), min(r[1] for r in rs), rs[-1][2]) for rs in runs]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=60.0, help="Import-time budget per offline case (default: 60)")
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per case, best one counts (default: 5)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runtime = write_runtime(tmp)
+        site = os.path.join(tmp, "site")
+        os.makedirs(site)
+        with open(os.path.join(site, "index.html"), "w", encoding="utf-8") as f:
+            f.write("<!DOCTYPE html><html><head></head><body></body></html>\n")
+        # the index is built once here; the timed runs only query it (and stat the files)
+        subprocess.run([sys.executable, "-m", "webmirror", "index", site], cwd=ROOT,
+                       stdout=subprocess.DEVNULL, check=True)
+        cases = [
+            ("offline", "import webmirror", ["-c", "import webmirror"]),
+            ("offline", "import webmirror.runtime", ["-c", "import webmirror.runtime"]),
+            ("offline", "webmirror runtime", ["-m", "webmirror", "runtime", runtime]),
+            ("offline", "webmirror diff", ["-m", "webmirror", "diff", runtime, runtime, "--summary"]),
+            ("offline", "webmirror verify", ["-m", "webmirror", "verify", site, "--jobs", "1"]),
+            ("offline", "webmirror index -q", ["-m", "webmirror", "index", site, "-q", "jsb-wap"]),
+            ("offline", "import webmirror.serve", ["-c", "import webmirror.serve"]),
+            ("offline", "import webmirror.verify", ["-c", "import webmirror.verify"]),
+            ("offline", "import webmirror.pack", ["-c", "import webmirror.pack"]),
+            ("network", "import webmirror.pool", ["-c", "import webmirror.pool"]),
+            ("network", "FetchPool()", ["-c", "from webmirror import FetchPool; FetchPool().close()"]),
+            ("network", "download_fjii_assets --help", ["download_fjii_assets.py", "--help"]),
+        ]
+        # what the interpreter imports by itself (site, encodings, .pth files)
+        runs = [run(["-c", "pass"]) for _ in range(args.repeat)]
+        base_wall = min(r[0] for r in runs)
+        startup = frozenset(runs[-1][2])
+        print(f"[+] {sys.executable} -c pass: {base_wall * 1000:.0f} ms; budget {args.budget_ms:.0f} ms of imports")
+        print(f"{'kind':8s} {'case':34s} {'wall ms':>8s} {'import ms':>10s}  http stack")
+        failed = 0
+        results = bench([argv for _, _, argv in cases], args.repeat, startup)
+        for (kind, label, _), (wall, imports, modules) in zip(cases, results):
+            stack = sorted(modules.intersection(HTTP_STACK))
+            verdict = ""
+            if kind == "offline" and (stack or imports * 1000 > args.budget_ms):
+                verdict = "  <- over budget" if not stack else "  <- loads the HTTP stack"
+                failed += 1
+            elif kind == "network" and "httpx" in stack:
+                verdict = "  <- httpx without --transport http2"
+                failed += 1
+            print(f"{kind:8s} {label:34s} {wall * 1000:8.0f} {imports * 1000:10.1f}  {', '.join(stack) or '-'}{verdict}")
+    if failed:
+        print(f"[!] {failed} case(s) regressed")
+        return 1
+    print("[+] OK")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
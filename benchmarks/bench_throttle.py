@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Run webmirror.Mirror against a local stub origin that throttles.
+
+The stub (stdlib ThreadingHTTPServer on 127.0.0.1) serves:
+  /ok/<n>.png       small body after --latency seconds; when more than
+                    --server-rate requests/s arrive it answers 429 with
+                    Retry-After instead
+  /flaky/<n>.png    503 on the first request for each path, then 200
+  /missing/<n>.png  404
+
+Run from the repo root:
+  python3 benchmarks/bench_throttle.py
+  python3 benchmarks/bench_throttle.py --server-rate 5 --concurrency 16
+
+What to look for: every /ok and /flaky URL ends up OK, each /missing URL
+costs exactly one request (no retries), and the 429 count stays small
+because the client pauses on Retry-After and then holds its rate below
+the server's.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webmirror import Mirror  # noqa: E402
+
+
+class StubOrigin:
+    def __init__(self, rate: float, latency: float, retry_after: int) -> None:
+        self.rate = rate
+        self.latency = latency
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.tokens = rate
+        self.stamp = time.monotonic()
+        self.seen_flaky: set[str] = set()
+        self.counts: dict[int, int] = {}
+        self.requests: dict[str, int] = {}
+
+    def admit(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def record(self, path: str, status: int) -> None:
+        with self.lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+
+def make_handler(origin: StubOrigin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None) -> None:
+            origin.record(self.path, status)
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/missing/"):
+                return self.reply(404)
+            if not origin.admit():
+                return self.reply(429, headers={"Retry-After": str(origin.retry_after)})
+            if self.path.startswith("/flaky/"):
+                with origin.lock:
+                    first = self.path not in origin.seen_flaky
+                    origin.seen_flaky.add(self.path)
+                if first:
+                    return self.reply(503)
+            time.sleep(origin.latency)
+            self.reply(200, b"\x89PNG" + self.path.encode() * 64, {"Content-Type": "image/png"})
+
+    return Handler
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ok", type=int, default=200, help="Number of /ok URLs (default: 200)")
+    ap.add_argument("--flaky", type=int, default=10, help="Number of /flaky URLs (default: 10)")
+    ap.add_argument("--missing", type=int, default=10, help="Number of /missing URLs (default: 10)")
+    ap.add_argument("--server-rate", type=float, default=20, help="Requests/s the stub admits (default: 20)")
+    ap.add_argument("--latency", type=float, default=0.02, help="Stub response delay in seconds (default: 0.02)")
+    ap.add_argument("--retry-after", type=int, default=1, help="Retry-After sent with 429 (default: 1)")
+    ap.add_argument("--concurrency", type=int, default=8, help="Client workers (default: 8)")
+    ap.add_argument("--rate", type=float, default=0, help="Client --rate (default: 0, adaptive only)")
+    args = ap.parse_args()
+
+    origin = StubOrigin(args.server_rate, args.latency, args.retry_after)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(origin))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    urls = (
+        [f"{base}/ok/{i}.png" for i in range(args.ok)]
+        + [f"{base}/flaky/{i}.png" for i in range(args.flaky)]
+        + [f"{base}/missing/{i}.png" for i in range(args.missing)]
+    )
+
+    with tempfile.TemporaryDirectory() as out:
+        mirror = Mirror(
+            out,
+            user_agent="bench",
+            concurrency=args.concurrency,
+            per_host=args.concurrency,
+            rate=args.rate,
+            report_every=10 ** 9,
+        )
+        t0 = time.perf_counter()
+        ok, _, fail = mirror.run(urls)
+        elapsed = time.perf_counter() - t0
+    httpd.shutdown()
+
+    missing_requests = sum(n for p, n in origin.requests.items() if p.startswith("/missing/"))
+    print()
+    print(f"client: OK={ok} FAIL={fail} in {elapsed:.2f}s ({len(urls) / elapsed:.1f} URLs/s)")
+    print(f"server: admits {args.server_rate:g} req/s; responses by status {dict(sorted(origin.counts.items()))}")
+    print(f"404s: {missing_requests} requests for {args.missing} missing URLs")
+    for t in mirror.throttles.hosts():
+        rate = "unlimited" if t.rate is None else f"{t.rate:.1f} req/s"
+        print(f"host {t.host}: throttled {t.throttled}x, final limit {t.limit}, rate {rate}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
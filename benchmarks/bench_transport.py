@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mirror many small chunks over HTTP/1.1 (requests) and HTTP/2 (httpx[h2]).
+
+Two local stub origins serve /static/js/<n>.<hash>.js bodies after --latency
+seconds, and hold each new connection for --handshake seconds (the TCP+TLS
+round trips a distant CDN would cost):
+  h1  stdlib ThreadingHTTPServer, HTTP/1.1 keep-alive
+  h2  asyncio + h2 speaking cleartext HTTP/2 (prior knowledge), any number
+      of concurrent streams per connection
+
+Each scenario mirrors the same --chunks URLs into a fresh temp folder and
+reports URLs/s and how many TCP connections the server accepted.
+
+Run from the repo root (the http2 rows need `pip install "httpx[h2]"`):
+  python3 benchmarks/bench_transport.py
+  python3 benchmarks/bench_transport.py --chunks 2000 --latency 0.05
+
+What to look for: requests with per-host 6 is bound by 6 round trips in
+flight. More HTTP/1.1 workers help but open (and handshake) one connection
+each, which CDNs and WAFs tend to punish; http2 with the same number of
+streams reaches that rate over a single connection.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webmirror import FetchPool, Mirror  # noqa: E402
+from webmirror.transport import Http2Transport  # noqa: E402
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+    import h2.settings
+except ImportError:  # http2 rows are skipped
+    h2 = None
+
+
+def body_for(path: str, size: int) -> bytes:
+    line = f"/*{path}*/".encode()
+    return (line * (size // len(line) + 1))[:size]
+
+
+# -----------------------------
+# HTTP/1.1 stub
+# -----------------------------
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def make_h1_handler(latency: float, size: int, handshake: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes; without this Nagle +
+        # delayed ACK add ~40 ms to every keep-alive response
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            time.sleep(handshake)
+            super().setup()
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = body_for(self.path, size)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/javascript")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+# -----------------------------
+# HTTP/2 (h2c) stub
+# -----------------------------
+class H2Stub:
+    def __init__(self, latency: float, size: int, handshake: float) -> None:
+        self.latency = latency
+        self.size = size
+        self.handshake = handshake
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.port = 0
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    def _run(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        conn.initiate_connection()
+        conn.update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1000})
+        writer.write(conn.data_to_send())
+        window = asyncio.Condition()
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                for ev in conn.receive_data(data):
+                    if isinstance(ev, h2.events.RequestReceived):
+                        path = dict(ev.headers).get(":path", "/")
+                        asyncio.ensure_future(self.respond(conn, writer, window, ev.stream_id, path))
+                    elif isinstance(ev, h2.events.WindowUpdated):
+                        async with window:
+                            window.notify_all()
+                    elif isinstance(ev, h2.events.ConnectionTerminated):
+                        return
+                writer.write(conn.data_to_send())
+        except (ConnectionError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, conn, writer, window: asyncio.Condition, sid: int, path: str) -> None:
+        await asyncio.sleep(self.latency)
+        body = body_for(path, self.size)
+        try:
+            conn.send_headers(sid, [
+                (":status", "200"),
+                ("content-type", "application/javascript"),
+                ("content-length", str(len(body))),
+            ])
+            while body:
+                n = min(conn.local_flow_control_window(sid), conn.max_outbound_frame_size, len(body))
+                if n <= 0:
+                    writer.write(conn.data_to_send())
+                    async with window:
+                        await window.wait()
+                    continue
+                conn.send_data(sid, body[:n], end_stream=n == len(body))
+                body = body[n:]
+            writer.write(conn.data_to_send())
+        except (h2.exceptions.StreamClosedError, h2.exceptions.ProtocolError):
+            pass
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+def run(pool: FetchPool, urls: list[str]) -> tuple[int, int, float]:
+    with tempfile.TemporaryDirectory() as out:
+        mirror = Mirror(out, user_agent="bench", pool=pool, report_every=10 ** 9)
+        t0 = time.perf_counter()
+        ok, _, fail = mirror.run(urls)
+        elapsed = time.perf_counter() - t0
+        mirror.close()
+    pool.close()
+    return ok, fail, elapsed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=600, help="URLs per scenario (default: 600)")
+    ap.add_argument("--size", type=int, default=4096, help="Body size in bytes (default: 4096)")
+    ap.add_argument("--latency", type=float, default=0.02, help="Stub response delay in seconds (default: 0.02)")
+    ap.add_argument(
+        "--handshake",
+        type=float,
+        default=0.05,
+        help="Delay before a new connection is served, in seconds (default: 0.05)",
+    )
+    ap.add_argument(
+        "--streams",
+        type=int,
+        default=64,
+        help="Requests in flight for the wide scenarios (default: 64)",
+    )
+    args = ap.parse_args()
+
+    h1 = CountingServer(("127.0.0.1", 0), make_h1_handler(args.latency, args.size, args.handshake))
+    threading.Thread(target=h1.serve_forever, daemon=True).start()
+    h1_base = f"http://127.0.0.1:{h1.server_address[1]}"
+
+    def urls(base: str, tag: str) -> list[str]:
+        return [f"{base}/static/js/{tag}{i}.{i:020x}.js" for i in range(args.chunks)]
+
+    rows = []
+
+    def scenario(name: str, server, base: str, make_pool) -> None:
+        before = server.connections
+        ok, fail, elapsed = run(make_pool(), urls(base, f"{len(rows)}-"))
+        rows.append((name, ok, fail, elapsed, server.connections - before))
+
+    w = args.streams
+    scenario("requests  per-host 6", h1, h1_base,
+             lambda: FetchPool(concurrency=6, per_host=6, user_agent="bench"))
+    scenario(f"requests  per-host {w}", h1, h1_base,
+             lambda: FetchPool(concurrency=w, per_host=w, user_agent="bench"))
+
+    try:
+        Http2Transport(user_agent="bench", prior_knowledge=True).close()
+    except RuntimeError as e:
+        print(f"[!] http2 rows skipped: {e}")
+    else:
+        if h2 is None:
+            print('[!] http2 rows skipped: the stub server needs the h2 package (pip install "httpx[h2]")')
+        else:
+            stub = H2Stub(args.latency, args.size, args.handshake)
+            h2_base = f"http://127.0.0.1:{stub.port}"
+            for n in (6, w):
+                scenario(
+                    f"http2     per-host {n}", stub, h2_base,
+                    lambda n=n: FetchPool(
+                        concurrency=n,
+                        per_host=n,
+                        user_agent="bench",
+                        transport=Http2Transport(user_agent="bench", prior_knowledge=True),
+                    ),
+                )
+    h1.shutdown()
+
+    print()
+    print(
+        f"{args.chunks} chunks x {args.size} B, {args.latency * 1000:.0f} ms server latency, "
+        f"{args.handshake * 1000:.0f} ms per new connection"
+    )
+    print(f"{'scenario':<22} {'ok':>5} {'fail':>5} {'secs':>7} {'URLs/s':>8} {'conns':>6}")
+    for name, ok, fail, elapsed, conns in rows:
+        print(f"{name:<22} {ok:>5} {fail:>5} {elapsed:>7.2f} {args.chunks / elapsed:>8.1f} {conns:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
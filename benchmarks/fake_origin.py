@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+A local fake webpack origin for benchmarks (stdlib only).
+
+Any prefix works as a publicPath, so the same server stands in for
+jsb.notebookvip.cn (/jsb-wap/) and mt.fjii.com (/wap/):
+
+  <prefix>static/js/runtime.<hash>.js   webpack 4 runtime naming --chunks JS
+                                        and CSS chunks, r.p="<prefix>"
+  <prefix>static/js/<id>.<hash>.js      JSONP chunk body
+  <prefix>static/css/<id>.<hash>.css    stylesheet body
+  /jsb-files/img/<n>.png                image for the URL-list script
+
+Every response waits --latency seconds (+/- --jitter), bodies are about
+--size bytes (uniform in [size/2, 3*size/2], fixed per URL), and a
+--error-rate fraction of requests gets a 503 so retries are exercised;
+fail() scripts the next answers for one path (503, 429, 404, ...) for tests.
+The server records when each request arrived and how often each path was
+asked for, so callers can compute per-asset latency against the client's
+journal and count retries.
+
+Standalone, for poking at it by hand:
+  python3 benchmarks/fake_origin.py --port 8800 --chunks 200
+  python3 download_notebookvip_assets.py --out /tmp/jsb \
+      --runtime-url http://127.0.0.1:8800/jsb-wap/static/js/runtime.0000000000000000beef.js
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+RUNTIME_HASH = "0000000000000000beef"
+
+ROUTE_RE = re.compile(
+    r"^(?P<prefix>/(?:[\w.-]+/)*)static/(?:js/runtime\.(?P<runtime>[0-9a-f]+)\.js"
+    r"|js/(?P<js>\d+)\.[0-9a-f]+\.js|css/(?P<css>\d+)\.[0-9a-f]+\.css)$"
+    r"|^/jsb-files/img/(?P<img>\d+)\.png$"
+)
+
+
+def chunk_hash(kind: str, cid: int) -> str:
+    return hashlib.md5(f"{kind}-{cid}".encode()).hexdigest()[:20]
+
+
+def make_runtime(public_path: str, chunks: int) -> bytes:
+    js = ",".join(f'{i}:"{chunk_hash("js", i)}"' for i in range(chunks))
+    css = ",".join(f'{i}:"{chunk_hash("css", i)}"' for i in range(chunks))
+    return (
+        "!function(e){function r(t){var n=o[t];return n.exports}var o={};"
+        f'r.p="{public_path}";'
+        'r.e=function(e){var t=[],o={' + ",".join(f"{i}:1" for i in range(chunks)) + "};"
+        'o[e]&&t.push(new Promise(function(t,n){var a="static/css/"+e+"."+{' + css + '}[e]+".css"}));'
+        'var n=document.createElement("script");'
+        'n.src=r.p+"static/js/"+e+"."+{' + js + '}[e]+".js";return Promise.all(t)}}([]);'
+    ).encode()
+
+
+def make_body(kind: str, n: int, size: int) -> bytes:
+    rnd = random.Random(f"{kind}-{n}-{size}")
+    target = rnd.randint(max(1, size // 2), max(1, size * 3 // 2))
+    if kind == "js":
+        head = f'(window.webpackJsonp=window.webpackJsonp||[]).push([[{n}],{{"m{n}":function(e,t){{'.encode()
+        tail = b"}}]);"
+        pad = b"var a=1;"
+    elif kind == "css":
+        head = f".c{n}{{".encode()
+        tail = b"}"
+        pad = b"color:#000;"
+    else:
+        head = b"\x89PNG\r\n\x1a\n"
+        tail = b"IEND"
+        pad = bytes(range(256))
+    fill = max(0, target - len(head) - len(tail))
+    return head + (pad * (fill // len(pad) + 1))[:fill] + tail
+
+
+class FakeOrigin:
+    def __init__(
+        self,
+        *,
+        chunks: int = 100,
+        size: int = 8192,
+        latency: float = 0.01,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        port: int = 0,
+        seed: int = 1,
+    ) -> None:
+        self.chunks = chunks
+        self.size = size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.arrivals: dict[str, float] = {}  # path -> time.time() of the last request
+        self.hits: dict[str, int] = {}  # path -> requests
+        self._scripted: dict[str, list[int]] = {}  # path -> statuses to answer next
+        self.retry_after: str = "0"  # Retry-After sent with scripted 429/503
+        self.statuses: dict[int, int] = {}
+        self.bytes_sent = 0
+        self._bodies: dict[str, bytes] = {}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.base = f"http://127.0.0.1:{self.port}"
+
+    # ---- URLs a benchmark asks for ----
+    def runtime_url(self, public_path: str = "/jsb-wap/") -> str:
+        return f"{self.base}{public_path}static/js/runtime.{RUNTIME_HASH}.js"
+
+    def image_urls(self, n: int) -> list[str]:
+        return [f"{self.base}/jsb-files/img/{i}.png" for i in range(n)]
+
+    def chunk_path(self, kind: str, cid: int, public_path: str = "/jsb-wap/") -> str:
+        """URL path of a JS ("js") or CSS ("css") chunk the runtime names."""
+        return f"{public_path}static/{kind}/{cid}.{chunk_hash(kind, cid)}.{kind}"
+
+    def fail(self, path: str, *statuses: int) -> None:
+        """Answer the next len(statuses) requests for path with these statuses, in order."""
+        with self.lock:
+            self._scripted.setdefault(path, []).extend(statuses)
+
+    # ---- lifecycle ----
+    def start(self) -> FakeOrigin:
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.arrivals.clear()
+            self.hits.clear()
+            self.statuses.clear()
+            self.bytes_sent = 0
+
+    # ---- serving ----
+    def body(self, path: str) -> bytes | None:
+        m = ROUTE_RE.match(path)
+        if m is None:
+            return None
+        with self.lock:
+            cached = self._bodies.get(path)
+        if cached is not None:
+            return cached
+        if m.group("runtime"):
+            data = make_runtime(m.group("prefix"), self.chunks)
+        elif m.group("js") is not None:
+            data = make_body("js", int(m.group("js")), self.size) if int(m.group("js")) < self.chunks else None
+        elif m.group("css") is not None:
+            data = make_body("css", int(m.group("css")), self.size) if int(m.group("css")) < self.chunks else None
+        else:
+            data = make_body("img", int(m.group("img")), self.size)
+        if data is not None:
+            with self.lock:
+                self._bodies[path] = data
+        return data
+
+    def _handler(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def reply(self, status: int, body: bytes = b"", ctype: str = "text/plain", *, hint: bool = False) -> None:
+                with origin.lock:
+                    origin.statuses[status] = origin.statuses.get(status, 0) + 1
+                    origin.bytes_sent += len(body)
+                self.send_response(status)
+                if hint and status in (429, 503):
+                    self.send_header("Retry-After", origin.retry_after)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                with origin.lock:
+                    origin.arrivals[path] = time.time()
+                    origin.hits[path] = origin.hits.get(path, 0) + 1
+                    scripted = origin._scripted.get(path)
+                    status = scripted.pop(0) if scripted else None
+                    fail = origin.rnd.random() < origin.error_rate
+                    delay = max(0.0, origin.latency + origin.rnd.uniform(-origin.jitter, origin.jitter))
+                time.sleep(delay)
+                if status is not None:
+                    return self.reply(status, hint=True)
+                body = origin.body(path)
+                if body is None:
+                    return self.reply(404)
+                if fail:
+                    return self.reply(503)
+                ctype = (
+                    "application/javascript" if path.endswith(".js")
+                    else "text/css" if path.endswith(".css") else "image/png"
+                )
+                self.reply(200, body, ctype)
+
+        return Handler
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8800)
+    ap.add_argument("--chunks", type=int, default=100, help="JS and CSS chunks in the runtime (default: 100)")
+    ap.add_argument("--size", type=int, default=8192, help="Typical body size in bytes (default: 8192)")
+    ap.add_argument("--latency", type=float, default=0.01, help="Response delay in seconds (default: 0.01)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="+/- random delay in seconds (default: 0)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 503 (default: 0)")
+    args = ap.parse_args()
+
+    origin = FakeOrigin(
+        chunks=args.chunks,
+        size=args.size,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        port=args.port,
+    )
+    print(f"[+] Serving {origin.runtime_url()} (any publicPath works, e.g. {origin.runtime_url('/wap/')})")
+    try:
+        origin.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
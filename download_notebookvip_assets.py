@@ -5,118 +5,10 @@
 from __future__ import annotations
 
 import argparse
-import os
-import re
-import time
-from urllib.parse import urlparse, urljoin
 
-import requests
-
-
-def ensure_parent(path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-
-
-def guess_origin(u: str) -> str:
-    p = urlparse(u)
-    return f"{p.scheme}://{p.netloc}"
-
-
-def extract_public_path(runtime_text: str) -> str | None:
-    # matches: r.p="/jsb-wap/" (or similar)
-    m = re.search(r'r\.p\s*=\s*["\']([^"\']+)["\']', runtime_text)
-    return m.group(1) if m else None
-
-
-def normalize_public_path(p: str) -> str:
-    # ensure leading + trailing slash
-    if not p.startswith("/"):
-        p = "/" + p
-    if not p.endswith("/"):
-        p = p + "/"
-    return p
-
-
-def parse_js_chunk_map(runtime_text: str) -> dict[int, str]:
-    # Typical: r.p+"static/js/"+e+"."+{...}[e]+".js"
-    m = re.search(
-        r'r\.p\+"static/js/"\+e\+"\."\+\{(.*?)\}\[e\]\+"\.\s*js"',
-        runtime_text,
-        flags=re.DOTALL,
-    )
-    if not m:
-        m = re.search(
-            r'"static/js/"\+e\+"\."\+\{(.*?)\}\[e\]\+"\.\s*js"',
-            runtime_text,
-            flags=re.DOTALL,
-        )
-    if not m:
-        raise ValueError("Could not find JS chunk hash map in runtime.")
-
-    obj = m.group(1)
-    pairs = re.findall(r'(\d+)\s*:\s*"([0-9a-f]{8,})"', obj)
-    return {int(k): v for k, v in pairs}
-
-
-def parse_css_chunk_map(runtime_text: str) -> tuple[dict[int, str], dict[int, str]]:
-    # Typical: "static/css/"+({10:"Vote"}[e]||e)+"."+{...}[e]+".css"
-    name_map: dict[int, str] = {}
-
-    m_name = re.search(r'\(\{(.*?)\}\[e\]\|\|e\)', runtime_text, flags=re.DOTALL)
-    if m_name:
-        name_obj = m_name.group(1)
-        name_pairs = re.findall(r'(\d+)\s*:\s*"([^"]+)"', name_obj)
-        name_map = {int(k): v for k, v in name_pairs}
-
-    m_hash = re.search(
-        r'"static/css/"\+\(\{.*?\}\[e\]\|\|e\)\+"\."\+\{(.*?)\}\[e\]\+"\.\s*css"',
-        runtime_text,
-        flags=re.DOTALL,
-    )
-    if not m_hash:
-        m_hash = re.search(
-            r'"static/css/"\+.*?\+"\."\+\{(.*?)\}\[e\]\+"\.\s*css"',
-            runtime_text,
-            flags=re.DOTALL,
-        )
-    if not m_hash:
-        raise ValueError("Could not find CSS chunk hash map in runtime.")
-
-    obj = m_hash.group(1)
-    pairs = re.findall(r'(\d+)\s*:\s*"([0-9a-f]{8,})"', obj)
-    hash_map = {int(k): v for k, v in pairs}
-    return name_map, hash_map
-
-
-def http_get_bytes(
-    url: str,
-    session: requests.Session,
-    *,
-    retries: int = 3,
-    timeout: int = 30,
-) -> bytes:
-    last_exc = None
-    for attempt in range(1, retries + 1):
-        try:
-            r = session.get(url, timeout=timeout)
-            r.raise_for_status()
-            return r.content
-        except Exception as e:
-            last_exc = e
-            if attempt < retries:
-                time.sleep(0.8 * attempt)
-                continue
-            raise last_exc
-
-
-def save_file(out_root: str, url_path: str, data: bytes) -> str:
-    # url_path like "/jsb-wap/static/js/xx.js"
-    rel = url_path.lstrip("/")
-    local_path = os.path.join(out_root, rel)
-    ensure_parent(local_path)
-    with open(local_path, "wb") as f:
-        f.write(data)
-    return local_path
+from webmirror.cliargs import add_fetch_args, pool_from_args, store_from_args
+from webmirror.jobs import WebpackJob, run_webpack
+from webmirror.snapshot import snapshot_key
 
 
 def main() -> int:
@@ -142,62 +34,73 @@ def main() -> int:
         default="Mozilla/5.0 (Linux; Android 11; sdk_gphone_arm64 Build/RSR1.240422.006; wv) "
                 "AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/91.0.4472.114 Mobile Safari/537.36",
     )
+    ap.add_argument(
+        "--index-url",
+        default="",
+        help="Also mirror the SPA entry page (e.g. https://jsb.notebookvip.cn/jsb-wap/); saved as .../index.html.",
+    )
+    ap.add_argument(
+        "--discover",
+        action="store_true",
+        help="After the chunks, scan downloaded JS/CSS/HTML for images, fonts and other assets and mirror them too.",
+    )
+    ap.add_argument(
+        "--discover-host",
+        action="append",
+        default=[],
+        metavar="HOST",
+        help="Extra host whose assets --discover may fetch (repeatable), e.g. img01.yzcdn.cn . Default: origin host only.",
+    )
+    ap.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="Keep each release under <out>/snapshots/<runtime hash>/, hard-linking chunks that did not "
+             "change since the previous snapshot instead of downloading them.",
+    )
+    add_fetch_args(ap)
     args = ap.parse_args()
 
-    origin = args.origin.strip() or guess_origin(args.runtime_url)
-
-    s = requests.Session()
-    s.headers.update({"User-Agent": args.user_agent})
-
-    print(f"[+] Fetch runtime: {args.runtime_url}")
-    runtime_bytes = http_get_bytes(args.runtime_url, s)
-    runtime_text = runtime_bytes.decode("utf-8", errors="replace")
-
-    runtime_path = urlparse(args.runtime_url).path
-    saved = save_file(args.out, runtime_path, runtime_bytes)
-    print(f"    saved -> {saved}")
-
-    parsed_pp = extract_public_path(runtime_text) or "/"
-    public_path = normalize_public_path(args.public_path.strip() or parsed_pp)
-    print(f"[+] Using publicPath: {public_path}")
-    print(f"[+] Using origin: {origin}")
-
-    js_map = parse_js_chunk_map(runtime_text)
-    name_map, css_map = parse_css_chunk_map(runtime_text)
-
-    print(f"[+] JS chunks: {len(js_map)}")
-    print(f"[+] CSS chunks: {len(css_map)}")
-
-    targets: list[str] = []
-
-    for cid, h in sorted(js_map.items()):
-        p = f"{public_path}static/js/{cid}.{h}.js"
-        targets.append(urljoin(origin, p))
-
-    for cid, h in sorted(css_map.items()):
-        name = name_map.get(cid, str(cid))
-        p = f"{public_path}static/css/{name}.{h}.css"
-        targets.append(urljoin(origin, p))
-
-    targets = sorted(set(targets))
-    print(f"[+] Total targets (js+css): {len(targets)}")
-
-    ok = 0
-    fail = 0
-    for idx, url in enumerate(targets, 1):
-        up = urlparse(url)
-        try:
-            data = http_get_bytes(url, s)
-            saved_path = save_file(args.out, up.path, data)
-            ok += 1
-            if idx % 25 == 0 or idx == len(targets):
-                print(f"    [{idx}/{len(targets)}] OK -> {saved_path}")
-        except Exception as e:
-            fail += 1
-            print(f"    [{idx}/{len(targets)}] FAIL {url}: {e}")
-
-    print(f"[+] Done. OK={ok}, FAIL={fail}, out={args.out}")
-    return 0 if fail == 0 else 2
+    if args.snapshot and snapshot_key(args.runtime_url) is None:
+        ap.error("--snapshot needs a content-hashed runtime URL (runtime.<hash>.js)")
+
+    job = WebpackJob(
+        args.runtime_url,
+        args.out,
+        public_path=args.public_path,
+        origin=args.origin,
+        user_agent=args.user_agent,
+        index_url=args.index_url,
+        discover=args.discover,
+        discover_hosts=args.discover_host,
+        snapshot=args.snapshot,
+        optimize_images=args.optimize_images,
+    )
+    pool = pool_from_args(ap, args, args.user_agent)
+    if args.concurrency > 1:
+        print(f"[+] Concurrency: {args.concurrency} (per host: {args.per_host})")
+    store = store_from_args(args)
+    try:
+        res = run_webpack(
+            job,
+            pool=pool,
+            force=args.force,
+            resume=args.resume,
+            retry_failed=args.retry_failed,
+            store=store,
+        )
+    finally:
+        pool.close()
+        if store is not None:
+            store.close()
+    if store is not None and (store.new or store.shared):
+        print(f"[+] Blob store {store.root}: {store.summary()}")
+
+    print(pool.metrics.summary())
+    for path in args.metrics:
+        print(f"[+] Metrics: {path}")
+
+    print(f"[+] Done. OK={res.ok} (up to date: {res.skipped}), FAIL={res.fail}, out={res.out}")
+    return res.exit_code
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""
+download_notebookvip_assets.py against benchmarks/fake_origin.py on 127.0.0.1.
+
+  python3 -m pytest -q tests
+
+The script runs as a subprocess, as it would from the shell, so the exit
+code (0 only when every target is OK) is part of what is checked. Each test
+gets its own origin and output folder.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_origin import FakeOrigin  # noqa: E402
+
+CHUNKS = 6
+
+
+@pytest.fixture
+def origin():
+    o = FakeOrigin(chunks=CHUNKS, size=2048, latency=0.0).start()
+    yield o
+    o.stop()
+
+
+def download(origin: FakeOrigin, out: str, *extra: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, os.path.join(ROOT, "download_notebookvip_assets.py"),
+         "--runtime-url", origin.runtime_url(), "--out", str(out), *extra],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+def chunk_paths(origin: FakeOrigin) -> list[str]:
+    return [origin.chunk_path(kind, i) for kind in ("js", "css") for i in range(CHUNKS)]
+
+
+def test_concurrent_mirror_matches_origin(origin, tmp_path):
+    proc = download(origin, tmp_path, "--concurrency", "4", "--per-host", "2")
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    assert f"OK={2 * CHUNKS}" in proc.stdout
+    for path in chunk_paths(origin):
+        with open(os.path.join(tmp_path, *path.strip("/").split("/")), "rb") as f:
+            assert f.read() == origin.body(path), path
+        assert origin.hits[path] == 1
+
+
+def test_retries_5xx_and_429(origin, tmp_path):
+    js, css = origin.chunk_path("js", 0), origin.chunk_path("css", 1)
+    origin.fail(js, 503, 502)
+    origin.fail(css, 429)
+    proc = download(origin, tmp_path, "--concurrency", "4")
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    assert origin.hits[js] == 3
+    assert origin.hits[css] == 2
+    with open(os.path.join(tmp_path, *js.strip("/").split("/")), "rb") as f:
+        assert f.read() == origin.body(js)
+
+
+def test_404_fails_fast(origin, tmp_path):
+    missing = origin.chunk_path("js", 2)
+    origin.fail(missing, 404)
+    proc = download(origin, tmp_path, "--concurrency", "4")
+    assert proc.returncode != 0
+    assert "FAIL=1" in proc.stdout
+    assert origin.hits[missing] == 1  # not retried
+    assert not os.path.exists(os.path.join(tmp_path, *missing.strip("/").split("/")))
+
+
+def test_resume_requests_only_what_is_not_done(origin, tmp_path):
+    broken = origin.chunk_path("css", 3)
+    origin.fail(broken, 404)
+    assert download(origin, tmp_path, "--concurrency", "4").returncode != 0
+
+    origin.reset_stats()
+    proc = download(origin, tmp_path, "--concurrency", "4", "--resume")
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    chunks = set(chunk_paths(origin))
+    assert {p for p in origin.hits if p in chunks} == {broken}
+    assert os.path.exists(os.path.join(tmp_path, *broken.strip("/").split("/")))
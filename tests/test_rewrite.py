@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+webmirror.rewrite: a second pass over a rewritten tree must be a no-op.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webmirror.rewrite import rewrite_stream, rewrite_tree  # noqa: E402
+
+PAIRS = {"/jsb-wap/": "/mirror/jsb-wap/", "https://jsb.notebookvip.cn": "http://127.0.0.1:8000"}
+
+INDEX = (
+    '<!DOCTYPE html><html><head><link href=/jsb-wap/static/css/app.css rel=stylesheet>'
+    '<link rel="icon" href="https://jsb.notebookvip.cn/jsb-files/favicon.ico"></head>'
+    '<body><script src=/jsb-wap/static/js/runtime.0123456789abcdef0123.js></script></body></html>'
+)
+RUNTIME = '!function(e){var r={};r.p="/jsb-wap/";n.src=r.p+"static/js/"+e+".js"}([]);'
+
+
+def write(root, rel: str, text: str) -> None:
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def read(root, rel: str) -> str:
+    with open(os.path.join(root, *rel.split("/")), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_second_pass_makes_no_replacements(tmp_path):
+    write(tmp_path, "jsb-wap/index.html", INDEX)
+    write(tmp_path, "jsb-wap/static/js/runtime.0123456789abcdef0123.js", RUNTIME)
+
+    first = rewrite_tree(str(tmp_path), PAIRS)
+    assert first == {
+        os.path.join("jsb-wap", "index.html"): 3,
+        os.path.join("jsb-wap", "static", "js", "runtime.0123456789abcdef0123.js"): 1,
+    }
+    index = read(tmp_path, "jsb-wap/index.html")
+    runtime = read(tmp_path, "jsb-wap/static/js/runtime.0123456789abcdef0123.js")
+    assert "src=/mirror/jsb-wap/static/js/runtime." in index
+    assert 'r.p="/mirror/jsb-wap/"' in runtime
+
+    assert rewrite_tree(str(tmp_path), PAIRS) == {}
+    assert read(tmp_path, "jsb-wap/index.html") == index
+    assert read(tmp_path, "jsb-wap/static/js/runtime.0123456789abcdef0123.js") == runtime
+
+
+def test_already_rewritten_text_across_block_boundaries():
+    pairs = {k.encode(): v.encode() for k, v in PAIRS.items()}
+    text = ("x" * 5 + "/mirror/jsb-wap/a.js /jsb-wap/b.js ") * 50
+    for block_size in (1, 3, 7, 16, 1024):
+        out = io.BytesIO()
+        n = rewrite_stream(io.BytesIO(text.encode()), out, pairs, block_size=block_size)
+        assert n == 50, block_size
+        assert out.getvalue().decode() == text.replace(" /jsb-wap/b.js", " /mirror/jsb-wap/b.js")
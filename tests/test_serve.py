@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+webmirror.serve: SPA fallback only for paths that are not a file.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webmirror.serve import StaticSite, make_server  # noqa: E402
+
+INDEX = b"<!DOCTYPE html><html><body><div id=app></div></body></html>"
+LICENSE = b"MIT License\n"
+
+
+@pytest.fixture
+def base_url(tmp_path):
+    spa = tmp_path / "jsb-wap"
+    (spa / "static" / "js").mkdir(parents=True)
+    (spa / "index.html").write_bytes(INDEX)
+    (spa / "LICENSE").write_bytes(LICENSE)
+    (spa / "static" / "js" / "app.js").write_bytes(b"console.log(1);")
+    site = StaticSite(str(tmp_path))
+    site.add_spa("/jsb-wap/")
+    httpd = make_server(site, "127.0.0.1", 0, quiet=True)
+    t = threading.Thread(target=httpd.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url: str) -> tuple[int, bytes]:
+    try:
+        with urllib.request.urlopen(url, timeout=10) as r:
+            return r.status, r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_extensionless_file_is_not_shadowed(base_url):
+    assert get(base_url + "/jsb-wap/LICENSE") == (200, LICENSE)
+
+
+def test_deep_links_get_the_spa_page(base_url):
+    assert get(base_url + "/jsb-wap/") == (200, INDEX)
+    assert get(base_url + "/jsb-wap/user/orders") == (200, INDEX)
+    assert get(base_url + "/jsb-wap/static/js/app.js") == (200, b"console.log(1);")
+    assert get(base_url + "/jsb-wap/static/js/missing.js")[0] == 404
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared mirroring library behind the download_*.py scripts.
+
+  fsutil   - atomic file writes
+  blobstore - content-addressed storage, hard-linked into mirror trees
+  fetch    - sessions, retry policy, streaming downloads with atomic writes
+  ratelimit - per-host token bucket, adaptive concurrency, Retry-After pauses
+  runtime  - webpack runtime.*.js parsing (publicPath, chunk hash maps)
+  journal  - append-only per-job journal for --resume / --retry-failed
+  mirror   - URL -> local path layout, incremental re-mirroring, Mirror engine
+  snapshot - per-release trees keyed by runtime hash, offline chunk diffs
+  transport - HTTP/1.1 (requests) or HTTP/2 (httpx) sessions, pool sizing
+  metrics  - per-request timings (connect/TLS/TTFB/transfer), JSON lines / Prometheus
+  pool     - worker threads, transport and throttles shared by Mirrors
+  jobs     - webpack / URL-list jobs run on a FetchPool
+  batch    - several jobs from one JSON/YAML config, one report
+  cliargs  - fetch options shared by the download_*.py scripts (--concurrency, --rate, ...)
+  verify   - integrity check of a mirror tree (process pool, mmap hashing), repair
+  optimize - lossless PNG/JPEG recompression and WebP variants (process pool)
+  pack     - .gz/.br siblings and an indexed archive served with sendfile
+  prefetch - per-route preload hints from the chunk graph (103 Early Hints)
+  codeindex - SQLite inverted index of strings, URLs and identifiers in the bundles
+  apistub - API endpoints extracted from the bundles, and a record/replay stub backend
+  linkcheck - every reference in a mirror resolved against the tree; the missing set for re-download
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .blobstore import BlobStore
+    from .fetch import (
+        DownloadError,
+        http_get,
+        http_get_bytes,
+        new_session,
+        stream_to_file,
+    )
+    from .fsutil import atomic_write_bytes
+    from .journal import Journal
+    from .metrics import Metrics
+    from .pool import FetchPool
+    from .mirror import (
+        Mirror,
+        is_content_hashed,
+        local_path_for,
+        save_file,
+        save_with_url_structure,
+    )
+    from .ratelimit import HostThrottle, HostThrottles
+    from .runtime import (
+        ChunkTemplate,
+        RuntimeInfo,
+        chunk_urls,
+        extract_public_path,
+        guess_origin,
+        normalize_public_path,
+        parse_css_chunk_map,
+        parse_js_chunk_map,
+        parse_runtime,
+    )
+
+# The names below are imported from their module on first access, so that
+# `import webmirror.runtime` (or `python3 -m webmirror verify`) does not load
+# requests, urllib3 and the rest of the HTTP stack.
+_EXPORTS = {
+    "BlobStore": "blobstore",
+    "DownloadError": "fetch",
+    "http_get": "fetch",
+    "http_get_bytes": "fetch",
+    "new_session": "fetch",
+    "stream_to_file": "fetch",
+    "atomic_write_bytes": "fsutil",
+    "Journal": "journal",
+    "Metrics": "metrics",
+    "FetchPool": "pool",
+    "Mirror": "mirror",
+    "is_content_hashed": "mirror",
+    "local_path_for": "mirror",
+    "save_file": "mirror",
+    "save_with_url_structure": "mirror",
+    "HostThrottle": "ratelimit",
+    "HostThrottles": "ratelimit",
+    "ChunkTemplate": "runtime",
+    "RuntimeInfo": "runtime",
+    "chunk_urls": "runtime",
+    "extract_public_path": "runtime",
+    "guess_origin": "runtime",
+    "normalize_public_path": "runtime",
+    "parse_css_chunk_map": "runtime",
+    "parse_js_chunk_map": "runtime",
+    "parse_runtime": "runtime",
+}
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+__all__ = [
+    "BlobStore",
+    "ChunkTemplate",
+    "DownloadError",
+    "FetchPool",
+    "HostThrottle",
+    "HostThrottles",
+    "Journal",
+    "Metrics",
+    "Mirror",
+    "RuntimeInfo",
+    "atomic_write_bytes",
+    "chunk_urls",
+    "extract_public_path",
+    "guess_origin",
+    "http_get",
+    "http_get_bytes",
+    "is_content_hashed",
+    "local_path_for",
+    "new_session",
+    "normalize_public_path",
+    "parse_css_chunk_map",
+    "parse_js_chunk_map",
+    "parse_runtime",
+    "save_file",
+    "save_with_url_structure",
+    "stream_to_file",
+]
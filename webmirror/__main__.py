@@ -0,0 +1,719 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Command line for the mirroring library.
+
+  python3 -m webmirror serve --root jsb_web --port 8000
+  python3 -m webmirror rewrite --root jsb_web --public-path /jsb-wap/=/mirror/jsb-wap/
+  python3 -m webmirror dedupe --store blobs jsb_web fjii_web
+  python3 -m webmirror diff jsb/snapshots/<old> jsb/snapshots/<new>
+  python3 -m webmirror runtime jsb_web --origin https://jsb.notebookvip.cn --urls
+  python3 -m webmirror batch sites.json
+  python3 -m webmirror verify jsb_web --repair
+  python3 -m webmirror optimize jsb_web
+  python3 -m webmirror pack jsb_web --archive jsb.pack
+  python3 -m webmirror prefetch jsb_web
+  python3 -m webmirror index jsb_web -q /api/
+  python3 -m webmirror api jsb_web --list
+  python3 -m webmirror links jsb_web --origin https://jsb.notebookvip.cn -o missing.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+
+
+# -----------------------------
+# serve
+# -----------------------------
+def cmd_serve(args: argparse.Namespace) -> int:
+    from .serve import StaticSite, make_server
+
+    pack = None
+    if args.pack:
+        from .pack import PackArchive
+
+        try:
+            pack = PackArchive(args.pack)
+        except (OSError, ValueError) as e:
+            print(f"[!] {e}")
+            return 2
+        print(f"[+] Pack archive {args.pack}: {len(pack.files)} files")
+    site = StaticSite(
+        args.root,
+        cache_bytes=args.cache_mb * 1024 * 1024,
+        max_cached_file=args.max_cached_kb * 1024,
+        base=args.base,
+        pack=pack,
+        max_open_files=args.open_files,
+        use_sendfile=args.sendfile,
+    )
+    for prefix in args.spa if args.spa is not None else site.detect_spas():
+        site.add_spa(prefix)
+        print(f"[+] SPA fallback: {site.base}{prefix.rstrip('/')}/* -> index.html")
+    if args.precompress and pack is None:
+        n = site.precompress()
+        print(f"[+] Precompressed variants: {n} files")
+    n = site.scan_webp()
+    if n:
+        print(f"[+] WebP variants: {n} images")
+    if args.api or args.api_record:
+        from .apistub import ApiStub
+
+        site.api = ApiStub(
+            args.root,
+            store=args.api_fixtures,
+            upstream=args.api_record,
+            latency=args.api_latency / 1000,
+            jitter=args.api_jitter / 1000,
+            replay_latency=args.api_replay_latency,
+            default_body=args.api_default.encode("utf-8"),
+        )
+        mode = f"recording from {args.api_record}" if args.api_record else "replaying"
+        print(f"[+] API stub: {', '.join(site.api.bases)} ({len(site.api.endpoints)} endpoints, {mode} {site.api.store})")
+
+    httpd = make_server(site, args.host, args.port, quiet=args.quiet, early_hints=args.early_hints)
+    for prefix, hints in site.route_hints.items():
+        print(f"[+] Early hints: {prefix} ({len(hints.routes)} routes, {len(hints.entry)} entry files)")
+    print(f"[+] Serving {site.root} on http://{args.host}:{args.port}/")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        site.files.close()
+        if pack is not None:
+            pack.close()
+        if site.api is not None:
+            api = site.api
+            print(f"[+] API stub: {api.hits} replayed, {api.misses} defaulted, {api.recorded} recorded")
+    return 0
+
+
+def add_serve_parser(sub) -> None:
+    p = sub.add_parser("serve", help="Serve a mirrored tree locally (threaded, cached, precompressed).")
+    p.add_argument("--root", default="jsb_web", help="Folder to serve (default: jsb_web)")
+    p.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    p.add_argument("--port", type=int, default=8000, help="Port (default: 8000)")
+    p.add_argument("--cache-mb", type=int, default=64, help="In-memory file cache size in MB (default: 64)")
+    p.add_argument(
+        "--max-cached-kb",
+        type=int,
+        default=256,
+        help="Files up to this size are kept in the in-memory cache; larger ones are sent with "
+             "sendfile() from open, mapped files (default: 256)",
+    )
+    p.add_argument("--open-files", type=int, default=256, help="Large files kept open and mapped (default: 256)")
+    p.add_argument(
+        "--no-sendfile",
+        dest="sendfile",
+        action="store_false",
+        help="Copy large files from their mapping instead of os.sendfile() (e.g. on file systems "
+             "where sendfile misbehaves).",
+    )
+    p.add_argument(
+        "--no-precompress",
+        dest="precompress",
+        action="store_false",
+        help="Skip building gzip/brotli variants at startup.",
+    )
+    p.add_argument(
+        "--base",
+        default="",
+        help="URL prefix the tree is served under (e.g. /mirror after `rewrite`). Default: none.",
+    )
+    p.add_argument(
+        "--spa",
+        action="append",
+        metavar="PREFIX",
+        help="SPA prefix whose index.html answers unknown routes (repeatable). "
+             "Default: every top-level folder of --root that has an index.html.",
+    )
+    p.add_argument(
+        "--pack",
+        default="",
+        metavar="FILE",
+        help="Serve from this `pack --archive` file (sendfile, no per-request stat); "
+             "files missing from it still come from --root.",
+    )
+    p.add_argument(
+        "--no-early-hints",
+        dest="early_hints",
+        action="store_false",
+        help="Do not send 103 responses before SPA pages (some non-browser HTTP clients mistake "
+             "them for the final response); the Link header and <link> tags stay.",
+    )
+    p.add_argument(
+        "--api",
+        action="store_true",
+        help="Answer the API paths found by `api` from recorded fixtures (a local stub backend).",
+    )
+    p.add_argument(
+        "--api-record",
+        default="",
+        metavar="ORIGIN",
+        help="Forward API requests to this origin (e.g. https://jsb.notebookvip.cn) and record "
+             "the answers; recorded ones are replayed while it is unreachable. Implies --api.",
+    )
+    p.add_argument("--api-fixtures", default="", help="Fixtures folder (default: <root>/.api-fixtures)")
+    p.add_argument("--api-latency", type=float, default=0.0, metavar="MS", help="Delay every API response by MS.")
+    p.add_argument("--api-jitter", type=float, default=0.0, metavar="MS", help="... plus or minus up to MS.")
+    p.add_argument(
+        "--api-replay-latency",
+        action="store_true",
+        help="Delay each replayed response by the time the live backend took when it was recorded.",
+    )
+    p.add_argument(
+        "--api-default",
+        default='{"code":1,"msg":"","data":null}',
+        help="Body for known endpoints without a fixture (default: the app's empty success).",
+    )
+    p.add_argument("--quiet", action="store_true", help="Do not log each request.")
+    p.set_defaults(func=cmd_serve)
+
+
+# -----------------------------
+# rewrite
+# -----------------------------
+def parse_pair(s: str) -> tuple[str, str]:
+    old, sep, new = s.partition("=")
+    if not sep or not old:
+        raise argparse.ArgumentTypeError(f"expected OLD=NEW, got {s!r}")
+    return old, new
+
+
+def cmd_rewrite(args: argparse.Namespace) -> int:
+    from .rewrite import DEFAULT_PATTERNS, rewrite_tree
+
+    pairs: dict[str, str] = {}
+    if args.origin is not None:
+        old, new = args.origin
+        pairs[old.rstrip("/")] = new.rstrip("/")
+    if args.public_path is not None:
+        old, new = args.public_path
+        pairs["/" + old.strip("/") + "/"] = "/" + new.strip("/") + "/" if new.strip("/") else "/"
+    for old, new in args.map:
+        pairs[old] = new
+    if not pairs:
+        print("[-] Nothing to rewrite: give --origin, --public-path or --map.")
+        return 2
+
+    for old, new in pairs.items():
+        print(f"[+] {old!r} -> {new!r}")
+    changed = rewrite_tree(
+        args.root,
+        pairs,
+        out_root=args.out or None,
+        patterns=args.include or DEFAULT_PATTERNS,
+    )
+    for rel, n in sorted(changed.items()):
+        print(f"    {n:5d}  {rel}")
+    print(f"[+] Done. files changed={len(changed)}, replacements={sum(changed.values())}")
+    return 0
+
+
+def add_rewrite_parser(sub) -> None:
+    p = sub.add_parser(
+        "rewrite",
+        help="Rewrite publicPath / origin references in index.html, runtimes and CSS (single streaming pass).",
+    )
+    p.add_argument("--root", default="jsb_web", help="Mirrored tree (default: jsb_web)")
+    p.add_argument("--out", default="", help="Write rewritten files here instead of in place.")
+    p.add_argument(
+        "--public-path",
+        type=parse_pair,
+        metavar="OLD=NEW",
+        help="e.g. /jsb-wap/=/mirror/jsb-wap/ (rewrites r.p in the runtime and /jsb-wap/ URLs in HTML/CSS)",
+    )
+    p.add_argument(
+        "--origin",
+        type=parse_pair,
+        metavar="OLD=NEW",
+        help="e.g. https://jsb.notebookvip.cn= to make absolute links root-relative",
+    )
+    p.add_argument(
+        "--map",
+        type=parse_pair,
+        action="append",
+        default=[],
+        metavar="OLD=NEW",
+        help="Extra literal replacement (repeatable), e.g. /jsb-files/=/mirror/jsb-files/",
+    )
+    p.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="File name glob to process (repeatable). Default: *.html, runtime.*.js, *.css",
+    )
+    p.set_defaults(func=cmd_rewrite)
+
+
+# -----------------------------
+# dedupe
+# -----------------------------
+def cmd_dedupe(args: argparse.Namespace) -> int:
+    from .blobstore import BlobStore
+
+    store = BlobStore(args.store, mode=args.mode)
+    for root in args.roots:
+        n = store.ingest_tree(root)
+        print(f"[+] {root}: {n} files")
+    print(f"[+] Done. {store.summary()}, store={store.root}")
+    return 0
+
+
+def add_dedupe_parser(sub) -> None:
+    p = sub.add_parser(
+        "dedupe",
+        help="Move already-mirrored trees into a content-addressed blob store, leaving links behind.",
+    )
+    p.add_argument("roots", nargs="+", metavar="ROOT", help="Mirrored folders, e.g. jsb_web fjii_web")
+    p.add_argument("--store", required=True, help="Blob store folder (same filesystem for hard links)")
+    p.add_argument(
+        "--mode",
+        choices=("hardlink", "reflink", "copy"),
+        default="hardlink",
+        help="How files point at blobs (default: hardlink; falls back to reflink, then copy).",
+    )
+    p.set_defaults(func=cmd_dedupe)
+
+
+# -----------------------------
+# diff
+# -----------------------------
+def cmd_diff(args: argparse.Namespace) -> int:
+    from .snapshot import diff_chunks, find_runtime, format_diff, load_runtime_info
+
+    try:
+        old, new = find_runtime(args.old), find_runtime(args.new)
+    except ValueError as e:
+        print(f"[!] {e}")
+        return 2
+    print(f"[+] old: {old}")
+    print(f"[+] new: {new}")
+    d = diff_chunks(load_runtime_info(old), load_runtime_info(new))
+    print(format_diff(d, verbose=not args.summary))
+    return 0
+
+
+def add_diff_parser(sub) -> None:
+    p = sub.add_parser(
+        "diff",
+        help="List added / removed / changed chunks between two runtimes (offline).",
+    )
+    p.add_argument("old", help="runtime.*.js, or a snapshot / mirror folder containing exactly one")
+    p.add_argument("new", help="runtime.*.js, or a snapshot / mirror folder containing exactly one")
+    p.add_argument("--summary", action="store_true", help="Only print the counts.")
+    p.set_defaults(func=cmd_diff)
+
+
+# -----------------------------
+# runtime
+# -----------------------------
+def cmd_runtime(args: argparse.Namespace) -> int:
+    from .runtime import chunk_urls, normalize_public_path
+    from .snapshot import find_runtime, load_runtime_info
+
+    if args.urls and not args.origin:
+        print("[!] --urls needs --origin: the downloader only fetches full URLs")
+        return 2
+    try:
+        path = find_runtime(args.path)
+    except ValueError as e:
+        print(f"[!] {e}")
+        return 2
+    info = load_runtime_info(path)
+    public_path = normalize_public_path(args.public_path or info.public_path or "/")
+    urls = chunk_urls(args.origin, public_path, info)
+    if args.urls:
+        print("\n".join(urls))  # one per line: `download_images_keep_path.py --urls-file` reads this
+        return 0
+    print(f"[+] {path}")
+    print(f"[+] publicPath: {info.public_path or '(not found)'}")
+    for tpl in (info.js, info.css):
+        if tpl is not None:
+            named = f", {len(tpl.names)} named" if tpl.names else ""
+            print(f"[+] {tpl.kind}: {len(tpl.hashes)} chunks{named}")
+    print(f"[+] {len(urls)} chunk URLs (--urls to list them)")
+    return 0
+
+
+def add_runtime_parser(sub) -> None:
+    p = sub.add_parser(
+        "runtime",
+        help="Parse a saved webpack runtime.*.js: publicPath, chunk maps, chunk URLs (offline).",
+    )
+    p.add_argument("path", help="runtime.*.js, or a snapshot / mirror folder containing exactly one")
+    p.add_argument("--origin", default="", help="Prefix the URLs with this origin, e.g. https://jsb.notebookvip.cn")
+    p.add_argument("--public-path", default="", help="Override the runtime's publicPath.")
+    p.add_argument("--urls", action="store_true", help="Only print the chunk URLs, one per line (needs --origin).")
+    p.set_defaults(func=cmd_runtime)
+
+
+# -----------------------------
+# batch
+# -----------------------------
+def cmd_batch(args: argparse.Namespace) -> int:
+    import time
+
+    from .batch import format_results, load_config, run_batch, write_report
+
+    try:
+        cfg = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"[!] {e}")
+        return 2
+    if args.concurrency:
+        cfg.concurrency = args.concurrency
+    if args.report:
+        cfg.report = args.report
+    if args.metrics:
+        cfg.metrics = args.metrics
+    print(f"[+] {len(cfg.jobs)} jobs, concurrency {cfg.concurrency} (per host: {cfg.per_host}, {cfg.transport})")
+
+    t0 = time.perf_counter()
+    try:
+        results = run_batch(cfg, force=args.force, resume=args.resume, retry_failed=args.retry_failed)
+    except RuntimeError as e:  # http2 without httpx[h2]
+        print(f"[!] {e}")
+        return 2
+    report = write_report(cfg, results, seconds=time.perf_counter() - t0)
+    print(format_results(results))
+    print(f"[+] Report: {report}")
+    return 0 if all(r.exit_code == 0 for r in results) else 2
+
+
+def add_batch_parser(sub) -> None:
+    p = sub.add_parser(
+        "batch",
+        help="Mirror several sites from one JSON/YAML config on a shared connection pool.",
+    )
+    p.add_argument("config", help="Config file (.json, or .yaml/.yml with PyYAML), e.g. sites.json")
+    p.add_argument("--concurrency", type=int, default=0, help="Override the config's global worker budget.")
+    p.add_argument("--report", default="", help="Report path (default: the config's, or batch-report.json)")
+    p.add_argument(
+        "--metrics",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="Per-request timings to FILE (*.prom: Prometheus text format, else JSON lines); "
+             "replaces the config's \"metrics\" (repeatable).",
+    )
+    p.add_argument("--force", action="store_true", help="Re-download everything (webpack jobs).")
+    p.add_argument("--resume", action="store_true", help="Skip URLs each job's journal records as done.")
+    p.add_argument("--retry-failed", action="store_true", help="Only re-fetch each job's failed URLs, then stop.")
+    p.set_defaults(func=cmd_batch)
+
+
+# -----------------------------
+# verify
+# -----------------------------
+def cmd_verify(args: argparse.Namespace) -> int:
+    from .verify import format_report, repair, verify_tree
+
+    bad = 0
+    for root in args.roots:
+        report = verify_tree(root, origin=args.origin, jobs=args.jobs or None)
+        print(f"[+] {root}: {format_report(report)}")
+        if report.problems and args.repair:
+            from .pool import DEFAULT_USER_AGENT  # the HTTP stack, only to re-download
+
+            report = repair(
+                report,
+                user_agent=args.user_agent or DEFAULT_USER_AGENT,
+                concurrency=args.concurrency,
+                jobs=args.jobs or None,
+            )
+            print(f"[+] {root} after repair: {format_report(report)}")
+        bad += len(report.problems)
+    return 0 if bad == 0 else 2
+
+
+def add_verify_parser(sub) -> None:
+    p = sub.add_parser(
+        "verify",
+        help="Check a mirror against runtime chunk maps, journalled sizes/hashes and hashed file names.",
+    )
+    p.add_argument("roots", nargs="+", metavar="ROOT", help="Mirrored folders, e.g. jsb_web fjii_web")
+    p.add_argument("--jobs", type=int, default=0, help="Worker processes (default: one per CPU)")
+    p.add_argument("--repair", action="store_true", help="Re-download missing / broken files, then check them again.")
+    p.add_argument(
+        "--origin",
+        default="",
+        help="Site origin for chunks the journal has no URL for, e.g. https://jsb.notebookvip.cn "
+             "(default: taken from the runtime's journalled URL).",
+    )
+    p.add_argument("--user-agent", default="", help="User-Agent for --repair")
+    p.add_argument("--concurrency", type=int, default=4, help="Download workers for --repair (default: 4)")
+    p.set_defaults(func=cmd_verify)
+
+
+# -----------------------------
+# optimize
+# -----------------------------
+def cmd_optimize(args: argparse.Namespace) -> int:
+    from .optimize import optimize_tree
+
+    errors = 0
+    for root in args.roots:
+        report = optimize_tree(root, jobs=args.jobs or None, webp=args.webp)
+        print(f"[+] {root}: {report.summary()}")
+        for err in report.errors:
+            print(f"[!] {err}")
+        errors += len(report.errors)
+    return 0 if errors == 0 else 2
+
+
+def add_optimize_parser(sub) -> None:
+    p = sub.add_parser(
+        "optimize",
+        help="Recompress mirrored PNG/JPEG files losslessly and write .webp variants for `serve`.",
+    )
+    p.add_argument("roots", nargs="+", metavar="ROOT", help="Mirrored folders, e.g. jsb_web")
+    p.add_argument("--jobs", type=int, default=0, help="Worker processes (default: one per CPU)")
+    p.add_argument("--no-webp", dest="webp", action="store_false", help="Only recompress; no .webp variants.")
+    p.set_defaults(func=cmd_optimize)
+
+
+# -----------------------------
+# pack
+# -----------------------------
+def cmd_pack(args: argparse.Namespace) -> int:
+    from .pack import pack_tree
+
+    report = pack_tree(args.root, jobs=args.jobs or None, archive=args.archive)
+    print(f"[+] {args.root}: {report.summary()}")
+    return 0
+
+
+def add_pack_parser(sub) -> None:
+    p = sub.add_parser(
+        "pack",
+        help="Write .gz/.br siblings of text assets (incremental), optionally one archive for `serve --pack`.",
+    )
+    p.add_argument("root", help="Mirrored folder, e.g. jsb_web")
+    p.add_argument("--archive", default="", metavar="FILE", help="Also write an indexed archive of the tree.")
+    p.add_argument("--jobs", type=int, default=0, help="Compression threads (default: one per CPU)")
+    p.set_defaults(func=cmd_pack)
+
+
+# -----------------------------
+# prefetch
+# -----------------------------
+def cmd_prefetch(args: argparse.Namespace) -> int:
+    import os
+
+    from .prefetch import RouteHints, write_manifest
+
+    spas = [args.root] if os.path.isfile(os.path.join(args.root, "index.html")) else [
+        os.path.join(args.root, name)
+        for name in sorted(os.listdir(args.root))
+        if os.path.isfile(os.path.join(args.root, name, "index.html"))
+    ]
+    if not spas:
+        print(f"[-] No index.html in {args.root} or its top-level folders.")
+        return 2
+    for spa in spas:
+        try:
+            path, manifest = write_manifest(spa)
+        except (OSError, ValueError) as e:
+            print(f"[!] {spa}: {e}")
+            return 2
+        routes = manifest["routes"]
+        lazy = [r for r in routes if r["preload"]]
+        files = sum(len(r["preload"]) for r in lazy)
+        print(
+            f"[+] {spa}: {len(routes)} routes ({len(lazy)} with lazy chunks, "
+            f"{files / max(1, len(lazy)):.1f} files each), {len(manifest['entry'])} entry files -> {path}"
+        )
+        for url_path in args.show:
+            hints = RouteHints(manifest).match(url_path)
+            print(f"    {url_path} -> route {hints.route or '(none)'}")
+            print(f"    Link: {hints.link_header()}")
+            print(f"    {hints.html()}")
+    return 0
+
+
+def add_prefetch_parser(sub) -> None:
+    p = sub.add_parser(
+        "prefetch",
+        help="Build per-route preload/prefetch hints from the chunk graph, for `serve` (103 Early Hints).",
+    )
+    p.add_argument("root", help="Mirrored SPA folder, or a tree with SPA folders (e.g. jsb_web)")
+    p.add_argument(
+        "--show",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="Print the hints for a route below the SPA folder, e.g. /Heroes/ArticleRank/1 (repeatable).",
+    )
+    p.set_defaults(func=cmd_prefetch)
+
+
+# -----------------------------
+# index
+# -----------------------------
+def cmd_index(args: argparse.Namespace) -> int:
+    import time
+
+    from .codeindex import KINDS, CodeIndex
+
+    with CodeIndex(args.root, args.db) as index:
+        if args.update:
+            print(f"[+] {index.path}: {index.update(jobs=args.jobs or None).summary()}")
+        for query in args.query:
+            t0 = time.perf_counter()
+            hits = index.search(query, mode=args.mode, kinds=tuple(args.kind or KINDS), limit=args.limit)
+            ms = (time.perf_counter() - t0) * 1000
+            print(f"[+] {query!r} ({args.mode}): {len(hits)} files in {ms:.1f} ms")
+            for hit in hits:
+                terms = ", ".join(f"{term} x{n}" if n > 1 else term for term, _, n in hit.terms[:5])
+                more = f" (+{len(hit.terms) - 5} more)" if len(hit.terms) > 5 else ""
+                print(f"    {hit.count:5d}  {hit.path}  {terms}{more}")
+                if args.context:
+                    for snippet in index.context(hit.path, hit.terms[0][0]):
+                        print(f"           ...{snippet}...")
+    return 0
+
+
+def add_index_parser(sub) -> None:
+    p = sub.add_parser(
+        "index",
+        help="Build / update a persistent index of strings, URLs and identifiers in the JS/CSS/HTML, and query it.",
+    )
+    p.add_argument("root", help="Mirrored folder, e.g. jsb_web")
+    p.add_argument("-q", "--query", action="append", default=[], help="Find files with a matching term (repeatable).")
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--exact", dest="mode", action="store_const", const="exact", help="Whole terms only.")
+    mode.add_argument("--prefix", dest="mode", action="store_const", const="prefix", help="Terms starting with QUERY.")
+    mode.add_argument("--regex", dest="mode", action="store_const", const="regex", help="QUERY is a Python regex.")
+    p.set_defaults(mode="substring")
+    p.add_argument(
+        "--kind",
+        action="append",
+        choices=("str", "url", "ident"),
+        help="Only match terms of this kind (repeatable). Default: all.",
+    )
+    p.add_argument("--context", action="store_true", help="Show where the first matching term occurs in each file.")
+    p.add_argument("--limit", type=int, default=0, help="At most this many files per query.")
+    p.add_argument("--db", default="", help="Index file (default: <root>/.codeindex.sqlite3)")
+    p.add_argument("--no-update", dest="update", action="store_false", help="Query the index as it is.")
+    p.add_argument("--jobs", type=int, default=0, help="Tokenizer processes (default: one per CPU)")
+    p.set_defaults(func=cmd_index)
+
+
+# -----------------------------
+# api
+# -----------------------------
+def cmd_api(args: argparse.Namespace) -> int:
+    import os
+
+    from .apistub import FIXTURES_NAME, write_manifest
+
+    path, manifest = write_manifest(args.root)
+    endpoints = manifest["endpoints"]
+    shaped = sum(1 for e in endpoints if e["fields"])
+    print(f"[+] {path}: {len(endpoints)} endpoints under {', '.join(manifest['bases']) or '-'}, "
+          f"{shaped} with request fields from call sites")
+    store = os.path.join(args.root, FIXTURES_NAME)
+    recorded = {
+        "/" + os.path.relpath(os.path.dirname(dirpath), store).replace(os.sep, "/")
+        for dirpath, _, files in os.walk(store) if files
+    }
+    if endpoints:
+        print(f"[+] Recorded: {sum(1 for e in endpoints if e['path'] in recorded)} of them ({store})")
+    if args.list:
+        for e in endpoints:
+            mark = "*" if e["path"] in recorded else " "
+            method = e["method"] or "(default)"
+            fmt = f" [{e['format']}]" if e["format"] else ""
+            print(f"  {mark} {method:9s} {e['path']}{fmt}  {e['name']}({', '.join(e['fields'])})")
+    return 0
+
+
+def add_api_parser(sub) -> None:
+    p = sub.add_parser(
+        "api",
+        help="Extract the SPA's API endpoints and request shapes into <root>/.api.json for `serve --api`.",
+    )
+    p.add_argument("root", help="Mirrored folder, e.g. jsb_web")
+    p.add_argument("--list", action="store_true", help="Print every endpoint (* = has recorded responses).")
+    p.set_defaults(func=cmd_api)
+
+
+# -----------------------------
+# links
+# -----------------------------
+def cmd_links(args: argparse.Namespace) -> int:
+    from .linkcheck import check_links, write_graph, write_missing
+
+    if args.output and not args.origin:
+        print("[!] -o needs --origin: the downloader only fetches full URLs")
+        return 2
+    report = check_links(args.root, origin=args.origin, hosts=tuple(args.host), jobs=args.jobs or None)
+    print(f"[+] {args.root}: {report.summary()}")
+    for url in sorted(report.missing):
+        sources = report.missing[url]
+        more = f" (+{len(sources) - 3} more)" if len(sources) > 3 else ""
+        print(f"  [!] {report.display(url)}  <- {', '.join(sources[:3])}{more}")
+    if args.output:
+        write_missing(report, args.output)
+        print(f"[+] {len(report.missing)} missing URL(s) -> {args.output}")
+    if args.graph:
+        write_graph(report, args.graph)
+        print(f"[+] reference graph -> {args.graph}")
+    return 0 if not report.missing else 2
+
+
+def add_links_parser(sub) -> None:
+    p = sub.add_parser(
+        "links",
+        help="Resolve every reference in a mirror (HTML, CSS url(), runtime chunks, bundles) against the tree.",
+    )
+    p.add_argument("root", help="Mirrored folder, e.g. jsb_web")
+    p.add_argument(
+        "--origin",
+        default="",
+        help="Origin the tree was mirrored from, e.g. https://jsb.notebookvip.cn "
+             "(default: none, missing references are listed as /paths; the downloader needs full URLs).",
+    )
+    p.add_argument(
+        "--host",
+        action="append",
+        default=[],
+        help="Further host whose assets are kept in the same tree (repeatable), e.g. g.alicdn.com",
+    )
+    p.add_argument("-o", "--output", default="", help="Write the missing URLs here (needs --origin), for download_images_keep_path.py --urls-file ... --no-host")
+    p.add_argument("--graph", default="", help="Write the reference graph: *.dot for Graphviz, JSON otherwise")
+    p.add_argument("--jobs", type=int, default=0, help="Worker processes (default: one per CPU)")
+    p.set_defaults(func=cmd_links)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python3 -m webmirror")
+    sub = ap.add_subparsers(dest="command", required=True)
+    add_serve_parser(sub)
+    add_rewrite_parser(sub)
+    add_dedupe_parser(sub)
+    add_diff_parser(sub)
+    add_runtime_parser(sub)
+    add_batch_parser(sub)
+    add_verify_parser(sub)
+    add_optimize_parser(sub)
+    add_pack_parser(sub)
+    add_prefetch_parser(sub)
+    add_index_parser(sub)
+    add_api_parser(sub)
+    add_links_parser(sub)
+    return ap
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+
+"""
+API endpoints of a mirrored SPA, and a local stub backend that replays them.
+
+  python3 -m webmirror api jsb_web                       # extract -> jsb_web/.api.json
+  python3 -m webmirror serve --root jsb_web --api-record https://jsb.notebookvip.cn
+  python3 -m webmirror serve --root jsb_web --api --api-latency 80 --api-jitter 40
+
+Extraction (offline, from the downloaded chunks):
+
+  endpoints  API tables such as
+               task:{queryMyData:{url:"task/queryMyData",dataFormat:"form"},
+                     ...:{url:"api/...",method:"get",baseurl:"/yundb/"}}
+             -> name "task.queryMyData", path base + url, method / body
+             format when given (None: whatever the app's request wrapper
+             defaults to)
+  base       axios' defaults.baseURL="/jsb-api" (per-entry baseurl wins)
+  fields     request shapes from the call sites, x.task.queryMyData({id:1,
+             pageNum:n}): the keys of object literals passed to the call
+
+With --api, `serve` answers every request below an API base from
+<root>/.api-fixtures/<path>/<METHOD>/<key>.json, where key hashes the query
+string and the (JSON or form) body with sorted keys; a request with no
+exact fixture gets the endpoint's most recently recorded one, and an
+endpoint with none gets --api-default (the app's "success, no data"). Hits
+and misses are kept in memory, so a load test reads each fixture once.
+--api-record ORIGIN forwards requests to the live backend instead and
+records each answer (status < 500) with its upstream time. Every response
+can be delayed: --api-latency/--api-jitter, or the recorded time with
+--api-replay-latency.
+"""
+
+from __future__ import annotations
+
+import base64
+import bisect
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from urllib.parse import parse_qsl, urlsplit
+
+from .fsutil import atomic_write_bytes
+
+
+MANIFEST_NAME = ".api.json"
+FIXTURES_NAME = ".api-fixtures"
+DEFAULT_BODY = b'{"code":1,"msg":"","data":null}'
+
+_STR = r"""(?:"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')"""
+_NAME = r"[A-Za-z_$][\w$]*"
+# name:{url:"...",method:"get",...} - flat, literal options only
+ENDPOINT_RE = re.compile(
+    rf"(?<![\w$])(?P<name>{_NAME}):\{{url:(?P<url>{_STR})(?P<opts>(?:,{_NAME}:(?:{_STR}|!?[\w$.]+))*)\}}"
+)
+OPTION_RE = re.compile(rf",({_NAME}):({_STR}|!?[\w$.]+)")
+# group:{a:{url:...},b:{url:...}}
+GROUP_RE = re.compile(rf"(?<![\w$])(?P<group>{_NAME}):\{{(?:{_NAME}:\{{url:[^{{}}]*\}},?)+\}}")
+BASE_RE = re.compile(rf"defaults\.baseURL\s*=\s*({_STR})")
+CALL_RE = re.compile(rf"\.({_NAME})\.({_NAME})\(")
+# inside a call's arguments: strings (skipped), brackets, and `{key:` / `,key:`
+ARGS_RE = re.compile(rf"{_STR}|[{{}}\[\]()]|(?<=[{{,])\s*(?:({_NAME})|({_STR}))\s*:")
+
+
+def _unquote(lit: str) -> str:
+    return lit[1:-1]
+
+
+def _literal(opts: dict[str, str], key: str) -> str | None:
+    """The string value of an endpoint option, None when absent or computed."""
+    v = opts.get(key, "")
+    return _unquote(v) if v.startswith(('"', "'")) else None
+
+
+# -----------------------------
+# Extraction
+# -----------------------------
+@dataclass
+class Endpoint:
+    name: str
+    path: str
+    method: str | None = None
+    format: str | None = None
+    fields: list[str] = field(default_factory=list)
+    files: list[str] = field(default_factory=list)
+
+
+def _call_fields(text: str, pos: int) -> set[str]:
+    """Keys of the object literals passed to the call whose "(" ends at pos."""
+    keys: set[str] = set()
+    stack = ["("]
+    for m in ARGS_RE.finditer(text, pos, min(len(text), pos + 2000)):
+        tok = m.group()
+        if m.group(1) or m.group(2):
+            if stack[-1] == "{" and len(stack) >= 2 and stack[-2] == "(":
+                keys.add(m.group(1) or _unquote(m.group(2)))
+        elif tok[0] in "\"'":
+            continue
+        elif tok in "([{":
+            stack.append(tok)
+        else:
+            stack.pop()
+            if not stack:
+                break
+    return keys
+
+
+def extract_endpoints(root: str) -> tuple[list[str], list[Endpoint]]:
+    """(API bases, endpoints) found in the JS under root."""
+    texts: dict[str, str] = {}
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.endswith(".js"):
+                path = os.path.join(dirpath, name)
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    texts[os.path.relpath(path, root).replace(os.sep, "/")] = f.read()
+
+    default_base = "/"
+    for text in texts.values():
+        m = BASE_RE.search(text)
+        if m:
+            default_base = _unquote(m.group(1))
+            break
+
+    found: dict[str, Endpoint] = {}
+    for rel, text in texts.items():
+        groups = [(m.start(), m.end(), m.group("group")) for m in GROUP_RE.finditer(text)]
+        starts = [g[0] for g in groups]
+        for m in ENDPOINT_RE.finditer(text):
+            i = bisect.bisect_right(starts, m.start()) - 1
+            group = groups[i][2] if i >= 0 and groups[i][1] >= m.end() else ""
+            opts = {k.lower(): v for k, v in OPTION_RE.findall(m.group("opts"))}
+            url = _unquote(m.group("url"))
+            if not url:  # share / link options, not a request
+                continue
+            base = _literal(opts, "baseurl") or default_base
+            if re.match(r"^[a-z][a-z0-9+.-]*://", url, re.I):
+                path = urlsplit(url).path or "/"
+            else:
+                path = "/" + base.strip("/") + "/" + url.lstrip("/") if base.strip("/") else "/" + url.lstrip("/")
+            name = f"{group}.{m.group('name')}" if group else m.group("name")
+            ep = found.setdefault(name, Endpoint(name, path))
+            method = _literal(opts, "method")
+            if method:
+                ep.method = method.upper()
+            ep.format = _literal(opts, "dataformat") or ep.format
+            if rel not in ep.files:
+                ep.files.append(rel)
+
+    # request shapes from call sites: x.group.name({...})
+    for rel, text in texts.items():
+        for m in CALL_RE.finditer(text):
+            ep = found.get(f"{m.group(1)}.{m.group(2)}")
+            if ep is None:
+                continue
+            ep.fields = sorted(set(ep.fields) | _call_fields(text, m.end()))
+            if rel not in ep.files:
+                ep.files.append(rel)
+
+    endpoints = sorted(found.values(), key=lambda e: e.path)
+    bases = sorted({"/" + e.path.strip("/").split("/", 1)[0] + "/" for e in endpoints})
+    return bases, endpoints
+
+
+def write_manifest(root: str) -> tuple[str, dict]:
+    bases, endpoints = extract_endpoints(root)
+    manifest = {"bases": bases, "endpoints": [asdict(e) for e in endpoints]}
+    path = os.path.join(root, MANIFEST_NAME)
+    atomic_write_bytes(path, json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+    return path, manifest
+
+
+def load_manifest(root: str) -> dict:
+    """<root>/.api.json, extracting it first if there is none."""
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return write_manifest(root)[1]
+
+
+# -----------------------------
+# Stub backend
+# -----------------------------
+@dataclass
+class Fixture:
+    status: int
+    content_type: str
+    body: bytes
+    elapsed: float = 0.0
+
+    def to_json(self) -> bytes:
+        try:
+            text, encoding = self.body.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(self.body).decode("ascii"), "base64"
+        return json.dumps({
+            "status": self.status,
+            "content_type": self.content_type,
+            "elapsed": round(self.elapsed, 4),
+            "encoding": encoding,
+            "body": text,
+        }, ensure_ascii=False).encode("utf-8")
+
+    @classmethod
+    def from_json(cls, data: bytes) -> Fixture:
+        d = json.loads(data)
+        body = base64.b64decode(d["body"]) if d.get("encoding") == "base64" else d["body"].encode("utf-8")
+        return cls(d["status"], d["content_type"], body, d.get("elapsed", 0.0))
+
+
+def request_key(query: str, body: bytes, content_type: str) -> str:
+    """Hash of a request's parameters, independent of key order."""
+    params: object = sorted(parse_qsl(query, keep_blank_values=True))
+    payload: object = body.decode("utf-8", errors="replace")
+    if body and "json" in content_type:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            pass
+    elif body and "x-www-form-urlencoded" in content_type:
+        payload = sorted(parse_qsl(payload, keep_blank_values=True))
+    canonical = json.dumps([params, payload], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+# request headers not passed on to the live backend when recording
+HOP_HEADERS = frozenset((
+    "host", "connection", "keep-alive", "proxy-connection", "te", "trailer",
+    "transfer-encoding", "upgrade", "accept-encoding", "content-length",
+))
+
+
+class ApiStub:
+    """
+    Answers requests below the manifest's API bases from recorded fixtures.
+
+    - store: fixtures folder (default: <root>/.api-fixtures)
+    - upstream: origin to forward to and record from (e.g. https://jsb.notebookvip.cn)
+    - latency / jitter: seconds added to every response (uniform +/- jitter)
+    - replay_latency: delay each response by its recorded upstream time instead
+    """
+
+    def __init__(
+        self,
+        root: str,
+        *,
+        store: str = "",
+        upstream: str = "",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        replay_latency: bool = False,
+        default_body: bytes = DEFAULT_BODY,
+        user_agent: str = "",
+    ) -> None:
+        manifest = load_manifest(root)
+        self.bases = tuple(manifest["bases"])
+        self.endpoints = {e["path"]: e for e in manifest["endpoints"]}
+        self.store = store or os.path.join(root, FIXTURES_NAME)
+        self.upstream = upstream.rstrip("/")
+        self.latency = latency
+        self.jitter = jitter
+        self.replay_latency = replay_latency
+        self.default_body = default_body
+        self.user_agent = user_agent
+        # (method, path, key) -> fixture or None; (method, path) -> latest recorded
+        self.cache: dict[tuple, Fixture | None] = {}
+        self._lock = threading.Lock()
+        self._session = None
+        self.hits = self.misses = self.recorded = 0
+
+    def handles(self, path: str) -> bool:
+        return path.startswith(self.bases)
+
+    def _dir(self, method: str, path: str) -> str:
+        parts = [p for p in path.split("/") if p and p not in (".", "..")]
+        return os.path.join(self.store, *parts, method)
+
+    def _load(self, method: str, path: str, key: str) -> Fixture | None:
+        ck = (method, path, key)
+        with self._lock:
+            if ck in self.cache:
+                return self.cache[ck]
+        folder = self._dir(method, path)
+        fixture = None
+        try:
+            if key:
+                with open(os.path.join(folder, key + ".json"), "rb") as f:
+                    fixture = Fixture.from_json(f.read())
+            else:
+                names = sorted(os.listdir(folder), key=lambda n: os.stat(os.path.join(folder, n)).st_mtime_ns)
+                if names:
+                    with open(os.path.join(folder, names[-1]), "rb") as f:
+                        fixture = Fixture.from_json(f.read())
+        except (OSError, ValueError, KeyError):
+            fixture = None
+        with self._lock:
+            self.cache[ck] = fixture
+        return fixture
+
+    def record(self, method: str, path: str, key: str, fixture: Fixture) -> None:
+        folder = self._dir(method, path)
+        os.makedirs(folder, exist_ok=True)
+        atomic_write_bytes(os.path.join(folder, key + ".json"), fixture.to_json())
+        with self._lock:
+            self.cache[(method, path, key)] = fixture
+            self.cache[(method, path, "")] = fixture
+            self.recorded += 1
+
+    def forward(self, method: str, target: str, headers: dict[str, str], body: bytes) -> Fixture:
+        if self._session is None:
+            from .fetch import new_session
+
+            self._session = new_session(self.user_agent or "webmirror")
+        t0 = time.perf_counter()
+        r = self._session.request(
+            method,
+            self.upstream + target,
+            headers={k: v for k, v in headers.items() if k.lower() not in HOP_HEADERS},
+            data=body or None,
+            timeout=30,
+            allow_redirects=False,
+        )
+        return Fixture(
+            r.status_code,
+            r.headers.get("Content-Type", "application/octet-stream"),
+            r.content,
+            time.perf_counter() - t0,
+        )
+
+    def respond(self, method: str, target: str, headers: dict[str, str], body: bytes) -> Fixture:
+        """The response to one API request (after the configured delay)."""
+        parts = urlsplit(target)
+        key = request_key(parts.query, body, headers.get("Content-Type", ""))
+        fixture = None
+        if self.upstream:
+            try:
+                fixture = self.forward(method, target, headers, body)
+            except Exception as e:  # the live backend is down: fall back to what was recorded
+                print(f"[!] {method} {target}: {e}")
+            else:
+                if fixture.status < 500:
+                    self.record(method, parts.path, key, fixture)
+                else:
+                    fixture = None
+        if fixture is None:
+            fixture = self._load(method, parts.path, key) or self._load(method, parts.path, "")
+            with self._lock:
+                if fixture is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        if fixture is None:
+            if parts.path in self.endpoints:
+                fixture = Fixture(200, "application/json;charset=UTF-8", self.default_body)
+            else:
+                fixture = Fixture(404, "application/json;charset=UTF-8", b'{"code":404,"msg":"not in .api.json"}')
+
+        delay = fixture.elapsed if self.replay_latency else self.latency
+        if self.jitter:
+            delay += random.uniform(-self.jitter, self.jitter)
+        if delay > 0 and not self.upstream:
+            time.sleep(delay)
+        return fixture
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+"""
+Batch runs: mirror several sites in one process from a JSON (or YAML) file.
+
+  {
+    "concurrency": 8,              # global worker budget, shared by all jobs
+    "per_host": 6,
+    "rate": 0,
+    "transport": "requests",       # or "http2" (httpx[h2])
+    "user_agent": "...",           # default for jobs that set none
+    "blob_store": "blobs",         # optional, shared by all jobs
+    "report": "batch-report.json",
+    "metrics": ["metrics.jsonl", "webmirror.prom"],  # optional, see metrics.py
+    "jobs": [
+      {"name": "jsb", "runtime_url": "https://.../runtime.<hash>.js", "out": "jsb",
+       "public_path": "/jsb-wap/", "discover": true, "snapshot": true},
+      {"name": "imgs", "type": "urls", "urls_file": "image_urls.txt", "out": "imgs"}
+    ]
+  }
+
+Jobs are "webpack" (default; the keys of jobs.WebpackJob) or "urls" (a
+"urls" list and/or a "urls_file"). Relative paths are taken relative to
+the config file. All jobs run side by side on one FetchPool, so they share
+keep-alive connections, the worker budget and per-host limits; the report
+lists every job's counts, timing and failed URLs.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+
+from .blobstore import BlobStore
+from .fsutil import atomic_write_bytes
+from .jobs import JobResult, UrlListJob, WebpackJob, read_url_list, run_url_list, run_webpack
+from .metrics import Metrics
+from .pool import DEFAULT_USER_AGENT, FetchPool
+from .transport import TRANSPORTS
+
+try:
+    import yaml
+except ImportError:  # optional: only needed for .yaml/.yml configs
+    yaml = None
+
+
+JOB_TYPES = ("webpack", "urls")
+REPORT_NAME = "batch-report.json"
+
+
+@dataclass
+class BatchConfig:
+    jobs: list[WebpackJob | UrlListJob]
+    concurrency: int = 4
+    per_host: int = 6
+    rate: float | None = None
+    transport: str = "requests"
+    blob_store: str = ""
+    report: str = REPORT_NAME
+    metrics: list[str] = field(default_factory=list)
+    path: str = ""
+
+
+# -----------------------------
+# Config
+# -----------------------------
+def _read_config(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        if yaml is None:
+            raise ValueError(f"{path}: YAML configs need PyYAML (pip install pyyaml), or use JSON")
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+    if not isinstance(data, dict) or not isinstance(data.get("jobs"), list):
+        raise ValueError(f"{path}: expected an object with a \"jobs\" list")
+    return data
+
+
+def _job(raw: dict, idx: int, *, base: str, user_agent: str) -> WebpackJob | UrlListJob:
+    if not isinstance(raw, dict):
+        raise ValueError(f"job #{idx}: expected an object")
+    raw = dict(raw)
+    kind = raw.pop("type", "webpack")
+    if kind not in JOB_TYPES:
+        raise ValueError(f"job #{idx}: type must be one of {', '.join(JOB_TYPES)}, not {kind!r}")
+    if "out" not in raw:
+        raise ValueError(f"job #{idx}: missing \"out\"")
+    raw["out"] = os.path.join(base, raw["out"])
+    raw.setdefault("user_agent", user_agent)
+
+    if kind == "urls":
+        urls = list(raw.pop("urls", []))
+        urls_file = raw.pop("urls_file", "")
+        if urls_file:
+            urls += read_url_list(os.path.join(base, urls_file))
+        if not urls:
+            raise ValueError(f"job #{idx}: \"urls\" job needs \"urls\" or \"urls_file\"")
+        raw["urls"] = urls
+        cls = UrlListJob
+    else:
+        if "runtime_url" not in raw:
+            raise ValueError(f"job #{idx}: missing \"runtime_url\"")
+        cls = WebpackJob
+
+    known = {f.name for f in fields(cls)}
+    unknown = sorted(set(raw) - known)
+    if unknown:
+        raise ValueError(f"job #{idx}: unknown keys for a {kind} job: {', '.join(unknown)}")
+    raw.setdefault("name", os.path.basename(os.path.normpath(raw["out"])))
+    return cls(**raw)
+
+
+def load_config(path: str) -> BatchConfig:
+    data = _read_config(path)
+    base = os.path.dirname(os.path.abspath(path))
+    user_agent = data.get("user_agent") or DEFAULT_USER_AGENT
+    jobs = [_job(raw, i, base=base, user_agent=user_agent) for i, raw in enumerate(data["jobs"], 1)]
+    if not jobs:
+        raise ValueError(f"{path}: no jobs")
+
+    seen: dict[str, str] = {}
+    for job in jobs:
+        out = os.path.abspath(job.out)
+        if out in seen:
+            raise ValueError(f"jobs {seen[out]!r} and {job.name!r} write to the same folder {job.out}")
+        seen[out] = job.name
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("job names must be unique")
+
+    transport = data.get("transport") or "requests"
+    if transport not in TRANSPORTS:
+        raise ValueError(f"{path}: transport must be one of {', '.join(TRANSPORTS)}, not {transport!r}")
+    blob_store = data.get("blob_store") or ""
+    metrics = data.get("metrics") or []
+    if isinstance(metrics, str):
+        metrics = [metrics]
+    return BatchConfig(
+        jobs,
+        concurrency=max(1, int(data.get("concurrency", 4))),
+        per_host=max(1, int(data.get("per_host", 6))),
+        rate=data.get("rate") or None,
+        transport=transport,
+        blob_store=os.path.join(base, blob_store) if blob_store else "",
+        report=os.path.join(base, data.get("report") or REPORT_NAME),
+        metrics=[os.path.join(base, p) for p in metrics],
+        path=path,
+    )
+
+
+# -----------------------------
+# Run
+# -----------------------------
+_print_lock = threading.Lock()
+
+
+def _logger(name: str):
+    def log(msg: str) -> None:
+        # "[+] Fetch runtime: ..." -> "[+] jsb: Fetch runtime: ..."
+        head, sep, rest = msg.partition("] ")
+        line = f"{head}{sep}{name}: {rest}" if sep and head.lstrip().startswith("[") else f"    {name}: {msg.strip()}"
+        with _print_lock:
+            print(line)
+    return log
+
+
+def run_batch(
+    cfg: BatchConfig,
+    *,
+    force: bool = False,
+    resume: bool = False,
+    retry_failed: bool = False,
+) -> list[JobResult]:
+    """Run every job on one shared FetchPool; returns results in config order."""
+    pool = FetchPool(
+        concurrency=cfg.concurrency,
+        per_host=cfg.per_host,
+        rate=cfg.rate,
+        inline=False,
+        transport=cfg.transport,
+        metrics=Metrics(cfg.metrics),
+    )
+    store = BlobStore(cfg.blob_store) if cfg.blob_store else None
+
+    def drive(job: WebpackJob | UrlListJob) -> JobResult:
+        t0 = time.perf_counter()
+        log = _logger(job.name)
+        try:
+            if isinstance(job, UrlListJob):
+                return run_url_list(job, pool=pool, retry_failed=retry_failed, store=store, log=log)
+            return run_webpack(
+                job, pool=pool, force=force, resume=resume, retry_failed=retry_failed, store=store, log=log
+            )
+        except Exception as e:  # one broken site must not take the others down
+            log(f"[!] {type(e).__name__}: {e}")
+            return JobResult(job.name, job.out, seconds=time.perf_counter() - t0, error=f"{type(e).__name__}: {e}")
+
+    # job drivers only parse runtimes and wait on futures; the fetching
+    # itself happens on the pool's workers, within the global budget
+    try:
+        with ThreadPoolExecutor(max_workers=len(cfg.jobs), thread_name_prefix="webmirror-job") as ex:
+            results = list(ex.map(drive, cfg.jobs))
+    finally:
+        pool.close()
+        if store is not None:
+            store.close()
+            print(f"[+] Blob store {store.root}: {store.summary()}")
+    print(pool.metrics.summary())
+    for path in cfg.metrics:
+        print(f"[+] Metrics: {path}")
+    return results
+
+
+def write_report(cfg: BatchConfig, results: list[JobResult], *, seconds: float) -> str:
+    report = {
+        "config": os.path.abspath(cfg.path),
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seconds": round(seconds, 3),
+        "concurrency": cfg.concurrency,
+        "ok": sum(r.ok for r in results),
+        "skipped": sum(r.skipped for r in results),
+        "fail": sum(r.fail for r in results),
+        "jobs": [dict(asdict(r), seconds=round(r.seconds, 3)) for r in results],
+    }
+    atomic_write_bytes(cfg.report, json.dumps(report, indent=1, ensure_ascii=False).encode("utf-8"))
+    return cfg.report
+
+
+def format_results(results: list[JobResult]) -> str:
+    w = max([len(r.name) for r in results] + [3])
+    lines = [f"{'job':<{w}}  {'ok':>6} {'cached':>6} {'fail':>5} {'secs':>7}  out"]
+    for r in results:
+        line = f"{r.name:<{w}}  {r.ok:>6} {r.skipped:>6} {r.fail:>5} {r.seconds:>7.1f}  {r.out}"
+        if r.error:
+            line += f"  ERROR {r.error}"
+        lines.append(line)
+    return "\n".join(lines)
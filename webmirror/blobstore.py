@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+"""
+Content-addressed blob store shared by several mirrors and snapshots.
+
+Bodies are stored once, as <store>/sha256/ab/cdef..., and the URL layout
+(jsb_web/jsb-wap/static/js/..., imgs/img01.yzcdn.cn/vant/...) gets a hard
+link to the blob - or a reflink (btrfs/XFS) or plain copy when hard links
+are not possible. Vendor chunks and images that are byte-identical across
+sites and releases then take disk space once, and a body that is already
+in the store is never written a second time.
+
+The store also keeps url-index.jsonl, {url: sha256} for content-hashed
+URLs (12.d09be060270abc1839bd.js can never change), so a fresh snapshot
+links those straight from the store without a request.
+
+Links are swapped in with os.replace, like every other write in this
+package. Tools that change mirrored files (`webmirror rewrite`) also write
+a new file and replace, so they break the link instead of editing the
+shared blob.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import BinaryIO
+
+from .fsutil import atomic_write_bytes, commit_temp, ensure_parent, open_temp
+
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+
+
+LINK_MODES = ("hardlink", "reflink", "copy")
+
+# ioctl that shares extents between two files (linux/fs.h)
+FICLONE = 0x40049409
+
+HASH_CHUNK = 1024 * 1024
+
+URL_INDEX_NAME = "url-index.jsonl"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _reflink(src: str, dst: str) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        return False
+
+
+class BlobStore:
+    """
+    mode: how URL paths point at blobs - "hardlink" (falls back to reflink,
+    then copy, e.g. across filesystems), "reflink" (falls back to copy) or
+    "copy" (dedups the store only).
+    """
+
+    def __init__(self, root: str, *, mode: str = "hardlink") -> None:
+        if mode not in LINK_MODES:
+            raise ValueError(f"link mode must be one of {', '.join(LINK_MODES)}, not {mode!r}")
+        self.root = os.path.abspath(root)
+        self.mode = mode
+        self.new = 0
+        self.shared = 0
+        self.shared_bytes = 0
+        self._lock = threading.Lock()
+        self._urls: dict[str, str] | None = None
+        self._url_log = None
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "sha256", digest[:2], digest[2:])
+
+    def _count(self, is_new: bool, size: int) -> None:
+        with self._lock:
+            if is_new:
+                self.new += 1
+            else:
+                self.shared += 1
+                self.shared_bytes += size
+
+    # ---- URL index (immutable URLs only) ----
+    def _load_urls(self) -> dict[str, str]:
+        if self._urls is None:
+            self._urls = {}
+            try:
+                with open(os.path.join(self.root, URL_INDEX_NAME), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            rec = json.loads(line)
+                            self._urls[rec["url"]] = rec["sha256"]
+                        except (ValueError, KeyError, TypeError):
+                            continue
+            except OSError:
+                pass
+        return self._urls
+
+    def lookup(self, url: str) -> str | None:
+        """Blob path recorded for an immutable URL, if the blob is still there."""
+        with self._lock:
+            digest = self._load_urls().get(url)
+        if digest is None:
+            return None
+        blob = self.blob_path(digest)
+        return blob if os.path.exists(blob) else None
+
+    def remember(self, url: str, digest: str) -> None:
+        with self._lock:
+            urls = self._load_urls()
+            if urls.get(url) == digest:
+                return
+            urls[url] = digest
+            if self._url_log is None:
+                os.makedirs(self.root, exist_ok=True)
+                self._url_log = open(os.path.join(self.root, URL_INDEX_NAME), "a", encoding="utf-8")
+            self._url_log.write(json.dumps({"url": url, "sha256": digest}) + "\n")
+            self._url_log.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._url_log is not None:
+                self._url_log.close()
+                self._url_log = None
+
+    # ---- writing ----
+    def commit(self, f: BinaryIO, tmp_path: str, dest_path: str, digest: str) -> None:
+        """
+        fsutil.commit_temp for stores: move a finished temp file (sha256
+        digest) into the store, or drop it if the blob exists, then link
+        dest_path to the blob.
+        """
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        blob = self.blob_path(digest)
+        if os.path.exists(blob):
+            self._count(False, os.path.getsize(tmp_path))
+            os.unlink(tmp_path)
+        else:
+            ensure_parent(blob)
+            try:
+                os.replace(tmp_path, blob)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # store on another filesystem
+                self._copy_in(tmp_path, blob)
+                os.unlink(tmp_path)
+            self._count(True, 0)
+        self.link(blob, dest_path)
+
+    def put_bytes(self, dest_path: str, data: bytes) -> str:
+        """Store data and link dest_path to it; returns the sha256 digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.blob_path(digest)
+        if os.path.exists(blob):
+            self._count(False, len(data))
+        else:
+            atomic_write_bytes(blob, data)
+            self._count(True, 0)
+        self.link(blob, dest_path)
+        return digest
+
+    def put_file(self, path: str) -> str:
+        """Move an existing file's content into the store and leave a link in its place."""
+        digest = file_sha256(path)
+        blob = self.blob_path(digest)
+        if os.path.exists(blob):
+            if not os.path.samefile(blob, path):
+                self._count(False, os.path.getsize(path))
+        else:
+            ensure_parent(blob)
+            try:
+                os.link(path, blob)
+            except OSError:
+                self._copy_in(path, blob)
+            self._count(True, 0)
+        self.link(blob, path)
+        return digest
+
+    def _copy_in(self, src: str, blob: str) -> None:
+        fd, tmp = open_temp(blob)
+        try:
+            f = os.fdopen(fd, "wb")
+            with f, open(src, "rb") as s:
+                shutil.copyfileobj(s, f, HASH_CHUNK)
+                commit_temp(f, tmp, blob)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    # ---- linking ----
+    def link(self, blob: str, dest_path: str) -> None:
+        """Atomically make dest_path a hard link / reflink / copy of blob."""
+        try:
+            if os.path.samefile(blob, dest_path):
+                return
+        except OSError:
+            pass
+        fd, tmp = open_temp(dest_path)
+        os.close(fd)
+        try:
+            self._materialize(blob, tmp)
+            os.replace(tmp, dest_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _materialize(self, blob: str, tmp: str) -> None:
+        if self.mode == "hardlink":
+            os.unlink(tmp)  # os.link needs a free name
+            try:
+                os.link(blob, tmp)
+                return
+            except OSError:
+                pass  # other filesystem, no hard links, too many links
+        if self.mode in ("hardlink", "reflink") and _reflink(blob, tmp):
+            return
+        shutil.copyfile(blob, tmp)
+
+    # ---- existing trees ----
+    def ingest_tree(self, root: str) -> int:
+        """put_file() every regular file under root (dotfiles and the store excluded); returns the count."""
+        n = 0
+        for dirpath, dirs, files in os.walk(root):
+            dirs[:] = [
+                d for d in dirs
+                if not d.startswith(".") and os.path.abspath(os.path.join(dirpath, d)) != self.root
+            ]
+            for name in files:
+                path = os.path.join(dirpath, name)
+                if name.startswith(".") or os.path.islink(path):
+                    continue
+                self.put_file(path)
+                n += 1
+        return n
+
+    def summary(self) -> str:
+        return (
+            f"{self.new} new blobs, {self.shared} shared "
+            f"({self.shared_bytes / 1e6:.1f} MB not stored again)"
+        )
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+Command-line options shared by the download_*.py scripts.
+
+  add_fetch_args(ap)           --concurrency, --per-host, --rate, --transport, --blob-store,
+                               --optimize-images, --metrics, --force/--resume/--retry-failed
+  pool_from_args(ap, args, ua) the FetchPool they describe; bad values are argparse errors
+  store_from_args(args)        the BlobStore for --blob-store, or None
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from .blobstore import BlobStore
+from .metrics import Metrics
+from .pool import FetchPool
+from .transport import TRANSPORTS
+
+
+def add_fetch_args(ap: argparse.ArgumentParser, *, resume: bool = True) -> None:
+    """resume=False leaves out --force and --resume (jobs that skip files already on disk)."""
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of parallel download workers (default: 1, sequential).",
+    )
+    ap.add_argument(
+        "--per-host",
+        type=int,
+        default=6,
+        help="Max simultaneous connections to a single host when --concurrency > 1 (default: 6).",
+    )
+    ap.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Max requests per second to a single host (default: 0, unlimited; "
+             "slows down automatically on HTTP 429/503 and Retry-After).",
+    )
+    ap.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default="requests",
+        help="HTTP client: requests (HTTP/1.1, default) or http2 (needs httpx[h2]; multiplexes "
+             "requests over one connection per origin; raise --per-host to use it).",
+    )
+    if resume:
+        ap.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-download everything, ignoring files already on disk and stored ETag/Last-Modified.",
+        )
+        ap.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue an interrupted run: URLs the job journal (<out>/.mirror-journal.jsonl) "
+                 "records as done are not requested again.",
+        )
+    ap.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Only re-fetch the URLs that failed in the previous run (per the job journal, "
+             "<out>/.mirror-journal.jsonl), then stop.",
+    )
+    ap.add_argument(
+        "--blob-store",
+        default="",
+        metavar="DIR",
+        help="Content-addressed store shared between mirrors: bodies are kept once under DIR "
+             "and hard-linked into --out (default: off).",
+    )
+    ap.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="After downloading, recompress PNG/JPEG files losslessly and write .webp variants "
+             "(WebP needs Pillow or cwebp); see `python3 -m webmirror optimize`.",
+    )
+    ap.add_argument(
+        "--metrics",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="Write per-request timings (connect/TLS/TTFB/transfer, bytes, retries, status) to FILE: "
+             "Prometheus text format for *.prom, JSON lines otherwise (repeatable).",
+    )
+
+
+def pool_from_args(ap: argparse.ArgumentParser, args: argparse.Namespace, user_agent: str) -> FetchPool:
+    if args.concurrency < 1 or args.per_host < 1:
+        ap.error("--concurrency and --per-host must be >= 1")
+    try:
+        return FetchPool(
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            rate=args.rate,
+            user_agent=user_agent,
+            transport=args.transport,
+            metrics=Metrics(args.metrics),
+        )
+    except RuntimeError as e:  # http2 without httpx[h2]
+        ap.error(str(e))
+
+
+def store_from_args(args: argparse.Namespace) -> BlobStore | None:
+    return BlobStore(args.blob_store) if args.blob_store else None
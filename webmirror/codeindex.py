@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent inverted index over a mirror's JS / CSS / HTML, for searching the
+minified bundles without grepping all of them on every query.
+
+  python3 -m webmirror index jsb_web                    # build / update
+  python3 -m webmirror index jsb_web -q /api/           # which files mention it
+  python3 -m webmirror index jsb_web -q getUserInfo --exact --context
+
+Every file is cut into three kinds of terms, each counted per file:
+
+  str    string literals ("确定", 'actActivityRegistration/insert', `...`)
+  url    absolute URLs anywhere (also CSS url(...)), and string literals
+         that look like a path ("/jsb-wap/", "user/findById")
+  ident  identifiers and property names of 3+ characters (1-2 character
+         names are what the minifier made up)
+
+The index is an SQLite file, <root>/.codeindex.sqlite3 by default:
+
+  files     path, sha256, size, mtime_ns
+  terms     term, kind              (unique)
+  postings  term -> file, count
+
+Updates are incremental like `pack`: files with the same size and mtime are
+not read, touched files with the same sha256 keep their postings, and only
+new or changed files are tokenised (in a process pool; the regex scan holds
+the GIL). Queries match terms (exact, prefix, substring or regex) against
+the terms table and join the postings, so they read a few pages of the
+index, not the bundles; --context opens only the files it prints.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+
+INDEX_NAME = ".codeindex.sqlite3"
+INDEX_EXTS = (".js", ".css", ".html", ".htm")
+KINDS = ("str", "url", "ident")
+MAX_TERM = 300  # longer string literals (inline SVG, base64) are not terms; URLs in them are
+
+# block comments and regex literals are matched (and dropped) so that quotes
+# inside them, e.g. /["'`]/ or a license comment's "Vue's", do not start a
+# string; bundles are minified, so // comments are not looked for
+TOKEN_RE = re.compile(
+    r"""
+      /\*.*?\*/
+    | (?:(?<=[(,=:\[!&|?{};])|(?<=return)|(?<=return\s))/(?![*/])(?:[^/\\\n\[]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*
+    | "((?:[^"\\\n]|\\.)*)"
+    | '((?:[^'\\\n]|\\.)*)'
+    | `((?:[^`\\]|\\.)*)`
+    | (?<![\w$])([A-Za-z_$][\w$]{2,})
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+URL_RE = re.compile(r"""(?:https?:)?//[\w.-]+\.[a-z]{2,}(?::\d+)?(?:/[^\s"'`<>()\\]*)?""", re.I)
+# "/jsb-wap/", "./a/b", "actActivityRegistration/insert", "static/js/"
+PATH_RE = re.compile(r"^(?:\.{0,2}/)?[\w.~@-]+(?:/[\w.~@:{}-]*)+$|^/[\w.~@-]*$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,
+    sha256 TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY, term TEXT NOT NULL, kind INTEGER NOT NULL, UNIQUE (term, kind)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL, file_id INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (term_id, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+"""
+
+
+# -----------------------------
+# Tokenising (runs in worker processes)
+# -----------------------------
+def tokenize(text: str) -> Counter:
+    """{(term, kind): count} of one file; kind indexes KINDS."""
+    counts: Counter = Counter()
+    for dq, sq, bt, ident in TOKEN_RE.findall(text):
+        if ident:
+            counts[(ident, 2)] += 1
+            continue
+        s = dq or sq or bt
+        if s and len(s) <= MAX_TERM:
+            counts[(s, 1 if PATH_RE.match(s) else 0)] += 1
+    for url in URL_RE.findall(text):
+        if len(url) <= MAX_TERM:
+            counts[(url, 1)] += 1
+    return counts
+
+
+def _tokenize_file(task: tuple[str, str]) -> tuple[str, str, Counter]:
+    root, rel = task
+    with open(os.path.join(root, rel), "rb") as f:
+        data = f.read()
+    return rel, hashlib.sha256(data).hexdigest(), tokenize(data.decode("utf-8", errors="replace"))
+
+
+def find_sources(root: str) -> list[str]:
+    """Indexable files under root, relative to it ("/"-separated)."""
+    rels = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.startswith(".") or not name.lower().endswith(INDEX_EXTS):
+                continue
+            path = os.path.join(dirpath, name)
+            if not os.path.islink(path):
+                rels.append(os.path.relpath(path, root).replace(os.sep, "/"))
+    return rels
+
+
+# -----------------------------
+# Index
+# -----------------------------
+@dataclass
+class IndexReport:
+    root: str
+    files: int = 0
+    indexed: int = 0
+    removed: int = 0
+    terms: int = 0
+    postings: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.files} files ({self.indexed} (re)indexed, {self.removed} removed), "
+            f"{self.terms} terms, {self.postings} postings in {self.seconds:.1f}s"
+        )
+
+
+@dataclass
+class Hit:
+    path: str
+    terms: list[tuple[str, str, int]] = field(default_factory=list)  # (term, kind, count)
+
+    @property
+    def count(self) -> int:
+        return sum(n for _, _, n in self.terms)
+
+
+class CodeIndex:
+    """
+    The index of one mirror tree.
+
+    - root: the tree (paths in the index are relative to it)
+    - path: the SQLite file (default: <root>/.codeindex.sqlite3)
+    """
+
+    def __init__(self, root: str, path: str = "") -> None:
+        self.root = root
+        self.path = path or os.path.join(root, INDEX_NAME)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> CodeIndex:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- update ----
+    def update(self, *, jobs: int | None = None) -> IndexReport:
+        t0 = time.perf_counter()
+        db = self.db
+        report = IndexReport(self.root)
+        known = {path: (fid, sha, size, mtime) for fid, path, sha, size, mtime in db.execute(
+            "SELECT id, path, sha256, size, mtime_ns FROM files"
+        )}
+        rels = find_sources(self.root)
+        report.files = len(rels)
+
+        stats = {rel: os.stat(os.path.join(self.root, rel)) for rel in rels}
+        todo = [
+            rel for rel in rels
+            if rel not in known or known[rel][2:] != (stats[rel].st_size, stats[rel].st_mtime_ns)
+        ]
+        tasks = [(self.root, rel) for rel in todo]
+        jobs = jobs or os.cpu_count() or 1
+        ex = None
+        if jobs > 1 and len(tasks) >= 8:
+            from concurrent.futures import ProcessPoolExecutor  # multiprocessing only when there is work
+
+            ex = ProcessPoolExecutor(max_workers=jobs)
+        try:
+            if ex is None:
+                results = map(_tokenize_file, tasks)
+            else:
+                results = ex.map(_tokenize_file, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+            self._store(results, known, stats, set(rels), report)
+        finally:
+            if ex is not None:
+                ex.shutdown()
+
+        report.terms = db.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        report.postings = db.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+        report.seconds = time.perf_counter() - t0
+        return report
+
+    def _store(self, results, known: dict, stats: dict, rels: set[str], report: IndexReport) -> None:
+        db = self.db
+        with db:
+            term_ids: dict[tuple[str, int], int] | None = None
+            for rel, sha, counts in results:
+                st = stats[rel]
+                old = known.get(rel)
+                if old is not None and old[1] == sha:
+                    # touched, not changed
+                    db.execute("UPDATE files SET size=?, mtime_ns=? WHERE id=?", (st.st_size, st.st_mtime_ns, old[0]))
+                    continue
+                if term_ids is None:
+                    term_ids = {(t, k): i for i, t, k in db.execute("SELECT id, term, kind FROM terms")}
+                if old is not None:
+                    db.execute("DELETE FROM postings WHERE file_id=?", (old[0],))
+                    db.execute(
+                        "UPDATE files SET sha256=?, size=?, mtime_ns=? WHERE id=?",
+                        (sha, st.st_size, st.st_mtime_ns, old[0]),
+                    )
+                    fid = old[0]
+                else:
+                    fid = db.execute(
+                        "INSERT INTO files (path, sha256, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                        (rel, sha, st.st_size, st.st_mtime_ns),
+                    ).lastrowid
+                new_terms = [key for key in counts if key not in term_ids]
+                if new_terms:
+                    next_id = (max(term_ids.values()) if term_ids else 0) + 1
+                    db.executemany(
+                        "INSERT INTO terms (id, term, kind) VALUES (?, ?, ?)",
+                        [(next_id + i, t, k) for i, (t, k) in enumerate(new_terms)],
+                    )
+                    term_ids.update((key, next_id + i) for i, key in enumerate(new_terms))
+                db.executemany(
+                    "INSERT INTO postings (term_id, file_id, count) VALUES (?, ?, ?)",
+                    [(term_ids[key], fid, n) for key, n in counts.items()],
+                )
+                report.indexed += 1
+
+            gone = [known[rel][0] for rel in set(known) - rels]
+            for fid in gone:
+                db.execute("DELETE FROM postings WHERE file_id=?", (fid,))
+                db.execute("DELETE FROM files WHERE id=?", (fid,))
+            report.removed = len(gone)
+            if report.indexed or gone:
+                db.execute("DELETE FROM terms WHERE id NOT IN (SELECT term_id FROM postings)")
+
+    # ---- queries ----
+    def search(
+        self,
+        query: str,
+        *,
+        mode: str = "substring",
+        kinds: tuple[str, ...] = KINDS,
+        limit: int = 0,
+    ) -> list[Hit]:
+        """
+        Files with a term matching query, most occurrences first.
+
+        - mode: "exact", "prefix", "substring" (case-sensitive) or "regex"
+        - kinds: subset of ("str", "url", "ident")
+        """
+        if mode == "exact":
+            where, params = "t.term = ?", [query]
+        elif mode == "prefix":
+            where, params = "t.term >= ? AND t.term < ?", [query, query + "\U0010ffff"]
+        elif mode == "substring":
+            where, params = "instr(t.term, ?) > 0", [query]
+        elif mode == "regex":
+            rx = re.compile(query)
+            self.db.create_function("regexp", 2, lambda p, s: rx.search(s) is not None, deterministic=True)
+            where, params = "t.term REGEXP ?", [query]
+        else:
+            raise ValueError(f"unknown mode {mode!r}")
+        kind_ids = [KINDS.index(k) for k in kinds]
+        where += f" AND t.kind IN ({','.join('?' * len(kind_ids))})"
+        # CROSS JOIN: filter the terms first; the planner would rather walk every posting
+        rows = self.db.execute(
+            f"""SELECT f.path, t.term, t.kind, p.count
+                FROM terms t CROSS JOIN postings p ON p.term_id = t.id JOIN files f ON f.id = p.file_id
+                WHERE {where}""",
+            params + kind_ids,
+        )
+        hits: dict[str, Hit] = {}
+        for path, term, kind, count in rows:
+            hits.setdefault(path, Hit(path)).terms.append((term, KINDS[kind], count))
+        out = sorted(hits.values(), key=lambda h: (-h.count, h.path))
+        for h in out:
+            h.terms.sort(key=lambda t: -t[2])
+        return out[:limit] if limit else out
+
+    def files_with(self, term: str, kind: str = "") -> list[str]:
+        """Paths of the files containing exactly term (of kind, if given)."""
+        return [h.path for h in self.search(term, mode="exact", kinds=(kind,) if kind else KINDS)]
+
+    def context(self, path: str, term: str, *, width: int = 60, limit: int = 3) -> list[str]:
+        """Up to limit snippets around term in path, read from the tree."""
+        try:
+            with open(os.path.join(self.root, path), "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            return []
+        out = []
+        pos = text.find(term)
+        while pos >= 0 and len(out) < limit:
+            snippet = text[max(0, pos - width):pos + len(term) + width].replace("\n", " ")
+            out.append(snippet)
+            pos = text.find(term, pos + len(term))
+        return out
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+Recursive asset discovery: scan downloaded JS/CSS/HTML for asset references
+(static/img/..., url(...), fonts, /jsb-files/...) and mirror them until no
+new URLs turn up.
+
+Scanning is a single left-to-right pass per file. The token pattern is a
+one-character anchor followed by one greedy negated character class with
+nothing after it, so the regex engine never backtracks; classification
+happens in Python on the (short) tokens. Big bundles and long base64 data:
+URIs therefore cost O(n).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Iterable, Iterator
+from urllib.parse import urljoin, urlparse
+
+from .mirror import Mirror
+
+
+# quote, paren (CSS url()) or '=' (unquoted HTML attribute) starts a token
+TOKEN_RE = re.compile(r"""["'(=]([^"'()\s\\<>{}]+)""")
+
+ASSET_EXTS = frozenset(
+    (
+        # images
+        "png", "jpg", "jpeg", "gif", "svg", "webp", "ico", "bmp",
+        # fonts
+        "woff", "woff2", "ttf", "eot", "otf",
+        # media
+        "mp3", "mp4", "webm",
+        # documents / code that can reference further assets
+        "html", "css", "js",
+    )
+)
+
+# files worth opening to look for further references
+SCANNABLE_EXTS = frozenset(("js", "css", "html", "htm"))
+
+
+def _ext(path: str) -> str:
+    base = path.rsplit("/", 1)[-1]
+    return base.rsplit(".", 1)[-1].lower() if "." in base else ""
+
+
+def scan_refs(text: str) -> Iterator[str]:
+    """Yield raw reference strings that look like asset paths or URLs."""
+    for m in TOKEN_RE.finditer(text):
+        tok = m.group(1)
+        if "/" not in tok or tok.startswith(("data:", "#", "about:", "javascript:")):
+            continue
+        path = tok.split("#", 1)[0].split("?", 1)[0]
+        if _ext(path) in ASSET_EXTS:
+            yield tok
+
+
+def resolve_ref(
+    ref: str,
+    base_url: str,
+    public_path: str,
+    *,
+    allow_relative: bool = True,
+) -> str | None:
+    """
+    Turn a raw reference into an absolute URL:
+      https://h/x.png, //h/x.png  -> absolute (scheme taken from base_url)
+      /jsb-files/a.png            -> origin of base_url + path
+      static/img/a.png            -> origin + publicPath + path (webpack e.p+"static/...")
+      ../img/a.png, ./a.png       -> relative to the referencing file (CSS/HTML only;
+                                     inside JS bundles these are module ids, not URLs)
+    Anything else (bare words) is ambiguous and ignored.
+    """
+    if ref.startswith(("http://", "https://", "//", "/")):
+        url = urljoin(base_url, ref)
+    elif ref.startswith("static/"):
+        url = urljoin(base_url, public_path + ref)
+    elif allow_relative and ref.startswith(("./", "../")):
+        url = urljoin(base_url, ref)
+    else:
+        return None
+    # drop fragments; keep queries (cache-busters like ?t=169... are part of the URL)
+    return url.split("#", 1)[0]
+
+
+def scan_file(path: str, base_url: str, public_path: str) -> set[str]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    allow_relative = _ext(urlparse(base_url).path) != "js"
+    found: set[str] = set()
+    for ref in scan_refs(text):
+        url = resolve_ref(ref, base_url, public_path, allow_relative=allow_relative)
+        if url:
+            found.add(url)
+    return found
+
+
+def discover(
+    mirror: Mirror,
+    seeds: Iterable[str],
+    *,
+    public_path: str,
+    hosts: Iterable[str],
+) -> tuple[int, int, int]:
+    """
+    Scan the already-mirrored seed URLs, download every new same-host (or
+    explicitly allowed host) reference, scan those in turn, and repeat until
+    a round finds nothing new.
+
+    Returns (ok, up_to_date, fail) summed over all rounds.
+    """
+    allowed = set(hosts)
+    seen: set[str] = set(seeds)
+    to_scan = list(seen)
+    ok = skipped = fail = 0
+    rnd = 0
+
+    while to_scan:
+        found: set[str] = set()
+        for url in to_scan:
+            if _ext(urlparse(url).path) not in SCANNABLE_EXTS:
+                continue
+            local = mirror.local_path(url)
+            if not os.path.isfile(local):
+                continue
+            found |= scan_file(local, url, public_path)
+
+        new = sorted(u for u in found - seen if urlparse(u).netloc in allowed)
+        seen.update(found)
+        if not new:
+            break
+
+        rnd += 1
+        print(f"[+] Discovery round {rnd}: {len(new)} new assets")
+        r_ok, r_skipped, r_fail = mirror.run(new)
+        ok += r_ok
+        skipped += r_skipped
+        fail += r_fail
+        to_scan = new
+
+    return ok, skipped, fail
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+"""
+HTTP fetching: sessions, retries and streaming downloads with atomic writes.
+
+Bodies are copied from the socket to a temp file next to the destination in
+fixed-size pieces, fsync'd, then renamed over the final path. Peak memory is
+one chunk regardless of asset size, and an interrupted download never leaves
+a truncated file at the real path (so "file exists" checks stay trustworthy).
+
+Retries are only spent on failures that can succeed on a second try
+(connection errors, timeouts, truncated bodies, 408/425/429/5xx). A 404 or
+other 4xx fails at once. Waits grow exponentially with jitter, so parallel
+workers that failed together do not retry in lock-step, and a Retry-After
+header overrides the computed wait.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, TypeVar
+
+import requests
+
+from .blobstore import BlobStore
+from .fsutil import commit_temp, open_temp
+
+
+T = TypeVar("T")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadError(Exception):
+    """Body did not match the advertised Content-Length or expected hash."""
+
+
+def new_session(user_agent: str) -> requests.Session:
+    s = requests.Session()
+    s.headers.update({"User-Agent": user_agent})
+    return s
+
+
+# -----------------------------
+# Retry policy
+# -----------------------------
+RETRY_STATUSES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+# a Retry-After longer than this is treated as "give up for this run"
+MAX_RETRY_AFTER = 300.0
+
+RETRYABLE_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+    DownloadError,
+)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, requests.HTTPError):
+        r = exc.response
+        return r is None or r.status_code in RETRY_STATUSES
+    return isinstance(exc, RETRYABLE_EXCEPTIONS)
+
+
+def retry_after(r: requests.Response | None) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if r is None:
+        return None
+    value = r.headers.get("Retry-After", "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(r: requests.Response | None) -> bool:
+    """429, or 503 with a Retry-After: "slow down" rather than "broken"."""
+    if r is None:
+        return False
+    return r.status_code == 429 or (r.status_code == 503 and "Retry-After" in r.headers)
+
+
+def backoff_delay(attempt: int, *, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Exponential backoff with "equal jitter": uniform in [d/2, d], d = base * 2^(attempt-1)."""
+    d = min(cap, base * 2 ** (attempt - 1))
+    return d / 2 + random.uniform(0, d / 2)
+
+
+def with_retries(fn: Callable[[], T], *, retries: int = 3) -> T:
+    attempt = 1
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            if isinstance(e, requests.HTTPError):
+                hinted = retry_after(e.response)
+                if hinted is not None:
+                    if hinted > MAX_RETRY_AFTER:
+                        raise
+                    delay = max(delay, hinted)
+            time.sleep(delay)
+            attempt += 1
+
+
+def http_get(
+    url: str,
+    session: requests.Session,
+    *,
+    headers: dict[str, str] | None = None,
+    retries: int = 3,
+    timeout: int = 30,
+) -> requests.Response:
+    def once() -> requests.Response:
+        r = session.get(url, headers=headers, timeout=timeout)
+        r.raise_for_status()
+        return r
+
+    return with_retries(once, retries=retries)
+
+
+def http_get_bytes(
+    url: str,
+    session: requests.Session,
+    *,
+    retries: int = 3,
+    timeout: int = 30,
+) -> bytes:
+    return http_get(url, session, retries=retries, timeout=timeout).content
+
+
+def _stream_once(
+    url: str,
+    session: requests.Session,
+    dest_path: str,
+    *,
+    headers: dict[str, str] | None,
+    timeout: int,
+    verify_length: bool,
+    expected_sha256: str | None,
+    store: BlobStore | None,
+) -> tuple[requests.Response, str | None]:
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as r:
+        r.raise_for_status()
+        if r.status_code == 304:
+            return r, None
+
+        h = hashlib.sha256()
+        fd, tmp = open_temp(dest_path)
+        try:
+            f = os.fdopen(fd, "wb")
+            with f:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    h.update(chunk)
+
+                # Content-Length counts bytes on the wire (possibly gzip'd),
+                # so compare against what urllib3 actually read, not the
+                # decoded size we wrote.
+                advertised = r.headers.get("Content-Length")
+                if verify_length and advertised is not None and advertised.isdigit():
+                    received = r.raw.tell()
+                    if received != int(advertised):
+                        raise DownloadError(
+                            f"truncated body: got {received} of {advertised} bytes"
+                        )
+
+                digest = h.hexdigest()
+                if expected_sha256 and digest != expected_sha256.lower():
+                    raise DownloadError(
+                        f"sha256 mismatch: expected {expected_sha256}, got {digest}"
+                    )
+
+                if store is not None:
+                    store.commit(f, tmp, dest_path, digest)
+                else:
+                    commit_temp(f, tmp, dest_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return r, digest
+
+
+def stream_to_file(
+    url: str,
+    session: requests.Session,
+    dest_path: str,
+    *,
+    headers: dict[str, str] | None = None,
+    retries: int = 3,
+    timeout: int = 30,
+    verify_length: bool = True,
+    expected_sha256: str | None = None,
+    store: BlobStore | None = None,
+) -> tuple[requests.Response, str | None]:
+    """
+    GET url and atomically store the body at dest_path (as a link into
+    store, when given).
+
+    Returns (response, sha256_hex). On 304 Not Modified the destination is
+    left untouched and the digest is None. The response body has already
+    been consumed; use it for status and headers only.
+    """
+    return with_retries(
+        lambda: _stream_once(
+            url,
+            session,
+            dest_path,
+            headers=headers,
+            timeout=timeout,
+            verify_length=verify_length,
+            expected_sha256=expected_sha256,
+            store=store,
+        ),
+        retries=retries,
+    )
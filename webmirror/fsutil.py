@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+Atomic file writes: write to a temp file beside the target, fsync, rename.
+Links are made the same way: under a temp name, then renamed over the target.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from typing import BinaryIO
+
+
+def ensure_parent(path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+def open_temp(dest_path: str) -> tuple[int, str]:
+    d = os.path.dirname(dest_path) or "."
+    os.makedirs(d, exist_ok=True)
+    return tempfile.mkstemp(dir=d, prefix="." + os.path.basename(dest_path) + ".", suffix=".part")
+
+
+def commit_temp(f: BinaryIO, tmp_path: str, dest_path: str) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.replace(tmp_path, dest_path)
+
+
+def atomic_write_bytes(dest_path: str, data: bytes) -> str:
+    fd, tmp = open_temp(dest_path)
+    try:
+        f = os.fdopen(fd, "wb")
+        with f:
+            f.write(data)
+            commit_temp(f, tmp, dest_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return dest_path
+
+
+def link_file(src_path: str, dest_path: str) -> str:
+    """Atomically make dest_path a hard link to src_path (a copy if linking fails)."""
+    fd, tmp = open_temp(dest_path)
+    os.close(fd)
+    try:
+        os.unlink(tmp)
+        try:
+            os.link(src_path, tmp)
+        except OSError:
+            shutil.copyfile(src_path, tmp)
+        os.replace(tmp, dest_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return dest_path
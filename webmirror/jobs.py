@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""
+Mirror jobs: the "what" behind each CLI, callable on a shared FetchPool.
+
+  WebpackJob  runtime.*.js -> every JS/CSS chunk (+ entry page, discovery,
+              snapshots); download_notebookvip_assets.py / download_fjii_assets.py
+  UrlListJob  a fixed list of URLs; download_images_keep_path.py
+
+run_webpack() / run_url_list() return a JobResult instead of printing a final line, so the
+batch runner can put many of them in one report.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+from urllib.parse import urlparse
+
+from .blobstore import BlobStore
+from .discover import discover
+from .mirror import Mirror
+from .optimize import optimize_tree
+from .pool import DEFAULT_USER_AGENT, FetchPool
+from .runtime import chunk_urls, guess_origin, normalize_public_path, parse_runtime
+from .snapshot import (
+    diff_chunks,
+    format_diff,
+    latest_snapshot,
+    load_runtime_info,
+    set_latest,
+    snapshot_dir,
+    snapshot_key,
+    write_meta,
+)
+
+
+Log = Callable[[str], None]
+
+
+@dataclass
+class WebpackJob:
+    runtime_url: str
+    out: str
+    public_path: str = ""  # "" = r.p from the runtime
+    origin: str = ""  # "" = origin of runtime_url
+    user_agent: str = DEFAULT_USER_AGENT
+    index_url: str = ""
+    discover: bool = False
+    discover_hosts: list[str] = field(default_factory=list)
+    snapshot: bool = False
+    optimize_images: bool = False
+    name: str = ""
+
+
+@dataclass
+class UrlListJob:
+    urls: list[str]
+    out: str
+    user_agent: str = DEFAULT_USER_AGENT
+    keep_host: bool = True
+    skip_existing: bool = True
+    optimize_images: bool = False
+    name: str = ""
+
+
+@dataclass
+class JobResult:
+    name: str
+    out: str
+    ok: int = 0
+    skipped: int = 0
+    fail: int = 0
+    seconds: float = 0.0
+    snapshot: str = ""
+    failed_urls: list[str] = field(default_factory=list)
+    error: str = ""
+
+    @property
+    def exit_code(self) -> int:
+        return 0 if self.fail == 0 and not self.error else 2
+
+
+def read_url_list(path: str) -> list[str]:
+    """One URL per line; blank lines and # comments are ignored."""
+    urls = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                urls.append(line)
+    return urls
+
+
+def _finish(result: JobResult, mirror: Mirror, t0: float) -> JobResult:
+    result.failed_urls = mirror.journal.failed_urls()
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def run_webpack(
+    job: WebpackJob,
+    *,
+    pool: FetchPool,
+    force: bool = False,
+    resume: bool = False,
+    retry_failed: bool = False,
+    store: BlobStore | None = None,
+    log: Log = print,
+) -> JobResult:
+    t0 = time.perf_counter()
+    origin = job.origin.strip() or guess_origin(job.runtime_url)
+
+    out = job.out
+    key = prev_key = prev_dir = None
+    if job.snapshot:
+        key = snapshot_key(job.runtime_url)
+        if key is None:
+            raise ValueError("--snapshot needs a content-hashed runtime URL (runtime.<hash>.js)")
+        out = snapshot_dir(job.out, key)
+        prev_key = latest_snapshot(job.out)
+        if prev_key == key:
+            prev_key = None
+        prev_dir = snapshot_dir(job.out, prev_key) if prev_key else None
+        log(f"[+] Snapshot {key} -> {out}" + (f" (previous: {prev_key})" if prev_key else ""))
+
+    mirror = Mirror(
+        out,
+        user_agent=job.user_agent,
+        pool=pool,
+        force=force,
+        resume=resume or retry_failed,
+        store=store,
+        reuse_from=prev_dir,
+        label=job.name,
+    )
+    result = JobResult(job.name, out, snapshot=key or "")
+
+    try:
+        if retry_failed:
+            result.ok, result.skipped, result.fail = mirror.retry_failed()
+            return _finish(result, mirror, t0)
+
+        log(f"[+] Fetch runtime: {job.runtime_url}")
+        status, runtime_bytes = mirror.fetch_bytes(job.runtime_url)
+        runtime_text = runtime_bytes.decode("utf-8", errors="replace")
+        log(f"    {'saved' if status == 'OK' else 'up to date'} -> {mirror.local_path(job.runtime_url)}")
+
+        info = parse_runtime(runtime_text)
+        public_path = normalize_public_path(job.public_path.strip() or info.public_path or "/")
+        log(f"[+] Using publicPath: {public_path}")
+        log(f"[+] Using origin: {origin}")
+
+        if info.js is None and info.css is None:
+            raise ValueError("Could not find JS/CSS chunk hash maps in runtime.")
+        log(f"[+] JS chunks: {len(info.js.hashes) if info.js else 0}")
+        log(f"[+] CSS chunks: {len(info.css.hashes) if info.css else 0}")
+        if prev_dir:
+            try:
+                d = diff_chunks(load_runtime_info(prev_dir), info)
+                log(f"[+] Since snapshot {prev_key}: {format_diff(d, verbose=False)}")
+            except (OSError, ValueError) as e:
+                log(f"[!] Cannot diff against snapshot {prev_key}: {e}")
+
+        targets = chunk_urls(origin, public_path, info)
+        log(f"[+] Total targets (js+css): {len(targets)}")
+
+        seeds = [job.runtime_url] + targets
+        if job.index_url:
+            targets = [job.index_url] + targets
+        ok, skipped, fail = mirror.run(targets)
+
+        if job.discover:
+            if job.index_url:
+                seeds.append(job.index_url)
+            hosts = [urlparse(origin).netloc] + list(job.discover_hosts)
+            d_ok, d_skipped, d_fail = discover(mirror, seeds, public_path=public_path, hosts=hosts)
+            log(f"[+] Discovered assets: OK={d_ok} (up to date: {d_skipped}), FAIL={d_fail}")
+            ok += d_ok
+            skipped += d_skipped
+            fail += d_fail
+        result.ok, result.skipped, result.fail = ok, skipped, fail
+
+        if job.optimize_images:
+            log(f"[+] Optimized images: {optimize_tree(out, inherit=prev_dir).summary()}")
+        if key:
+            write_meta(out, key=key, runtime_url=job.runtime_url, public_path=public_path,
+                       previous=prev_key, info=info)
+            if fail == 0:
+                set_latest(job.out, key)
+            else:
+                log(f"[!] Snapshot {key} incomplete; LATEST unchanged (rerun with --resume / --retry-failed)")
+        return _finish(result, mirror, t0)
+    finally:
+        mirror.close()
+
+
+def run_url_list(
+    job: UrlListJob,
+    *,
+    pool: FetchPool,
+    retry_failed: bool = False,
+    store: BlobStore | None = None,
+    log: Log = print,
+) -> JobResult:
+    t0 = time.perf_counter()
+    mirror = Mirror(
+        job.out,
+        user_agent=job.user_agent,
+        pool=pool,
+        keep_host=job.keep_host,
+        skip_existing=job.skip_existing,
+        resume=retry_failed,
+        store=store,
+        label=job.name,
+        report_every=1 if not job.name else 25,
+    )
+    result = JobResult(job.name, job.out)
+    try:
+        if retry_failed:
+            result.ok, result.skipped, result.fail = mirror.retry_failed()
+        else:
+            log(f"[+] {len(job.urls)} URLs -> {job.out}")
+            result.ok, result.skipped, result.fail = mirror.run(job.urls)
+        if job.optimize_images:
+            log(f"[+] Optimized images: {optimize_tree(job.out).summary()}")
+        return _finish(result, mirror, t0)
+    finally:
+        mirror.close()
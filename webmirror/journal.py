@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+Append-only job journal, so an interrupted mirror can pick up where it died.
+
+Every fetched URL appends one JSON line to <out>/.mirror-journal.jsonl:
+
+  {"url": "...", "state": "done", "status": "OK", "size": 1234, "sha256": "..."}
+  {"url": "...", "state": "failed", "error": "404 Client Error: ..."}
+
+The last line for a URL wins. Lines are flushed as they are written, and a
+torn final line (the process was killed mid-write) is ignored on load, so
+the journal never has to be rewritten in place.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+
+JOURNAL_NAME = ".mirror-journal.jsonl"
+
+
+def load_journal(path: str) -> dict[str, dict]:
+    """{url: last record} from a journal file; missing file -> {}."""
+    state: dict[str, dict] = {}
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except OSError:
+        return state
+    with f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict) and "url" in rec:
+                state[rec["url"]] = rec
+    return state
+
+
+class Journal:
+    """
+    resume=False starts a new job (the old journal is discarded);
+    resume=True keeps it and appends, so done() reflects earlier runs.
+    """
+
+    def __init__(self, out_root: str, *, resume: bool = False) -> None:
+        self.path = os.path.join(out_root, JOURNAL_NAME)
+        os.makedirs(out_root, exist_ok=True)
+        self.state = load_journal(self.path) if resume else {}
+        self._f = open(self.path, "a" if resume else "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def _write(self, rec: dict) -> None:
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.state[rec["url"]] = rec
+            self._f.write(line)
+            self._f.flush()
+
+    def done(self, url: str, status: str, path: str, sha256: str | None = None) -> None:
+        rec = {"url": url, "state": "done", "status": status, "t": round(time.time(), 3)}
+        try:
+            rec["size"] = os.path.getsize(path)
+        except OSError:
+            pass
+        if sha256:
+            rec["sha256"] = sha256
+        self._write(rec)
+
+    def failed(self, url: str, error: BaseException) -> None:
+        self._write({"url": url, "state": "failed", "error": str(error), "t": round(time.time(), 3)})
+
+    def is_done(self, url: str) -> bool:
+        rec = self.state.get(url)
+        return rec is not None and rec.get("state") == "done"
+
+    def failed_urls(self) -> list[str]:
+        return sorted(u for u, rec in self.state.items() if rec.get("state") == "failed")
+
+    def counts(self) -> tuple[int, int]:
+        """(done, failed) over every URL the journal knows."""
+        done = sum(1 for rec in self.state.values() if rec.get("state") == "done")
+        return done, len(self.state) - done
+
+    def close(self) -> None:
+        with self._lock:
+            self._f.close()
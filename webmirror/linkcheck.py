@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+"""
+Link integrity of a mirror tree: every reference its pages make, resolved
+against what is on disk.
+
+  python3 -m webmirror links jsb_web --origin https://jsb.notebookvip.cn -o missing.txt
+  python3 download_images_keep_path.py --urls-file missing.txt --out jsb_web --no-host
+
+References come from
+  HTML      index.html and pages such as jsb-files/app/wxb-sdk.html: src=,
+            href=, inline url(...) and script strings
+  CSS       every url(...), relative to the stylesheet
+  JS        static/img/..., /jsb-files/... and absolute URLs in the bundles
+            (the same scanner `--discover` uses; ./ and ../ inside JS are
+            module ids and are skipped)
+  runtime   every JS/CSS chunk a runtime.*.js names, under its publicPath
+
+and are checked against one listing of the tree, taken once up front: no
+stat() per reference. Query strings and fragments do not name files and are
+dropped. A URL on the origin (or a --host) is found at its path, as the
+chunk downloaders and `download_images_keep_path.py --no-host` save it, or
+under <root>/<host>/, where that script puts it by default; a URL on another
+host only under <root>/<host>/, and if the tree has no such folder it is
+counted, not checked. Chunks with the empty-build hash (31d6cfe0d16ae931b73c)
+may be missing, as on the server.
+
+The missing set is written one URL per line, the --urls-file format of
+download_images_keep_path.py (full URLs, so an origin is needed); the
+reference graph (who references what) can be written as JSON or Graphviz
+.dot. Files are parsed by a process pool.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from .discover import SCANNABLE_EXTS, _ext, scan_file
+from .fsutil import atomic_write_bytes
+from .runtime import RuntimeInfo, chunk_urls, normalize_public_path, parse_runtime
+from .snapshot import RUNTIME_NAME_RE
+
+# stands in for the origin when none is given: references are then checked
+# and reported as root-relative paths
+LOCAL_ORIGIN = "http://mirror.invalid"
+EMPTY_CHUNK_RE = re.compile(r"\.31d6cfe0d16ae931b73c\.(?:js|css)$")
+
+
+# -----------------------------
+# Tree and references
+# -----------------------------
+def list_tree(root: str) -> tuple[set[str], set[str]]:
+    """(files, folders) under root, "/"-separated and relative to it, from one walk."""
+    files: set[str] = set()
+    folders: set[str] = {""}
+    for dirpath, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        rel = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        rel = "" if rel == "." else rel + "/"
+        for d in dirs:
+            folders.add(rel + d)
+        for name in names:
+            if not name.startswith("."):
+                files.add(rel + name)
+    return files, folders
+
+
+def _public_path(info: RuntimeInfo) -> str:
+    pp = info.public_path or "/"
+    return pp if pp.startswith(("http://", "https://", "//")) else normalize_public_path(pp)
+
+
+def _scan(task: tuple[str, str, str, str]) -> tuple[str, list[str]]:
+    """(rel, referenced URLs) of one file; runs in a worker process."""
+    root, rel, origin, public_path = task
+    path = os.path.join(root, *rel.split("/"))
+    base_url = f"{origin}/{rel}"
+    try:
+        if RUNTIME_NAME_RE.search(rel.rsplit("/", 1)[-1]):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                info = parse_runtime(f.read())
+            return rel, chunk_urls(base_url, _public_path(info), info)
+        return rel, sorted(scan_file(path, base_url, public_path))
+    except OSError:
+        return rel, []
+
+
+# -----------------------------
+# Check
+# -----------------------------
+@dataclass
+class LinkReport:
+    root: str
+    origin: str = ""
+    files: int = 0  # files parsed
+    refs: int = 0  # references found (with repeats)
+    targets: int = 0  # distinct local targets checked
+    # url -> the files referencing it
+    missing: dict[str, list[str]] = field(default_factory=dict)
+    external: dict[str, list[str]] = field(default_factory=dict)
+    empty_chunks: int = 0  # missing, but empty in the build
+    # source file -> the URLs it references
+    graph: dict[str, list[str]] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.files} files parsed, {self.refs} references to {self.targets} local targets: "
+            f"{len(self.missing)} missing"
+            + (f" ({self.empty_chunks} empty chunks not counted)" if self.empty_chunks else "")
+            + f", {len(self.external)} URLs on other hosts not checked, in {self.seconds:.2f}s"
+        )
+
+    def display(self, url: str) -> str:
+        """url as reported: unchanged with an origin, a /path without one."""
+        return url[len(LOCAL_ORIGIN):] if url.startswith(LOCAL_ORIGIN + "/") else url
+
+    def missing_urls(self) -> list[str]:
+        """The missing set as the downloader takes it: full URLs, or /paths without an origin."""
+        return sorted(self.display(u) for u in self.missing)
+
+
+def _local_rels(url: str, hosts: set[str], folders: set[str]) -> tuple[str, ...]:
+    """
+    Tree paths url may be at, as mirror.local_path_for lays them out: the
+    path alone for hosts mirrored here, and under a <host>/ folder for any
+    host the tree has one for. () for hosts that are not mirrored here.
+    """
+    p = urlparse(url)
+    rels = []
+    if p.netloc in hosts:
+        rels.append(p.path.lstrip("/"))
+    if p.netloc and p.netloc in folders:
+        rels.append(p.netloc + p.path)
+    return tuple(rels)
+
+
+def _spa_public_paths(root: str, files: set[str]) -> dict[str, str]:
+    """{folder: publicPath} for the SPAs in the tree: "static/..." in their files is relative to it."""
+    out: dict[str, str] = {}
+    for rel in files:
+        if RUNTIME_NAME_RE.search(rel.rsplit("/", 1)[-1]):
+            with open(os.path.join(root, *rel.split("/")), "r", encoding="utf-8", errors="replace") as f:
+                pp = _public_path(parse_runtime(f.read()))
+            out[urlparse(pp).path.strip("/")] = pp
+    return out
+
+
+def check_links(
+    root: str,
+    *,
+    origin: str = "",
+    hosts: tuple[str, ...] = (),
+    jobs: int | None = None,
+) -> LinkReport:
+    """
+    - origin: scheme + host the tree was mirrored from (e.g. https://jsb.notebookvip.cn);
+      without one, references are reported as /paths
+    - hosts: further hosts whose assets live in the same tree (path without host)
+    """
+    t0 = time.perf_counter()
+    origin = origin.rstrip("/") or LOCAL_ORIGIN
+    report = LinkReport(root, "" if origin == LOCAL_ORIGIN else origin)
+    files, folders = list_tree(root)
+    local_hosts = {urlparse(origin).netloc, *hosts}
+
+    spas = _spa_public_paths(root, files)
+    tasks = []
+    for rel in sorted(files):
+        if _ext(rel) in SCANNABLE_EXTS:
+            top = rel.split("/", 1)[0] if "/" in rel else ""
+            tasks.append((root, rel, origin, spas.get(top) or spas.get("") or "/"))
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 8:
+        results = list(map(_scan, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            results = list(ex.map(_scan, tasks, chunksize=8))
+
+    checked: dict[str, bool] = {}  # tree path -> present
+    local: set[str] = set()
+    empty: set[str] = set()
+    for rel, urls in results:
+        report.files += 1
+        report.refs += len(urls)
+        # a query (share_mid.html?url=...) or fragment does not name another file
+        urls = list(dict.fromkeys(u.split("#", 1)[0].split("?", 1)[0] for u in urls))
+        if urls:
+            report.graph[rel] = urls
+        for url in urls:
+            targets = _local_rels(url, local_hosts, folders)
+            if not targets:
+                report.external.setdefault(url, []).append(rel)
+                continue
+            local.add(url)
+            found = False
+            for target in targets:
+                ok = checked.get(target)
+                if ok is None:
+                    if target == "" or target.endswith("/") or target.rstrip("/") in folders:
+                        ok = (target.rstrip("/") + "/index.html").lstrip("/") in files
+                    else:
+                        ok = target in files
+                    checked[target] = ok
+                found = found or ok
+            if found:
+                continue
+            if EMPTY_CHUNK_RE.search(url):
+                empty.add(url)
+                continue
+            report.missing.setdefault(url, []).append(rel)
+    report.targets = len(local)
+    report.empty_chunks = len(empty)
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+# -----------------------------
+# Output
+# -----------------------------
+def write_missing(report: LinkReport, path: str) -> None:
+    """One URL per line ("#" lines are comments), for download_images_keep_path.py --urls-file."""
+    if not report.origin:
+        raise ValueError("the missing set can only be written with an origin: the downloader needs full URLs")
+    lines = [
+        f"# {len(report.missing)} missing references in {report.root}",
+        f"# download_images_keep_path.py --urls-file <this file> --out {report.root} --no-host",
+    ]
+    lines += report.missing_urls()
+    atomic_write_bytes(path, ("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def write_graph(report: LinkReport, path: str) -> None:
+    """The reference graph: Graphviz for *.dot (missing targets in red), JSON otherwise."""
+    missing = set(report.missing)
+    if path.endswith(".dot"):
+        out = ["digraph links {", "  rankdir=LR;", '  node [shape=box, fontsize=10];']
+        for src, urls in sorted(report.graph.items()):
+            for url in urls:
+                if url in report.external:
+                    continue
+                style = ' [color=red, fontcolor=red]' if url in missing else ""
+                out.append(f"  {json.dumps(src)} -> {json.dumps(report.display(url))}{style};")
+        out.append("}")
+        data = "\n".join(out) + "\n"
+    else:
+        data = json.dumps(
+            {
+                "root": report.root,
+                "origin": report.origin,
+                "missing": report.missing_urls(),
+                "graph": report.graph,
+            },
+            ensure_ascii=False,
+            indent=1,
+        )
+    atomic_write_bytes(path, data.encode("utf-8"))
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-request metrics: where every fetch spent its time, and a run summary.
+
+Each URL a Mirror actually requests gets one Trace:
+
+  wait      queued for a slot of the host throttle (per_host, rate, backoff
+            after 429/503)
+  connect   DNS lookup + TCP connect, when the request opened a connection
+  tls       TLS handshake of that connection
+  ttfb      request sent -> response headers (server time + one round trip)
+  transfer  response headers -> body on disk
+  total     the whole fetch, including retries and their backoff sleeps
+
+plus the HTTP status, bytes read off the wire and the number of attempts.
+wait/connect/tls add up over retries; ttfb/transfer are the last attempt's.
+URLs answered locally (SKIP) made no request and are not traced.
+
+Metrics.close() writes the traces to the --metrics files:
+
+  *.jsonl   one JSON object per request, in completion order
+  *.prom    Prometheus text format (node_exporter textfile collector):
+            requests/bytes/retries per host, time per phase and a duration
+            histogram; written atomically, so a scrape never sees half a file
+
+and summary() renders the slowest requests and per-host throughput printed
+at the end of a run. Collecting costs a small object, a thread-local lookup
+and a few perf_counter() calls per request; files are only written at the
+end, so the fetch loop never waits on them.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+from .fsutil import atomic_write_bytes
+
+
+PHASES = ("wait", "connect", "tls", "ttfb", "transfer")
+
+# webmirror_request_duration_seconds buckets
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_local = threading.local()
+
+
+class Trace:
+    __slots__ = (
+        "url", "host", "job", "start", "status", "http_status", "bytes", "attempts",
+        "wait", "connect", "tls", "ttfb", "transfer", "total", "error", "_t0", "_marks",
+    )
+
+    def __init__(self, url: str, job: str = "") -> None:
+        self.url = url
+        self.host = urlparse(url).netloc
+        self.job = job
+        self.start = time.time()
+        self.status = ""  # OK / 304 / FAIL, as in the journal
+        self.http_status = 0  # 0: no response (connection error, timeout)
+        self.bytes = 0
+        self.attempts = 0
+        self.wait = self.connect = self.tls = self.ttfb = self.transfer = self.total = 0.0
+        self.error = ""
+        self._t0 = time.perf_counter()
+        self._marks: dict[str, float] | None = None  # httpx trace events in flight
+
+    def response(self, r, started: float, setup_before: float) -> None:
+        """
+        Record the response of one attempt. started: perf_counter() when the
+        attempt got its slot; setup_before: connect + tls before it.
+        """
+        elapsed = r.elapsed.total_seconds()  # request sent .. headers parsed, incl. connecting
+        self.http_status = r.status_code
+        self.bytes += r.raw.tell()
+        self.ttfb = max(0.0, elapsed - (self.connect + self.tls - setup_before))
+        self.transfer = max(0.0, time.perf_counter() - started - elapsed)
+
+    def record(self) -> dict:
+        rec = {
+            "url": self.url,
+            "host": self.host,
+            "t": round(self.start, 3),
+            "status": self.status,
+            "http_status": self.http_status,
+            "bytes": self.bytes,
+            "attempts": self.attempts,
+        }
+        if self.job:
+            rec["job"] = self.job
+        for phase in PHASES + ("total",):
+            rec[phase] = round(getattr(self, phase), 6)
+        if self.error:
+            rec["error"] = self.error
+        return rec
+
+
+def current_trace() -> Trace | None:
+    """The trace of the fetch running on this thread, if any (for transport hooks)."""
+    return getattr(_local, "trace", None)
+
+
+class Metrics:
+    """
+    Collects the traces of a run (one per FetchPool, shared by its Mirrors).
+
+    - outputs: files written by close(); ".prom" -> Prometheus text format,
+      anything else -> JSON lines
+    """
+
+    def __init__(self, outputs: list[str] | tuple[str, ...] = ()) -> None:
+        self.outputs = list(outputs)
+        self.traces: list[Trace] = []
+        self._lock = threading.Lock()
+
+    def begin(self, url: str, *, job: str = "") -> Trace:
+        trace = _local.trace = Trace(url, job)
+        return trace
+
+    def end(self, trace: Trace, status: str, error: BaseException | None = None) -> None:
+        _local.trace = None
+        trace.total = time.perf_counter() - trace._t0
+        trace.status = status
+        if error is not None:
+            trace.error = str(error)
+        if trace.attempts:
+            with self._lock:
+                self.traces.append(trace)
+
+    # -----------------------------
+    # Output
+    # -----------------------------
+    def write_jsonl(self, path: str) -> None:
+        with self._lock:
+            traces = list(self.traces)
+        lines = [json.dumps(t.record(), ensure_ascii=False, separators=(",", ":")) + "\n" for t in traces]
+        atomic_write_bytes(path, "".join(lines).encode("utf-8"))
+
+    def write_prometheus(self, path: str) -> None:
+        atomic_write_bytes(path, self.prometheus().encode("utf-8"))
+
+    def close(self) -> None:
+        for path in self.outputs:
+            if path.endswith(".prom"):
+                self.write_prometheus(path)
+            else:
+                self.write_jsonl(path)
+
+    def prometheus(self) -> str:
+        with self._lock:
+            traces = list(self.traces)
+        requests: dict[tuple, int] = {}
+        per_host: dict[tuple, dict] = {}
+        for t in traces:
+            key = (t.job, t.host)
+            code = str(t.http_status) if t.http_status else "error"
+            requests[key + (code,)] = requests.get(key + (code,), 0) + 1
+            h = per_host.setdefault(key, {
+                "bytes": 0, "retries": 0, "phases": dict.fromkeys(PHASES, 0.0),
+                "buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0,
+            })
+            h["bytes"] += t.bytes
+            h["retries"] += t.attempts - 1
+            for phase in PHASES:
+                h["phases"][phase] += getattr(t, phase)
+            for i, le in enumerate(DURATION_BUCKETS):
+                if t.total <= le:
+                    h["buckets"][i] += 1
+            h["sum"] += t.total
+            h["count"] += 1
+
+        out: list[str] = []
+
+        def family(name: str, kind: str, help_: str) -> None:
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} {kind}")
+
+        family("webmirror_requests_total", "counter", "Fetches that made a request, by final HTTP status.")
+        for (job, host, code), n in sorted(requests.items()):
+            out.append(f"webmirror_requests_total{_labels(job, host, status=code)} {n}")
+        family("webmirror_retries_total", "counter", "Extra attempts after a retryable failure.")
+        for (job, host), h in sorted(per_host.items()):
+            out.append(f"webmirror_retries_total{_labels(job, host)} {h['retries']}")
+        family("webmirror_bytes_total", "counter", "Response bytes read off the wire.")
+        for (job, host), h in sorted(per_host.items()):
+            out.append(f"webmirror_bytes_total{_labels(job, host)} {h['bytes']}")
+        family("webmirror_phase_seconds_total", "counter", "Time spent per request phase.")
+        for (job, host), h in sorted(per_host.items()):
+            for phase in PHASES:
+                out.append(f"webmirror_phase_seconds_total{_labels(job, host, phase=phase)} {h['phases'][phase]:.6f}")
+        family("webmirror_request_duration_seconds", "histogram", "Whole fetch time, retries included.")
+        for (job, host), h in sorted(per_host.items()):
+            for le, n in zip(DURATION_BUCKETS, h["buckets"]):
+                out.append(f"webmirror_request_duration_seconds_bucket{_labels(job, host, le=f'{le:g}')} {n}")
+            out.append(f"webmirror_request_duration_seconds_bucket{_labels(job, host, le='+Inf')} {h['count']}")
+            out.append(f"webmirror_request_duration_seconds_sum{_labels(job, host)} {h['sum']:.6f}")
+            out.append(f"webmirror_request_duration_seconds_count{_labels(job, host)} {h['count']}")
+        family("webmirror_last_run_timestamp_seconds", "gauge", "When these metrics were written.")
+        out.append(f"webmirror_last_run_timestamp_seconds {time.time():.3f}")
+        return "\n".join(out) + "\n"
+
+    # -----------------------------
+    # Summary
+    # -----------------------------
+    def summary(self, *, top: int = 5) -> str:
+        with self._lock:
+            traces = list(self.traces)
+        if not traces:
+            return "[+] Metrics: no requests made"
+
+        hosts: dict[str, list[Trace]] = {}
+        for t in traces:
+            hosts.setdefault(t.host, []).append(t)
+        w = max(len(h) for h in hosts) + 2
+        lines = [
+            "[+] Per host:",
+            f"    {'host':<{w}} {'reqs':>6} {'fail':>5} {'retries':>7} {'MB':>8} {'MB/s':>7} {'p50 ms':>7} {'p99 ms':>7}",
+        ]
+        for host, ts in sorted(hosts.items(), key=lambda kv: -sum(t.bytes for t in kv[1])):
+            size = sum(t.bytes for t in ts)
+            # wall time during which this host had a request in flight or queued
+            span = max(t.start + t.total for t in ts) - min(t.start for t in ts)
+            totals = sorted(t.total for t in ts)
+            lines.append(
+                f"    {host:<{w}} {len(ts):>6} {sum(t.status == 'FAIL' for t in ts):>5} "
+                f"{sum(t.attempts - 1 for t in ts):>7} {size / 1e6:>8.2f} "
+                f"{size / 1e6 / span if span > 0 else 0.0:>7.2f} "
+                f"{_pct(totals, 0.50) * 1000:>7.1f} {_pct(totals, 0.99) * 1000:>7.1f}"
+            )
+
+        slow = sorted(traces, key=lambda t: t.total, reverse=True)[:top]
+        lines.append(f"[+] Slowest {len(slow)} requests (ms: wait/connect/tls/ttfb/transfer):")
+        for t in slow:
+            phases = "/".join(f"{getattr(t, p) * 1000:.0f}" for p in PHASES)
+            retries = f" x{t.attempts}" if t.attempts > 1 else ""
+            lines.append(
+                f"    {t.total * 1000:>8.1f} ms  {phases:<20} {t.bytes / 1024:>8.1f} KB  "
+                f"{t.status}{retries}  {t.url}"
+            )
+        return "\n".join(lines)
+
+
+def _pct(xs: list[float], q: float) -> float:
+    """q-quantile of a sorted list."""
+    if not xs:
+        return 0.0
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+def _labels(job: str, host: str, **extra: str) -> str:
+    pairs = ([("job", job)] if job else []) + [("host", host)] + list(extra.items())
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+
+"""
+The mirroring engine: map URLs to local paths and bring them up to date.
+
+One Mirror owns the output folder, the validator manifest and the job
+journal. Worker threads, sessions and per-host scheduling come from a
+pool.FetchPool - private by default, shared across Mirrors in batch runs -
+so every CLI (webpack chunks, image lists, ...) shares the same fetch loop.
+
+The HTTP stack (requests, fetch, pool) is imported when the first Mirror is
+built: serve, verify and the other offline commands only need the layout
+helpers below.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from .fsutil import atomic_write_bytes, ensure_parent, link_file
+from .journal import Journal
+from .metrics import current_trace
+
+if TYPE_CHECKING:
+    import requests
+
+    from .blobstore import BlobStore
+    from .pool import FetchPool
+    from .ratelimit import HostThrottle
+
+
+# -----------------------------
+# Local layout
+# -----------------------------
+def local_path_for(out_root: str, url: str, *, keep_host: bool = False) -> str:
+    """
+    Map a URL to its place in the mirror:
+      https://host/a/b/c.png -> out_root/a/b/c.png        (keep_host=False)
+      https://host/a/b/c.png -> out_root/host/a/b/c.png   (keep_host=True)
+    A bare path ("/a/b/c.png") is accepted when keep_host is False.
+    """
+    p = urlparse(url)
+    rel = (p.netloc + p.path) if keep_host else p.path
+    if rel == "" or rel.endswith("/"):
+        # directory URL such as https://host/jsb-wap/ -> .../jsb-wap/index.html
+        rel += "index.html"
+    return os.path.join(out_root, rel.lstrip("/"))
+
+
+def save_file(out_root: str, url_path: str, data: bytes, *, store: BlobStore | None = None) -> str:
+    # url_path like "/jsb-wap/static/js/xx.js"
+    dest = local_path_for(out_root, url_path)
+    if store is not None:
+        store.put_bytes(dest, data)
+        return dest
+    return atomic_write_bytes(dest, data)
+
+
+def save_with_url_structure(out_root: str, url: str) -> str:
+    """
+    Convert URL to local path preserving directory structure:
+      https://host/a/b/c.png -> out_root/host/a/b/c.png
+    """
+    local_path = local_path_for(out_root, url, keep_host=True)
+    ensure_parent(local_path)
+    return local_path
+
+
+# -----------------------------
+# Incremental re-mirroring
+# -----------------------------
+# webpack output names like 12.d09be060270abc1839bd.js / Vote.f62c4f43.css /
+# heroes.42c6bba.jpg embed a content hash, so an existing non-empty file with
+# that name is already correct.
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{7,}\.\w+$")
+
+MANIFEST_NAME = ".mirror-manifest.json"
+
+
+def is_content_hashed(url_path: str) -> bool:
+    return HASHED_NAME_RE.search(url_path) is not None
+
+
+def load_manifest(out_root: str) -> dict[str, dict[str, str]]:
+    """
+    Sidecar manifest of HTTP validators: {url: {"etag": ..., "last_modified": ...}}.
+    """
+    path = os.path.join(out_root, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_root: str, manifest: dict[str, dict[str, str]]) -> None:
+    os.makedirs(out_root, exist_ok=True)
+    data = json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8")
+    atomic_write_bytes(os.path.join(out_root, MANIFEST_NAME), data)
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+def report_progress(
+    idx: int,
+    total: int,
+    url: str,
+    result: tuple[str, str] | Exception,
+    *,
+    every: int = 25,
+    label: str = "",
+) -> None:
+    tag = f"{label}: " if label else ""
+    if isinstance(result, Exception):
+        print(f"    {tag}[{idx}/{total}] FAIL {url}: {result}")
+    elif idx % every == 0 or idx == total:
+        status, path = result
+        print(f"    {tag}[{idx}/{total}] {status} -> {path}")
+
+
+class Mirror:
+    """
+    Download URLs into out_root, skipping work that is already done.
+
+    - pool: FetchPool to share with other Mirrors; without one, a private
+      pool is built from concurrency / per_host / rate
+    - concurrency: worker threads used by run() (1 = sequential)
+    - per_host: max simultaneous requests to one host (the adaptive limit
+      stays between 1 and this)
+    - rate: requests/s per host (None = unlimited until a 429/503)
+    - user_agent: sent with every request of this Mirror, also on a shared pool
+    - retries: attempts per URL for retryable failures; 404 & co. fail at once
+    - resume: keep the job journal of the previous run and do not request
+      URLs it records as done (as long as their file is still there)
+    - store: write bodies into this content-addressed BlobStore and link
+      them into out_root, so identical files across sites/snapshots are
+      stored once (the store may be shared; whoever created it closes it)
+    - reuse_from: an earlier mirror tree (previous snapshot); content-hashed
+      files present there are hard-linked instead of downloaded
+    - keep_host: put files under out_root/<host>/... instead of out_root/...
+    - skip_existing: treat any existing file as current (no request at all),
+      not only content-hashed chunk names
+    - force: ignore local files and stored validators, always re-download
+    - label: prefix for progress lines (batch runs interleave several jobs)
+    """
+
+    def __init__(
+        self,
+        out_root: str,
+        *,
+        user_agent: str,
+        concurrency: int = 1,
+        per_host: int = 6,
+        keep_host: bool = False,
+        skip_existing: bool = False,
+        force: bool = False,
+        rate: float | None = None,
+        retries: int = 4,
+        resume: bool = False,
+        store: BlobStore | None = None,
+        reuse_from: str | None = None,
+        pool: FetchPool | None = None,
+        label: str = "",
+        report_every: int = 25,
+    ) -> None:
+        self.out_root = out_root
+        self.user_agent = user_agent
+        self.keep_host = keep_host
+        self.skip_existing = skip_existing
+        self.force = force
+        self.retries = max(1, retries)
+        self.store = store
+        self.reuse_from = reuse_from
+        self.label = label
+        self.report_every = report_every
+
+        from .pool import FetchPool
+
+        self._own_pool = pool is None
+        self.pool = pool or FetchPool(
+            concurrency=concurrency, per_host=per_host, rate=rate, user_agent=user_agent
+        )
+        self.throttles = self.pool.throttles
+        self.metrics = self.pool.metrics
+        self.manifest = load_manifest(out_root)
+        self.journal = Journal(out_root, resume=resume)
+
+    def session(self) -> requests.Session:
+        return self.pool.session()
+
+    def _get(self, url: str, throttle: HostThrottle, local_path: str,
+             headers: dict[str, str] | None) -> tuple[requests.Response, str | None]:
+        """One attempt, holding a slot of the host's scheduler."""
+        import requests
+
+        from .fetch import stream_to_file
+
+        headers = {"User-Agent": self.user_agent, **(headers or {})}
+        trace = current_trace()
+        queued = time.perf_counter()
+        with throttle.slot() as slot:
+            started = time.perf_counter()
+            if trace is not None:
+                trace.attempts += 1
+                trace.wait += started - queued
+                setup = trace.connect + trace.tls
+            try:
+                r, digest = stream_to_file(
+                    url, self.session(), local_path, headers=headers, retries=1, store=self.store
+                )
+            except requests.HTTPError as e:
+                if trace is not None and e.response is not None:
+                    trace.http_status = e.response.status_code
+                raise
+            slot.latency = r.elapsed.total_seconds()
+        if trace is not None:
+            trace.response(r, started, setup)
+        return r, digest
+
+    def local_path(self, url: str) -> str:
+        return local_path_for(self.out_root, url, keep_host=self.keep_host)
+
+    def fetch(self, url: str) -> tuple[str, str]:
+        """
+        Bring one URL up to date in the mirror and record the outcome in
+        the journal.
+
+        Returns (status, local_path) where status is:
+          - "SKIP": already on disk (content-hashed name, skip_existing, or
+                    done in the resumed journal), no request made
+          - "304":  server confirmed the stored ETag/Last-Modified is current
+          - "OK":   body downloaded and written
+        """
+        trace = self.metrics.begin(url, job=self.label)
+        try:
+            status, local_path, digest = self._fetch(url)
+        except Exception as e:
+            self.metrics.end(trace, "FAIL", e)
+            self.journal.failed(url, e)
+            raise
+        self.metrics.end(trace, status)
+        self.journal.done(url, status, local_path, digest)
+        return status, local_path
+
+    def _fetch(self, url: str) -> tuple[str, str, str | None]:
+        up = urlparse(url)
+        local_path = self.local_path(url)
+        have_file = os.path.isfile(local_path) and os.path.getsize(local_path) > 0
+
+        if have_file and not self.force and (
+            self.skip_existing or is_content_hashed(up.path) or self.journal.is_done(url)
+        ):
+            return "SKIP", local_path, None
+
+        # an immutable URL another mirror/snapshot already stored: link it
+        if self.store is not None and not self.force and is_content_hashed(up.path):
+            blob = self.store.lookup(url)
+            if blob is not None:
+                self.store.link(blob, local_path)
+                return "SKIP", local_path, None
+
+        # unchanged chunk of the previous snapshot
+        if self.reuse_from and not self.force and is_content_hashed(up.path):
+            prev = local_path_for(self.reuse_from, url, keep_host=self.keep_host)
+            if os.path.isfile(prev) and os.path.getsize(prev) > 0:
+                link_file(prev, local_path)
+                return "SKIP", local_path, None
+
+        headers: dict[str, str] = {}
+        validators = self.manifest.get(url, {})
+        if have_file and not self.force:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        from .fetch import with_retries
+
+        throttle = self.throttles.get(up.netloc)
+        r, digest = with_retries(
+            lambda: self._get(url, throttle, local_path, headers or None),
+            retries=self.retries,
+        )
+        if r.status_code == 304:
+            return "304", local_path, None
+        if is_content_hashed(up.path):
+            if self.store is not None and digest:
+                self.store.remember(url, digest)
+            return "OK", local_path, digest
+
+        entry = {}
+        if r.headers.get("ETag"):
+            entry["etag"] = r.headers["ETag"]
+        if r.headers.get("Last-Modified"):
+            entry["last_modified"] = r.headers["Last-Modified"]
+        if entry:
+            self.manifest[url] = entry
+        else:
+            self.manifest.pop(url, None)
+        return "OK", local_path, digest
+
+    def fetch_bytes(self, url: str) -> tuple[str, bytes]:
+        """fetch() and return (status, file contents) - for small files like the runtime."""
+        status, path = self.fetch(url)
+        with open(path, "rb") as f:
+            return status, f.read()
+
+    def run(self, targets: list[str]) -> tuple[int, int, int]:
+        """
+        Fetch every target; returns (ok, up_to_date, fail). ok includes
+        up_to_date. Progress is reported in target order even when workers
+        finish out of order.
+        """
+        ok = 0
+        skipped = 0
+        fail = 0
+
+        def record(idx: int, url: str, result: tuple[str, str] | Exception) -> None:
+            nonlocal ok, skipped, fail
+            if isinstance(result, Exception):
+                fail += 1
+            else:
+                ok += 1
+                if result[0] != "OK":
+                    skipped += 1
+            report_progress(
+                idx, len(targets), url, result, every=self.report_every, label=self.label
+            )
+
+        if self.pool.inline:
+            for idx, url in enumerate(targets, 1):
+                try:
+                    result: tuple[str, str] | Exception = self.fetch(url)
+                except Exception as e:
+                    result = e
+                record(idx, url, result)
+        else:
+            futures = [self.pool.submit(self.fetch, url) for url in targets]
+            # iterating in submission order keeps the progress output ordered
+            for idx, (url, fut) in enumerate(zip(targets, futures), 1):
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    result = e
+                record(idx, url, result)
+        return ok, skipped, fail
+
+    def retry_failed(self) -> tuple[int, int, int]:
+        """run() over the URLs whose last journal entry is a failure."""
+        failed = self.journal.failed_urls()
+        tag = f"{self.label}: " if self.label else ""
+        print(f"[+] {tag}Retrying {len(failed)} failed URLs from {self.journal.path}")
+        return self.run(failed)
+
+    def close(self) -> None:
+        save_manifest(self.out_root, self.manifest)
+        self.journal.close()
+        if self._own_pool:
+            self.pool.close()
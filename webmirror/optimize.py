@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+
+"""
+Post-download image optimisation: lossless recompression in place, plus
+WebP variants next to the originals.
+
+  PNG   the image data (IDAT) is inflated and deflated again at zlib level
+        9 with the better of two strategies; text/time chunks are dropped.
+        Pixels, palette, transparency and colour chunks are kept byte for
+        byte (stdlib only).
+  JPEG  `jpegtran -copy all -optimize -progressive` when it is on PATH
+        (optimal Huffman tables; the DCT data is untouched).
+  WebP  <name>.<ext>.webp, lossless for PNG sources and quality 90 for
+        JPEG sources, with Pillow (`pip install pillow`) or `cwebp`. Kept
+        only when smaller than the (recompressed) original. `serve` sends it
+        to clients whose Accept includes image/webp.
+
+A result is only written when it is smaller, and always atomically (a new
+inode), so hard links into a blob store or an older snapshot are never
+modified through the mirror.
+
+<root>/.optimize-cache.json records, per file, the sha256 it had after
+optimisation and the size / sha256 / md5 of the downloaded original. Files
+whose current hash is already recorded are skipped without decoding, and
+`verify` accepts a recorded result in place of the journalled download (and
+checks hashed names such as heroes.42c6bba.jpg against the original's md5).
+
+Files are processed by a process pool: zlib and the WebP encoders spend
+most of their time holding the GIL or in a subprocess.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field
+
+from .fsutil import atomic_write_bytes
+
+try:
+    from PIL import Image
+except ImportError:  # optional: WebP variants via cwebp, or none
+    Image = None
+
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+CACHE_NAME = ".optimize-cache.json"
+WEBP_SUFFIX = ".webp"
+WEBP_JPEG_QUALITY = 90
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# ancillary chunks with no effect on how the image looks
+PNG_STRIP = frozenset((b"tEXt", b"zTXt", b"iTXt", b"tIME"))
+
+
+# -----------------------------
+# Encoders
+# -----------------------------
+def _png_chunks(data: bytes) -> list[tuple[bytes, bytes]] | None:
+    chunks = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 12 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if len(body) != length:
+            return None
+        chunks.append((ctype, body))
+        pos += 12 + length
+        if ctype == b"IEND":
+            return chunks
+    return None  # truncated
+
+
+def _png_chunk(ctype: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body))
+
+
+def _deflate(raw: bytes, strategy: int) -> bytes:
+    c = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+    return c.compress(raw) + c.flush()
+
+
+def recompress_png(data: bytes) -> bytes | None:
+    """Smaller PNG with identical pixels, or None (not smaller / not a PNG we understand)."""
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    chunks = _png_chunks(data)
+    if chunks is None:
+        return None
+    try:
+        raw = zlib.decompress(b"".join(body for ctype, body in chunks if ctype == b"IDAT"))
+    except zlib.error:  # e.g. Apple's CgBI PNGs (raw deflate)
+        return None
+    idat = min((_deflate(raw, s) for s in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)), key=len)
+
+    out = [PNG_SIGNATURE]
+    wrote_idat = False
+    for ctype, body in chunks:
+        if ctype == b"IDAT":
+            if not wrote_idat:
+                out.append(_png_chunk(b"IDAT", idat))
+                wrote_idat = True
+        elif ctype not in PNG_STRIP:
+            out.append(_png_chunk(ctype, body))
+    result = b"".join(out)
+    return result if len(result) < len(data) else None
+
+
+def recompress_jpeg(data: bytes) -> bytes | None:
+    """jpegtran's lossless re-encoding, or None (no jpegtran / not smaller)."""
+    if shutil.which("jpegtran") is None:
+        return None
+    try:
+        proc = subprocess.run(
+            ["jpegtran", "-copy", "all", "-optimize", "-progressive"],
+            input=data,
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout if proc.stdout and len(proc.stdout) < len(data) else None
+
+
+def webp_encoder() -> str:
+    """"pillow", "cwebp" or "" (no WebP variants)."""
+    if Image is not None and "WEBP" in Image.SAVE:
+        return "pillow"
+    if shutil.which("cwebp") is not None:
+        return "cwebp"
+    return ""
+
+
+def encode_webp(data: bytes, *, lossless: bool, encoder: str) -> bytes | None:
+    if encoder == "pillow":
+        try:
+            img = Image.open(io.BytesIO(data))
+            if getattr(img, "is_animated", False):
+                return None
+            if img.mode not in ("RGB", "RGBA"):
+                alpha = img.mode in ("LA", "PA", "RGBa") or "transparency" in img.info
+                img = img.convert("RGBA" if alpha else "RGB")
+            buf = io.BytesIO()
+            if lossless:
+                img.save(buf, "WEBP", lossless=True, method=6)
+            else:
+                img.save(buf, "WEBP", quality=WEBP_JPEG_QUALITY, method=6)
+            return buf.getvalue()
+        except (OSError, ValueError):
+            return None
+    if encoder == "cwebp":
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "in")
+            dst = os.path.join(tmp, "out.webp")
+            with open(src, "wb") as f:
+                f.write(data)
+            opts = ["-lossless", "-z", "9"] if lossless else ["-q", str(WEBP_JPEG_QUALITY), "-m", "6"]
+            try:
+                subprocess.run(["cwebp", "-quiet", *opts, src, "-o", dst], capture_output=True, check=True)
+                with open(dst, "rb") as f:
+                    return f.read()
+            except (OSError, subprocess.CalledProcessError):
+                return None
+    return None
+
+
+# -----------------------------
+# Per-file work (runs in worker processes)
+# -----------------------------
+@dataclass
+class Optimized:
+    rel: str
+    before: int = 0
+    after: int = 0
+    # bytes of the .webp sibling; 0 = not smaller than the image, None = no encoder
+    webp: int | None = None
+    skipped: bool = False
+    entry: dict = field(default_factory=dict)
+    error: str = ""
+
+
+def optimize_file(task: tuple[str, str, dict | None, str]) -> Optimized:
+    root, rel, cached, encoder = task
+    path = os.path.join(root, rel)
+    res = Optimized(rel)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        res.error = str(e)
+        return res
+    res.before = res.after = len(data)
+    digest = hashlib.sha256(data).hexdigest()
+    webp_path = path + WEBP_SUFFIX
+
+    known = cached is not None and cached.get("sha256") == digest
+    if known:
+        # done before; only redo the variant if an encoder showed up or it was deleted
+        webp = cached.get("webp")
+        if (webp is not None or not encoder) and (not webp or os.path.isfile(webp_path)):
+            res.skipped = True
+            res.webp = webp
+            res.entry = cached
+            return res
+        source = {k: cached[k] for k in ("source_size", "source_sha256", "source_md5")}
+    else:
+        source = {
+            "source_size": len(data),
+            "source_sha256": digest,
+            "source_md5": hashlib.md5(data).hexdigest(),
+        }
+    png = rel.lower().endswith(".png")
+    try:
+        smaller = recompress_png(data) if png else recompress_jpeg(data)
+        if smaller is not None:
+            atomic_write_bytes(path, smaller)
+            data = smaller
+            digest = hashlib.sha256(data).hexdigest()
+        res.after = len(data)
+
+        if encoder:
+            webp = encode_webp(data, lossless=png, encoder=encoder)
+            if webp is not None and len(webp) < len(data):
+                atomic_write_bytes(webp_path, webp)
+                res.webp = len(webp)
+            else:
+                res.webp = 0
+                if os.path.isfile(webp_path):
+                    os.unlink(webp_path)  # stale variant of an older version of the file
+    except (OSError, zlib.error) as e:
+        res.error = str(e)
+        return res
+    res.entry = {"sha256": digest, "size": len(data), "webp": res.webp, **source}
+    return res
+
+
+# -----------------------------
+# Tree
+# -----------------------------
+@dataclass
+class OptimizeReport:
+    root: str
+    files: int = 0
+    skipped: int = 0
+    before: int = 0
+    after: int = 0
+    webp_files: int = 0
+    webp_bytes: int = 0  # sum of the variants that were kept
+    webp_base: int = 0  # ... and of the images they stand in for
+    encoder: str = ""
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        saved = self.before - self.after
+        text = (
+            f"{self.files} images ({self.skipped} unchanged since the last run), "
+            f"{self.before / 1e6:.2f} MB -> {self.after / 1e6:.2f} MB (-{saved / 1e3:.0f} KB)"
+        )
+        if not self.encoder:
+            text += "; no WebP encoder (pip install pillow, or cwebp on PATH)"
+        elif self.webp_files:
+            text += (
+                f"; {self.webp_files} WebP variants, {self.webp_base / 1e6:.2f} MB -> "
+                f"{self.webp_bytes / 1e6:.2f} MB for clients that accept image/webp"
+            )
+        return f"{text} in {self.seconds:.1f}s"
+
+
+def load_cache(root: str) -> dict[str, dict]:
+    try:
+        with open(os.path.join(root, CACHE_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def find_images(root: str) -> list[str]:
+    """Image paths under root, relative to it ("/"-separated)."""
+    rels = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.startswith(".") or not name.lower().endswith(IMAGE_EXTS):
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.islink(path):
+                continue
+            rels.append(os.path.relpath(path, root).replace(os.sep, "/"))
+    return rels
+
+
+def optimize_tree(
+    root: str,
+    *,
+    jobs: int | None = None,
+    webp: bool = True,
+    inherit: str | None = None,
+) -> OptimizeReport:
+    """
+    Optimise every image under root.
+
+    - inherit: an earlier tree (previous snapshot) whose cache entries are
+      used for files that were hard-linked from it unchanged, so they keep
+      the record of their original download
+    """
+    t0 = time.perf_counter()
+    cache = load_cache(root)
+    if inherit:
+        cache = {**load_cache(inherit), **cache}
+    encoder = webp_encoder() if webp else ""
+    report = OptimizeReport(root, encoder=encoder)
+    tasks = [(root, rel, cache.get(rel), encoder) for rel in find_images(root)]
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 8:
+        results = list(map(optimize_file, tasks))
+    else:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # jobs run this next to the fetch pool's threads; fork() under
+        # running threads can deadlock the children
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as ex:
+            results = list(ex.map(optimize_file, tasks))
+
+    new_cache: dict[str, dict] = {}
+    for r in results:
+        if r.error:
+            report.errors.append(f"{r.rel}: {r.error}")
+            continue
+        report.files += 1
+        report.skipped += r.skipped
+        report.before += r.entry["source_size"]
+        report.after += r.after
+        if r.webp:
+            report.webp_files += 1
+            report.webp_bytes += r.webp
+            report.webp_base += r.after
+        new_cache[r.rel] = r.entry
+    if new_cache != cache:
+        atomic_write_bytes(
+            os.path.join(root, CACHE_NAME),
+            json.dumps(new_cache, indent=1, sort_keys=True).encode("utf-8"),
+        )
+    report.seconds = time.perf_counter() - t0
+    return report
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+
+"""
+Precompressed siblings and a single indexed archive for serving a tree.
+
+  python3 -m webmirror pack jsb_web                       # .gz / .br siblings
+  python3 -m webmirror pack jsb_web --archive jsb.pack    # + one archive
+  python3 -m webmirror serve --root jsb_web --pack jsb.pack
+
+Siblings: every text asset serve would compress (JS, CSS, HTML, SVG, JSON,
+... of at least 1 KB) gets <name>.gz (gzip -9) and, with the brotli module,
+<name>.br (quality 11), kept only when smaller than the file. serve uses
+them instead of compressing at startup. <root>/.pack-cache.json records the
+sha256 each pair was made from: files with the same size and mtime are not
+even read, touched files with the same hash are not compressed again.
+Compression runs on a thread pool; zlib and brotli release the GIL.
+
+Archive layout:
+
+  0    b"WMPACK1\\0"
+  8    index offset  (u64, little-endian)
+  16   index length  (u64)
+  24   bodies: each file's identity / gzip / br bytes, back to back
+  ...  index, JSON: {"fingerprint": ..., "files": {url_path: {"size",
+       "mtime_ns", "sha256", "type", "spans": {"identity": [offset, length],
+       "gzip": [...], "br": [...]}}}}
+
+A server reads the index once and maps the file: no directory walk at
+startup and no stat()/open() per request, and bodies go out with
+os.sendfile() straight from the archive's page cache. The archive is only
+rewritten (atomically) when a file, sibling, size or mtime in the tree
+changed since the one on disk was built.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import socket
+import struct
+import time
+from dataclasses import dataclass, field
+
+from .fsutil import atomic_write_bytes, commit_temp, open_temp
+
+try:
+    import brotli
+except ImportError:  # optional, as in serve
+    brotli = None
+
+# serve (and http.server with it) is only imported by the functions that
+# need it: the pack command itself never serves
+
+
+PACK_MAGIC = b"WMPACK1\0"
+PACK_HEADER = struct.Struct("<8sQQ")
+CACHE_NAME = ".pack-cache.json"
+SIBLINGS = (("gzip", ".gz"), ("br", ".br"))
+
+
+def _compress(enc: str, data: bytes) -> bytes:
+    if enc == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def encodings() -> tuple[str, ...]:
+    return ("gzip", "br") if brotli is not None else ("gzip",)
+
+
+# -----------------------------
+# Siblings
+# -----------------------------
+@dataclass
+class PackReport:
+    root: str
+    files: int = 0
+    skipped: int = 0
+    raw_bytes: int = 0
+    compressed: dict[str, int] = field(default_factory=dict)  # encoding -> bytes of its siblings
+    archive: str = ""
+    archive_files: int = 0
+    archive_bytes: int = 0
+    archive_rebuilt: bool = False
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        parts = [f"{self.files} text assets ({self.skipped} unchanged), {self.raw_bytes / 1e6:.2f} MB"]
+        for enc, size in self.compressed.items():
+            parts.append(f"{enc} {size / 1e6:.2f} MB")
+        if brotli is None:
+            parts.append("no .br (pip install brotli)")
+        text = ", ".join(parts)
+        if self.archive:
+            state = "written" if self.archive_rebuilt else "up to date"
+            text += (
+                f"; archive {self.archive} {state} "
+                f"({self.archive_files} files, {self.archive_bytes / 1e6:.2f} MB)"
+            )
+        return f"{text} in {self.seconds:.1f}s"
+
+
+def load_cache(root: str) -> dict[str, dict]:
+    try:
+        with open(os.path.join(root, CACHE_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def find_files(root: str) -> list[str]:
+    """Files under root relative to it ("/"-separated), without dot files and siblings."""
+    rels = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        names = set(files)
+        for name in sorted(files):
+            if name.startswith(".") or os.path.islink(os.path.join(dirpath, name)):
+                continue
+            stem, ext = os.path.splitext(name)
+            if ext in (".gz", ".br") and stem in names:
+                continue
+            rels.append(os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/"))
+    return rels
+
+
+def _compressible(rel: str, size: int) -> bool:
+    from .serve import COMPRESSIBLE_EXTS, MIN_COMPRESS_SIZE
+
+    return os.path.splitext(rel)[1].lower() in COMPRESSIBLE_EXTS and size >= MIN_COMPRESS_SIZE
+
+
+def _pack_one(root: str, rel: str, cached: dict | None, encs: tuple[str, ...]) -> tuple[dict, bool]:
+    """(cache entry, skipped) after bringing rel's siblings up to date."""
+    path = os.path.join(root, rel)
+    st = os.stat(path)
+    fresh = cached is not None and all(enc in cached for enc in encs) and all(
+        not cached.get(enc) or os.path.isfile(path + ext) for enc, ext in SIBLINGS
+    )
+    if fresh and cached.get("size") == st.st_size and cached.get("mtime_ns") == st.st_mtime_ns:
+        return cached, True
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if fresh and cached.get("sha256") == digest:
+        # touched, not changed: keep the siblings, but newer than the file again
+        for enc, ext in SIBLINGS:
+            if cached.get(enc):
+                os.utime(path + ext)
+        return dict(cached, size=st.st_size, mtime_ns=st.st_mtime_ns), True
+
+    entry = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    for enc, ext in SIBLINGS:
+        sib = path + ext
+        body = _compress(enc, data) if enc in encs else None
+        if body is not None and len(body) < len(data):
+            atomic_write_bytes(sib, body)
+            entry[enc] = len(body)
+        else:
+            if enc in encs:
+                entry[enc] = 0
+            if os.path.isfile(sib):
+                os.unlink(sib)  # made from an older version of the file
+    return entry, False
+
+
+def pack_tree(
+    root: str,
+    *,
+    jobs: int | None = None,
+    archive: str = "",
+) -> PackReport:
+    t0 = time.perf_counter()
+    report = PackReport(root, archive=archive)
+    cache = load_cache(root)
+    encs = encodings()
+    rels = find_files(root)
+    if archive:
+        rels = [rel for rel in rels if os.path.abspath(os.path.join(root, rel)) != os.path.abspath(archive)]
+    text = [rel for rel in rels if _compressible(rel, os.path.getsize(os.path.join(root, rel)))]
+
+    from concurrent.futures import ThreadPoolExecutor  # kept off `import webmirror.pack` (serve)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as ex:
+        results = list(ex.map(lambda rel: _pack_one(root, rel, cache.get(rel), encs), text))
+
+    new_cache: dict[str, dict] = {}
+    for rel, (entry, skipped) in zip(text, results):
+        new_cache[rel] = entry
+        report.files += 1
+        report.skipped += skipped
+        report.raw_bytes += entry["size"]
+        for enc in encs:
+            report.compressed[enc] = report.compressed.get(enc, 0) + (entry.get(enc) or entry["size"])
+    if new_cache != cache:
+        atomic_write_bytes(
+            os.path.join(root, CACHE_NAME),
+            json.dumps(new_cache, indent=1, sort_keys=True).encode("utf-8"),
+        )
+
+    if archive:
+        report.archive_files, report.archive_bytes, report.archive_rebuilt = build_archive(
+            root, archive, rels, new_cache
+        )
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+# -----------------------------
+# Archive
+# -----------------------------
+def _fingerprint(root: str, rels: list[str]) -> str:
+    h = hashlib.sha256()
+    for rel in rels:
+        path = os.path.join(root, rel)
+        row = [rel]
+        for p in (path, path + ".gz", path + ".br"):
+            try:
+                st = os.stat(p)
+                row += [st.st_size, st.st_mtime_ns]
+            except OSError:
+                row += [-1, -1]
+        h.update(json.dumps(row).encode("utf-8"))
+    return h.hexdigest()
+
+
+def read_index(path: str) -> dict | None:
+    try:
+        with open(path, "rb") as f:
+            magic, off, length = PACK_HEADER.unpack(f.read(PACK_HEADER.size))
+            if magic != PACK_MAGIC:
+                return None
+            f.seek(off)
+            return json.loads(f.read(length))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def build_archive(root: str, dest: str, rels: list[str], cache: dict[str, dict]) -> tuple[int, int, bool]:
+    """(files, bytes, rewritten) for the archive of root at dest."""
+    from .serve import content_type
+
+    fingerprint = _fingerprint(root, rels)
+    old = read_index(dest)
+    if old is not None and old.get("fingerprint") == fingerprint:
+        return len(old["files"]), os.path.getsize(dest), False
+
+    files: dict[str, dict] = {}
+    fd, tmp = open_temp(dest)
+    try:
+        f = os.fdopen(fd, "wb")
+        with f:
+            f.write(PACK_HEADER.pack(PACK_MAGIC, 0, 0))
+            for rel in rels:
+                path = os.path.join(root, rel)
+                st = os.stat(path)
+                spans: dict[str, list[int]] = {}
+                sources = [("identity", path)] + [
+                    (enc, path + ext) for enc, ext in SIBLINGS
+                    if (cache.get(rel) or {}).get(enc) and os.path.isfile(path + ext)
+                ]
+                digest = hashlib.sha256()
+                for enc, src in sources:
+                    start = f.tell()
+                    with open(src, "rb") as s:
+                        if enc == "identity":
+                            for block in iter(lambda: s.read(1 << 20), b""):
+                                digest.update(block)
+                                f.write(block)
+                        else:
+                            shutil.copyfileobj(s, f, 1 << 20)
+                    spans[enc] = [start, f.tell() - start]
+                files["/" + rel] = {
+                    "size": spans["identity"][1],
+                    "mtime_ns": st.st_mtime_ns,
+                    "sha256": digest.hexdigest(),
+                    "type": content_type(path),
+                    "spans": spans,
+                }
+            index = json.dumps({"fingerprint": fingerprint, "files": files}, separators=(",", ":")).encode("utf-8")
+            index_at = f.tell()
+            f.write(index)
+            size = f.tell()
+            f.seek(0)
+            f.write(PACK_HEADER.pack(PACK_MAGIC, index_at, len(index)))
+            commit_temp(f, tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return len(files), size, True
+
+
+class PackArchive:
+    """A pack file opened for serving: the index in memory, the bodies mapped."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._f = open(path, "rb")
+        self.fd = self._f.fileno()
+        try:
+            self.mm = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+            magic, off, length = PACK_HEADER.unpack_from(self.mm, 0)
+            if magic != PACK_MAGIC:
+                raise ValueError(f"{path}: not a pack archive")
+            index = json.loads(self.mm[off:off + length])
+        except BaseException:
+            self._f.close()
+            raise
+        self.files: dict[str, dict] = index["files"]
+
+    def view(self, span: list[int] | tuple[int, int]) -> memoryview:
+        off, length = span
+        return memoryview(self.mm)[off:off + length]
+
+    def sendfile(self, sock: socket.socket, offset: int, count: int) -> None:
+        """Send count bytes from offset; zero-copy where os.sendfile() works."""
+        from .serve import sendfile
+
+        sendfile(sock, self.fd, offset, count, self.mm)
+
+    def close(self) -> None:
+        self.mm.close()
+        self._f.close()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+Worker threads, HTTP transport and per-host throttles that several Mirrors
+can share.
+
+A single CLI run gets a private FetchPool. A batch run creates one and hands
+it to every job, so all sites draw from the same concurrency budget, reuse
+the same keep-alive connections, and respect one per-host limit even when
+two jobs hit the same CDN.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, TypeVar, Union
+
+from .metrics import Metrics
+from .ratelimit import HostThrottles
+
+if TYPE_CHECKING:
+    import requests
+
+    from .transport import H2Session, Http2Transport, RequestsTransport
+
+    Transport = Union[RequestsTransport, Http2Transport]
+
+
+T = TypeVar("T")
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
+)
+
+
+class FetchPool:
+    """
+    - concurrency: worker threads (the global budget)
+    - per_host / rate: see ratelimit.HostThrottle
+    - inline: with concurrency 1, fetch on the caller's thread instead of a
+      worker. Batch runs turn this off so jobs running side by side still
+      queue for the same single worker.
+    - transport: "requests", "http2" (see transport.py) or a transport
+      object; keep_alive applies to the named ones
+    - metrics: where the Mirrors on this pool record their request traces
+      (a fresh in-memory Metrics by default); close() writes its files
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = 1,
+        per_host: int = 6,
+        rate: float | None = None,
+        user_agent: str = DEFAULT_USER_AGENT,
+        inline: bool = True,
+        transport: str | Transport = "requests",
+        keep_alive: bool = True,
+        metrics: Metrics | None = None,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.user_agent = user_agent
+        self.inline = inline and self.concurrency == 1
+        self.throttles = HostThrottles(max_concurrency=max(1, per_host), rate=rate)
+        if isinstance(transport, str):
+            from .transport import make_transport  # urllib3 adapters / httpx, on first use
+
+            transport = make_transport(
+                transport,
+                user_agent=user_agent,
+                concurrency=self.concurrency,
+                per_host=max(1, per_host),
+                keep_alive=keep_alive,
+            )
+        self.transport = transport
+        self.metrics = metrics or Metrics()
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def session(self) -> requests.Session | H2Session:
+        return self.transport.session()
+
+    def submit(self, fn: Callable[..., T], *args) -> Future[T]:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix="webmirror"
+                )
+            return self._executor.submit(fn, *args)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.transport.close()
+        self.metrics.close()
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-route preload / prefetch hints from a mirrored webpack SPA's chunk graph.
+
+index.html only loads the entry chunks; the chunk a route needs is found
+once the runtime has run and the router resolved the URL, and its own
+lazy imports only after that, one round trip each. This module reads, all
+offline:
+
+  index.html   entry <script src> / <link rel=stylesheet href> (local ones)
+  runtime      chunk id -> JS / CSS file (parse_runtime)
+  chunks       the ids each file pushes (webpackJsonp.push([[11],...])), and
+               every lazy load in it: n.e(44) or Promise.all([n.e(1),n.e(9)])
+               - a group of chunks fetched together
+  routes       vue-router records {path:"/Heroes/ArticleRank/:id", ...,
+               component:function(){return Promise.all([...]).then(...)}},
+               also via a variable (component:r with r=function(){...})
+
+and writes <spa>/.prefetch.json:
+
+  {"runtime": "static/js/runtime.<hash>.js",
+   "entry":   [[href, as], ...],
+   "routes":  [{"path": "/Heroes/ArticleRank/:id", "chunks": [1, 3, 9],
+                "preload": [[href, as], ...], "prefetch": [[href, as], ...]}]}
+
+preload is what the route renders with (its group's JS and CSS, minus what
+the entry already loads), prefetch what those chunks load lazily in turn.
+Files that are not in the mirror (e.g. a /jsb-wap/dll/vendor-dll.*.js
+index.html names but the server never had) are left out of all three, so
+no page preloads a 404; run `prefetch` again once they are downloaded.
+`serve` answers an SPA page with a 103 Early Hints response listing the
+entry files and the route's preloads before the page itself, then repeats
+them in a Link header and as <link rel=preload/prefetch> tags in the page,
+so a route's chunks are fetched in parallel with the entry bundles instead
+of after them.
+
+Route paths are relative to the SPA folder (the router's base). Nested
+child routes with relative paths are not resolved and get the entry hints
+only, like any path no route matches.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from .fsutil import atomic_write_bytes
+from .runtime import ChunkId, RuntimeInfo, parse_runtime
+from .snapshot import find_runtime
+
+
+MANIFEST_NAME = ".prefetch.json"
+
+_STR = r"""(?:"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')"""
+_ID = r"""(?:\d+|"[^"\\\n]*"|'[^'\\\n]*')"""
+
+# webpackJsonp.push([[13, 14], {...modules...}, ...]) at the top of a chunk file
+PUSH_RE = re.compile(r"\.push\(\[\[([^\]]*)\]")
+# one lazy load: Promise.all([n.e(1),n.e(3)]) or n.e(44)
+_ENSURE = rf"(?<![\w$.])[A-Za-z_$][\w$]*\.e\(({_ID})\)"
+ENSURE_RE = re.compile(_ENSURE)
+LOAD_RE = re.compile(rf"Promise\.all\(\[(?P<all>[^\]]*)\]\)|{_ENSURE}")
+# the runtime's "has CSS" map, r.e: {0:1,1:1,5:1}[e] - chunks missing from it have
+# a CSS hash but no stylesheet is ever requested for them
+CSS_PRESENT_RE = re.compile(r"\{((?:\d+|\"[^\"\n]*\"):1(?:,(?:\d+|\"[^\"\n]*\"):1)*)\}\[[A-Za-z_$][\w$]*\]")
+ROUTE_RE = re.compile(rf"(?<![\w$])path:(?P<path>{_STR})")
+# inside a route record: strings (skipped whole), brackets and the component key
+WALK_RE = re.compile(rf"{_STR}|(?<![\w$])component:|[{{}}\[\]()]")
+_LAZY = r"(?:function\s*\(\s*\)\s*\{\s*return\s*|\(\s*\)\s*=>\s*\(?\s*)"
+COMPONENT_RE = re.compile(rf"\s*(?:{_LAZY}|(?P<name>[A-Za-z_$][\w$]*)\s*[,}}])")
+SCRIPT_RE = re.compile(r"""<script\b[^>]*?\bsrc=["']?([^"'\s>]+)""", re.I)
+LINK_RE = re.compile(r"<link\b[^>]*>", re.I)
+HREF_RE = re.compile(r"""\bhref=["']?([^"'\s>]+)""", re.I)
+STYLESHEET_RE = re.compile(r"""\brel=["']?stylesheet\b""", re.I)
+
+
+def _chunk_id(lit: str) -> ChunkId:
+    lit = lit.strip()
+    return int(lit) if lit.isdigit() else lit.strip("\"'")
+
+
+# -----------------------------
+# Graph
+# -----------------------------
+@dataclass
+class Route:
+    path: str
+    chunks: tuple[ChunkId, ...] = ()
+
+
+@dataclass
+class ChunkGraph:
+    public_path: str
+    # chunk id -> [(href, "script" | "style")]
+    files: dict[ChunkId, list[tuple[str, str]]] = field(default_factory=dict)
+    # chunk id -> groups of chunks it loads lazily
+    loads: dict[ChunkId, list[tuple[ChunkId, ...]]] = field(default_factory=dict)
+    entry: list[tuple[str, str]] = field(default_factory=list)
+    entry_chunks: set[ChunkId] = field(default_factory=set)
+    routes: list[Route] = field(default_factory=list)
+
+    def hrefs(self, chunks) -> list[tuple[str, str]]:
+        out: list[tuple[str, str]] = []
+        for cid in chunks:
+            if cid not in self.entry_chunks:
+                out.extend(h for h in self.files.get(cid, ()) if h not in out)
+        return out
+
+    def reachable(self, chunks) -> list[ChunkId]:
+        """Chunks loaded lazily, directly or not, by any of chunks (not chunks themselves)."""
+        seen = set(chunks)
+        out: list[ChunkId] = []
+        todo = list(chunks)
+        while todo:
+            for group in self.loads.get(todo.pop(), ()):
+                for cid in group:
+                    if cid not in seen:
+                        seen.add(cid)
+                        out.append(cid)
+                        todo.append(cid)
+        return out
+
+
+def _chunk_files(info: RuntimeInfo, runtime_text: str, public_path: str) -> dict[ChunkId, list[tuple[str, str]]]:
+    m = CSS_PRESENT_RE.search(runtime_text)
+    with_css = {_chunk_id(e.rpartition(":")[0]) for e in m.group(1).split(",")} if m else None
+    files: dict[ChunkId, list[tuple[str, str]]] = {}
+    for tpl, kind in ((info.js, "script"), (info.css, "style")):
+        if tpl is None:
+            continue
+        for cid, path in tpl.paths().items():
+            if kind == "style" and with_css is not None and cid not in with_css:
+                continue
+            files.setdefault(cid, []).append((public_path + path, kind))
+    return files
+
+
+def _entry_hrefs(html: str) -> list[tuple[str, str]]:
+    """Local scripts and stylesheets of index.html, in document order."""
+    found: list[tuple[int, str, str]] = []
+    for m in SCRIPT_RE.finditer(html):
+        found.append((m.start(), m.group(1), "script"))
+    for m in LINK_RE.finditer(html):
+        href = HREF_RE.search(m.group())
+        if href and STYLESHEET_RE.search(m.group()):
+            found.append((m.start(), href.group(1), "style"))
+    # relative hrefs would resolve against the deep link, not the SPA folder
+    return [(href, kind) for _, href, kind in sorted(found) if href.startswith("/") and not href.startswith("//")]
+
+
+def _load_groups(text: str, known: set) -> list[tuple[ChunkId, ...]]:
+    groups: list[tuple[ChunkId, ...]] = []
+    for m in LOAD_RE.finditer(text):
+        ids = ENSURE_RE.findall(m.group("all")) if m.group("all") is not None else [m.group(2)]
+        group = tuple(cid for cid in map(_chunk_id, ids) if cid in known)
+        if group and group not in groups:
+            groups.append(group)
+    return groups
+
+
+def _component_load(text: str, pos: int, known: set) -> tuple[ChunkId, ...] | None:
+    """Chunks of the lazy component of the route record whose path ends at pos."""
+    depth = 0
+    for m in WALK_RE.finditer(text, pos, min(len(text), pos + 4000)):
+        tok = m.group()
+        if tok[0] in "\"'":
+            continue
+        if tok in "{[(":
+            depth += 1
+        elif tok in "}])":
+            depth -= 1
+            if depth < 0:
+                return None  # record closed without a component (router internals, redirects)
+        elif depth == 0:
+            pos = m.end()
+            break
+    else:
+        return None
+    c = COMPONENT_RE.match(text, pos)
+    if c is None:
+        return ()
+    if c.group("name"):
+        # component:r -> the last `r=function(){return ...}` before the record
+        defs = list(re.finditer(
+            rf"(?<![\w$.]){re.escape(c.group('name'))}\s*=\s*{_LAZY}", text[max(0, pos - 20000):pos]
+        ))
+        if not defs:
+            return ()  # a component bundled with the entry, e.g. d.default
+        pos = max(0, pos - 20000) + defs[-1].end()
+    else:
+        pos = c.end()
+    load = LOAD_RE.match(text, pos)
+    if load is None:
+        return ()
+    groups = _load_groups(load.group(), known)
+    return groups[0] if groups else ()
+
+
+def build_graph(spa_dir: str) -> ChunkGraph:
+    """The chunk graph of the SPA mirrored in spa_dir (index.html + one runtime)."""
+    runtime = find_runtime(spa_dir)
+    with open(runtime, "r", encoding="utf-8", errors="replace") as f:
+        runtime_text = f.read()
+    info = parse_runtime(runtime_text)
+    if info.js is None:
+        raise ValueError(f"{runtime}: no JS chunk map")
+    public_path = info.public_path or "/"
+    graph = ChunkGraph(public_path, files=_chunk_files(info, runtime_text, public_path))
+    known = set(graph.files)
+
+    with open(os.path.join(spa_dir, "index.html"), "r", encoding="utf-8", errors="replace") as f:
+        graph.entry = _entry_hrefs(f.read())
+
+    # every file under publicPath the runtime or index.html names
+    chunk_of = {href: cid for cid, hrefs in graph.files.items() for href, kind in hrefs if kind == "script"}
+    scripts = [href for href, kind in graph.entry if kind == "script"] + list(chunk_of)
+    seen_routes: set[str] = set()
+    for href in scripts:
+        if not href.startswith(public_path):
+            continue
+        path = os.path.join(spa_dir, *href[len(public_path):].split("/"))
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            continue  # not mirrored (yet); `verify` reports it
+        push = PUSH_RE.search(text, 0, 200)
+        pushed = [_chunk_id(c) for c in push.group(1).split(",") if c.strip()] if push else []
+        if href not in chunk_of:
+            graph.entry_chunks.update(pushed)
+        groups = _load_groups(text, known)
+        for cid in pushed or [chunk_of.get(href)]:
+            if cid is None:
+                continue
+            loads = graph.loads.setdefault(cid, [])
+            loads.extend(g for g in groups if g not in loads)
+        for m in ROUTE_RE.finditer(text):
+            route_path = m.group("path")[1:-1]
+            if not route_path.startswith("/") or route_path in seen_routes:
+                continue
+            chunks = _component_load(text, m.end(), known)
+            if chunks is None:
+                continue
+            seen_routes.add(route_path)
+            graph.routes.append(Route(route_path, chunks))
+    return graph
+
+
+def _site_root(spa_dir: str, public_path: str) -> str | None:
+    """The mirror root spa_dir sits in at publicPath (jsb_web for jsb_web/jsb-wap), or None."""
+    root = os.path.abspath(spa_dir)
+    for part in reversed([p for p in urlparse(public_path).path.split("/") if p]):
+        if os.path.basename(root) != part:
+            return None
+        root = os.path.dirname(root)
+    return root
+
+
+def _in_tree(spa_dir: str, public_path: str, href: str) -> bool:
+    """Whether href is a file of the mirror; True when that cannot be told (outside the tree)."""
+    path = href.split("?", 1)[0].split("#", 1)[0]
+    if path.startswith(public_path):
+        base, rel = spa_dir, path[len(public_path):]
+    else:
+        base, rel = _site_root(spa_dir, public_path), urlparse(path).path.lstrip("/")
+        if base is None or path.startswith("//") or "://" in path:
+            return True
+    return os.path.isfile(os.path.join(base, *rel.split("/")))
+
+
+def build_manifest(spa_dir: str) -> dict:
+    graph = build_graph(spa_dir)
+    present: dict[str, bool] = {}
+
+    def mirrored(hrefs: list[tuple[str, str]]) -> list[list[str]]:
+        out = []
+        for href, kind in hrefs:
+            ok = present.get(href)
+            if ok is None:
+                ok = present[href] = _in_tree(spa_dir, graph.public_path, href)
+            if ok:
+                out.append([href, kind])
+        return out
+
+    routes = []
+    for route in graph.routes:
+        preload = graph.hrefs(route.chunks)
+        prefetch = [h for h in graph.hrefs(graph.reachable(route.chunks)) if h not in preload]
+        routes.append({
+            "path": route.path,
+            "chunks": list(route.chunks),
+            "preload": mirrored(preload),
+            "prefetch": mirrored(prefetch),
+        })
+    return {
+        "runtime": os.path.relpath(find_runtime(spa_dir), spa_dir).replace(os.sep, "/"),
+        "entry": mirrored(graph.entry),
+        "routes": routes,
+    }
+
+
+def write_manifest(spa_dir: str) -> tuple[str, dict]:
+    manifest = build_manifest(spa_dir)
+    path = os.path.join(spa_dir, MANIFEST_NAME)
+    atomic_write_bytes(path, json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+    return path, manifest
+
+
+# -----------------------------
+# Lookup (serve)
+# -----------------------------
+@dataclass
+class Hints:
+    entry: list[tuple[str, str]]
+    preload: list[tuple[str, str]] = field(default_factory=list)
+    prefetch: list[tuple[str, str]] = field(default_factory=list)
+    route: str = ""
+    mtime_ns: int = 0  # of the manifest, for the page's ETag
+
+    def link_header(self, *, prefetch: bool = True) -> str:
+        """Link header value: entry + route preloads (103 and final response), prefetches (final only)."""
+        links = [f"<{href}>; rel=preload; as={kind}" for href, kind in self.entry + self.preload]
+        if prefetch:
+            links += [f"<{href}>; rel=prefetch; as={kind}" for href, kind in self.prefetch]
+        return ", ".join(links)
+
+    def html(self) -> str:
+        """<link> tags for the route's own files; the entry ones are in the page already."""
+        tags = [f"<link rel=preload href={href} as={kind}>" for href, kind in self.preload]
+        tags += [f"<link rel=prefetch href={href} as={kind}>" for href, kind in self.prefetch]
+        return "".join(tags)
+
+
+def _route_regex(path: str) -> re.Pattern:
+    out = []
+    for seg in path.strip("/").split("/"):
+        if not seg:
+            continue
+        if seg == "*":
+            out.append("(?:/.*)?")
+        elif seg.startswith(":"):
+            out.append("(?:/[^/]+)?" if seg.endswith("?") else "/[^/]+")
+        else:
+            out.append("/" + re.escape(seg))
+    # vue-router matches case-insensitively and ignores a trailing slash
+    return re.compile("".join(out) + "/?", re.I)
+
+
+class RouteHints:
+    """A manifest loaded for serving: URL path (below the SPA prefix) -> Hints."""
+
+    def __init__(self, manifest: dict, mtime_ns: int = 0) -> None:
+        self.mtime_ns = mtime_ns
+        self.entry = [tuple(h) for h in manifest.get("entry", ())]
+        routes = manifest.get("routes", ())
+        # a static path wins over a pattern that also matches it
+        routes = sorted(routes, key=lambda r: ":" in r["path"] or "*" in r["path"])
+        self.routes = [
+            (_route_regex(r["path"]), Hints(
+                self.entry,
+                [tuple(h) for h in r["preload"] if tuple(h) not in self.entry],
+                [tuple(h) for h in r["prefetch"]],
+                r["path"],
+                mtime_ns,
+            ))
+            for r in routes
+        ]
+        self.default = Hints(self.entry, mtime_ns=mtime_ns)
+
+    def match(self, path: str) -> Hints:
+        path = "/" + path.strip("/")
+        for regex, hints in self.routes:
+            if regex.fullmatch(path):
+                return hints
+        return self.default
+
+
+def load_route_hints(spa_dir: str) -> RouteHints | None:
+    """The SPA's manifest, or None if missing or made for a runtime no longer there."""
+    path = os.path.join(spa_dir, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        mtime_ns = os.stat(path).st_mtime_ns
+    except (OSError, ValueError):
+        return None
+    if not os.path.isfile(os.path.join(spa_dir, manifest.get("runtime", ""))):
+        return None  # the mirror moved to a new release; run `prefetch` again
+    return RouteHints(manifest, mtime_ns)
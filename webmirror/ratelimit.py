@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-host request scheduling: a token bucket, an adaptive concurrency limit
+and Retry-After pauses.
+
+Every request to a host goes through HostThrottle.slot():
+
+  - rate      token bucket refilled at `rate` requests/s (None = unlimited
+              until the host pushes back)
+  - limit     simultaneous requests, between 1 and max_concurrency. It grows
+              by one while time-to-headers stays near the best seen and
+              shrinks by one when it climbs well above it (AIMD on latency)
+  - pause     429 (and 503 with Retry-After) stop the whole host until Retry-After (or a short
+              default pause) has passed and halve the limit and the rate
+              (once per pause, however many in-flight requests come back
+              throttled). The rate then grows back a few percent per
+              success up to where the host pushed back, and slowly beyond
+
+Waiting happens on a Condition, so threads blocked on one host never hold
+up another.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import requests
+
+from .fetch import is_throttled, retry_after
+
+
+# latency smoothing / thresholds, relative to the best smoothed latency seen
+LATENCY_ALPHA = 0.2
+LATENCY_GROW = 1.3
+LATENCY_SHRINK = 2.0
+
+# after a throttle the rate grows by RATE_GROWTH per success until it is back
+# at the rate that was throttled, then by RATE_STEP req/s per success
+RATE_GROWTH = 0.05
+RATE_STEP = 0.02
+MIN_RATE = 0.2
+
+# pause used when a 429/503 carries no Retry-After
+DEFAULT_PAUSE = 1.0
+
+
+class _Slot:
+    latency: float | None = None
+
+
+class HostThrottle:
+    def __init__(
+        self,
+        host: str,
+        *,
+        max_concurrency: int,
+        rate: float | None = None,
+        burst: int | None = None,
+        verbose: bool = True,
+    ) -> None:
+        self.host = host
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = float(burst if burst is not None else self.max_concurrency)
+        self.tokens = self.burst
+        self.verbose = verbose
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.ceiling: float | None = None
+        self.throttled = 0
+        self.latency: float | None = None
+        self.best_latency: float | None = None
+
+        self._cond = threading.Condition()
+        self._stamp = time.monotonic()
+
+    # ---- token bucket ----
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _wait_time(self, now: float) -> float | None:
+        """0 if a request may start now, seconds to wait, or None to wait for a release."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= self.limit:
+            return None
+        if self.rate and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0.0
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now)
+                if wait == 0.0:
+                    break
+                self._cond.wait(wait)
+            if self.rate:
+                self.tokens -= 1
+            self.in_flight += 1
+
+    def release(self, *, latency: float | None = None, throttled: int | None = None,
+                pause: float | None = None) -> None:
+        """throttled: HTTP status of a throttling response, if there was one."""
+        with self._cond:
+            self.in_flight -= 1
+            if throttled is not None:
+                self._throttle(throttled, pause)
+            elif latency is not None:
+                self._observe(latency)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[_Slot]:
+        """
+        Hold one request slot. Set .latency on the yielded object after a
+        response arrives; a throttling HTTPError raised inside pauses the host.
+        """
+        self.acquire()
+        s = _Slot()
+        try:
+            yield s
+        except requests.HTTPError as e:
+            r = e.response
+            if is_throttled(r):
+                self.release(throttled=r.status_code, pause=retry_after(r))
+            else:
+                self.release()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.release(latency=s.latency)
+
+    # ---- adaptation (called with the lock held) ----
+    def _throttle(self, status: int, pause: float | None) -> None:
+        self.throttled += 1
+        pause = DEFAULT_PAUSE if pause is None else pause
+        now = time.monotonic()
+        already_paused = now < self.paused_until
+        self.paused_until = max(self.paused_until, now + pause)
+        if already_paused:
+            return  # a request that was in flight when the host pushed back
+        # an unlimited host gets a rate now: what the limit sustained at the
+        # latency seen so far
+        current = self.rate or self.limit / max(self.latency or 1.0, 0.05)
+        self.ceiling = current if self.ceiling is None else min(self.ceiling, current)
+        self.limit = max(1, self.limit // 2)
+        self.rate = max(MIN_RATE, current / 2)
+        self.tokens = min(self.tokens, 1.0)
+        if self.verbose:
+            print(
+                f"    [!] {self.host}: HTTP {status}, pausing {pause:.1f}s "
+                f"(limit {self.limit}, {self.rate:.1f} req/s)"
+            )
+
+    def _observe(self, latency: float) -> None:
+        self.latency = latency if self.latency is None else (
+            LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency
+        )
+        if self.best_latency is None or self.latency < self.best_latency:
+            self.best_latency = self.latency
+
+        if self.latency > self.best_latency * LATENCY_SHRINK and self.limit > 1:
+            self.limit -= 1
+            # forget a best-case that no longer holds, so the limit can recover
+            self.best_latency *= 1.25
+        elif (
+            self.latency < self.best_latency * LATENCY_GROW
+            and self.limit < self.max_concurrency
+            and self.in_flight + 1 >= self.limit
+        ):
+            self.limit += 1
+
+        if self.ceiling is not None and self.rate != self.max_rate:
+            if self.rate < self.ceiling:
+                self.rate = min(self.ceiling, self.rate * (1 + RATE_GROWTH))
+            else:
+                self.rate += RATE_STEP
+            if self.max_rate is not None:
+                self.rate = min(self.rate, self.max_rate)
+
+
+class HostThrottles:
+    """One HostThrottle per netloc, created on first use."""
+
+    def __init__(self, *, max_concurrency: int, rate: float | None = None,
+                 verbose: bool = True) -> None:
+        self.max_concurrency = max_concurrency
+        self.rate = rate or None
+        self.verbose = verbose
+        self._hosts: dict[str, HostThrottle] = {}
+        self._guard = threading.Lock()
+
+    def get(self, host: str) -> HostThrottle:
+        with self._guard:
+            t = self._hosts.get(host)
+            if t is None:
+                t = self._hosts[host] = HostThrottle(
+                    host,
+                    max_concurrency=self.max_concurrency,
+                    rate=self.rate,
+                    verbose=self.verbose,
+                )
+            return t
+
+    def hosts(self) -> list[HostThrottle]:
+        with self._guard:
+            return list(self._hosts.values())
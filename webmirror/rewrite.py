@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+Post-process a mirrored tree so it works from another origin / prefix.
+
+All replacements (old publicPath -> new, https://jsb.notebookvip.cn -> new
+origin, any extra OLD=NEW pairs) are compiled into one alternation and
+applied in a single streaming pass per file: the file is read in fixed-size
+blocks, matches are replaced as they are found, and only the few bytes that
+could still be the start of a match are carried into the next block.
+
+A NEW that contains its OLD (/jsb-wap/ -> /mirror/jsb-wap/) is part of the
+alternation too, replaced by itself and not counted, so text that was
+already rewritten is left alone: running the same rewrite twice changes
+nothing the second time.
+
+By default it touches the SPA entry pages (*.html), webpack runtimes
+(runtime.*.js) and stylesheets (*.css).
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+from typing import BinaryIO, Iterable
+
+from .fsutil import commit_temp, open_temp
+
+
+BLOCK_SIZE = 256 * 1024
+
+DEFAULT_PATTERNS = ("*.html", "runtime.*.js", "*.css")
+
+
+def _protected(pairs: dict[bytes, bytes]) -> list[bytes]:
+    """Replacements that contain an OLD: matched as they are, so they are not rewritten again."""
+    return [v for v in set(pairs.values()) if v not in pairs and any(k in v for k in pairs)]
+
+
+def build_pattern(pairs: dict[bytes, bytes]) -> re.Pattern[bytes]:
+    # longest first, so "/jsb-wap/static/" wins over "/jsb-wap/" at the same spot;
+    # an earlier start wins anyway, which is what lets "/mirror/jsb-wap/" shield
+    # the "/jsb-wap/" inside it
+    keys = sorted([*pairs, *_protected(pairs)], key=len, reverse=True)
+    return re.compile(b"|".join(re.escape(k) for k in keys))
+
+
+def rewrite_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    pairs: dict[bytes, bytes],
+    *,
+    pattern: re.Pattern[bytes] | None = None,
+    block_size: int = BLOCK_SIZE,
+) -> int:
+    """Copy src to dst applying every OLD->NEW replacement; returns the match count."""
+    if not pairs:
+        while True:
+            block = src.read(block_size)
+            if not block:
+                return 0
+            dst.write(block)
+
+    pattern = pattern or build_pattern(pairs)
+    keep = max(len(k) for k in [*pairs, *_protected(pairs)]) - 1
+    count = 0
+    carry = b""
+    while True:
+        block = src.read(block_size)
+        eof = not block
+        buf = carry + block
+        # matches starting before `safe` are complete or provably can't
+        # grow; anything after it waits for the next block
+        safe = len(buf) if eof else max(0, len(buf) - keep)
+        out = []
+        last = 0
+        for m in pattern.finditer(buf):
+            if m.start() >= safe:
+                break
+            out.append(buf[last:m.start()])
+            new = pairs.get(m.group())
+            if new is None:  # already rewritten
+                new = m.group()
+            else:
+                count += 1
+            out.append(new)
+            last = m.end()
+        cut = max(last, safe)
+        out.append(buf[last:cut])
+        dst.write(b"".join(out))
+        carry = buf[cut:]
+        if eof:
+            return count
+
+
+def rewrite_file(
+    src_path: str,
+    dst_path: str,
+    pairs: dict[bytes, bytes],
+    *,
+    pattern: re.Pattern[bytes] | None = None,
+) -> int:
+    """Stream src_path -> dst_path (may be the same file); written atomically."""
+    fd, tmp = open_temp(dst_path)
+    try:
+        f = os.fdopen(fd, "wb")
+        with f, open(src_path, "rb") as src:
+            n = rewrite_stream(src, f, pairs, pattern=pattern)
+            commit_temp(f, tmp, dst_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return n
+
+
+def select_files(root: str, patterns: Iterable[str] = DEFAULT_PATTERNS) -> list[str]:
+    pats = list(patterns)
+    out = []
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            if any(fnmatch.fnmatch(name, p) for p in pats):
+                out.append(os.path.join(dirpath, name))
+    return sorted(out)
+
+
+def rewrite_tree(
+    root: str,
+    pairs: dict[str, str],
+    *,
+    out_root: str | None = None,
+    patterns: Iterable[str] = DEFAULT_PATTERNS,
+) -> dict[str, int]:
+    """
+    Apply pairs to every selected file under root, in place or into out_root
+    (same relative layout). Returns {relative path: replacements} for files
+    that changed.
+    """
+    bpairs = {k.encode("utf-8"): v.encode("utf-8") for k, v in pairs.items() if k and k != v}
+    pattern = build_pattern(bpairs) if bpairs else None
+    changed: dict[str, int] = {}
+    for path in select_files(root, patterns):
+        rel = os.path.relpath(path, root)
+        dst = os.path.join(out_root, rel) if out_root else path
+        n = rewrite_file(path, dst, bpairs, pattern=pattern)
+        if n:
+            changed[rel] = n
+    return changed
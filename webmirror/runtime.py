@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parse a webpack runtime.*.js and turn its chunk maps into asset URLs.
+
+The runtime is walked once: a scanner regex jumps between the few places
+that matter (string literals, `x.p=`, `(`/`{`, identifiers followed by `+`)
+and a tiny recursive-descent reader takes over there. No token list is
+built, so memory stays flat. It recognises:
+
+  publicPath   r.p="/jsb-wap/"            (webpack 4, minified)
+               __webpack_require__.p="/"  (webpack 5 / unminified)
+  chunk URLs   any `+`-concatenation ending in a ".js"/".css" literal that
+               indexes an object literal with the chunk id, e.g.
+                 r.p+"static/js/"+e+"."+{0:"9105fe01..."}[e]+".js"
+                 "static/css/"+({10:"Vote"}[e]||e)+"."+{0:"385a69..."}[e]+".css"
+                 o.u=e=>"static/js/"+e+"."+{"src_a":"1c2d..."}[e]+".chunk.js"
+               The concatenation is kept as a template, so custom filename
+               patterns and name maps on JS chunks work too.
+
+None of the patterns can backtrack across more than one token, and a
+concatenation that fails to qualify is skipped as a whole, so the cost is
+linear in the runtime size (the old chained `.*?` DOTALL searches were
+quadratic when many `({` appeared before the name map).
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Union
+from urllib.parse import urlparse, urljoin
+
+
+ChunkId = Union[int, str]
+
+_STR = r"""(?:"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|`(?:[^`\\]|\\.)*`)"""
+
+TOKEN_RE = re.compile(
+    rf"""
+      (?P<str>{_STR})
+    | (?P<num>\d+(?:\.\d+)?)
+    | (?P<name>[A-Za-z_$][\w$]*)
+    | (?P<op>=>|\|\||&&|[^\s\w])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+SPACE_RE = re.compile(r"\s*")
+
+# Positions the parser cares about: strings/identifiers followed by `+`,
+# `x.p=`, `(` before a literal and `{` opening a {key:"value"} object.
+# Everything else is skipped inside the regex engine; string literals are
+# always matched whole so quotes inside them cannot derail the scan.
+# lookahead body for an object whose first entry has a string value
+_KEY_STR = r"""\s*(?:[\w$]+|"[^"\n]*"|'[^'\n]*')\s*:\s*["'`]"""
+
+SCAN_RE = re.compile(
+    rf"""
+      (?P<chain>{_STR}(?=\s*\+(?!\+)))
+    | (?P<str>{_STR})
+    | (?P<pp>(?<![\w$])[A-Za-z_$][\w$]*\s*\.\s*p\s*=(?![=>]))
+    | (?P<name>(?<![\w$.])[A-Za-z_$][\w$]*(?=\s*\+(?!\+)))
+    | (?P<open>\((?=\s*(?:["'`]|\{{{_KEY_STR}))|\{{(?={_KEY_STR}))
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# one `key: "value"` entry of an object literal, plus the following , or }
+ENTRY_RE = re.compile(
+    rf"""\s*(?:(?P<key>\d+|[A-Za-z_$][\w$]*)|(?P<skey>{_STR}))\s*:\s*(?P<val>{_STR})\s*(?P<sep>[,}}])""",
+    re.DOTALL,
+)
+EMPTY_OBJ_RE = re.compile(r"\s*}")
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "0": "\0"}
+
+
+def _unquote(lit: str) -> str:
+    body = lit[1:-1]
+    if "\\" not in body:
+        return body
+    return re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+def guess_origin(u: str) -> str:
+    p = urlparse(u)
+    return f"{p.scheme}://{p.netloc}"
+
+
+def normalize_public_path(p: str) -> str:
+    # ensure leading + trailing slash
+    if not p.startswith("/"):
+        p = "/" + p
+    if not p.endswith("/"):
+        p = p + "/"
+    return p
+
+
+# -----------------------------
+# Result types
+# -----------------------------
+@dataclass
+class ChunkTemplate:
+    """
+    A chunk filename expression, e.g. "static/css/" + name + "." + hash + ".css".
+
+    parts is a list of ("lit", text) | ("id", "") | ("name", "") | ("hash", "").
+    """
+
+    parts: list[tuple[str, str]]
+    hashes: dict[ChunkId, str]
+    names: dict[ChunkId, str] = field(default_factory=dict)
+
+    @property
+    def kind(self) -> str:
+        return "css" if self.parts[-1][1].endswith(".css") else "js"
+
+    def path_for(self, cid: ChunkId) -> str:
+        out = []
+        for kind, text in self.parts:
+            if kind == "lit":
+                out.append(text)
+            elif kind == "id":
+                out.append(str(cid))
+            elif kind == "name":
+                out.append(self.names.get(cid, str(cid)))
+            else:
+                out.append(self.hashes[cid])
+        return "".join(out)
+
+    def paths(self) -> dict[ChunkId, str]:
+        """{chunk_id: path relative to publicPath}"""
+        return {cid: self.path_for(cid) for cid in self.hashes}
+
+
+@dataclass
+class RuntimeInfo:
+    public_path: str | None = None
+    js: ChunkTemplate | None = None
+    css: ChunkTemplate | None = None
+
+
+# -----------------------------
+# Reader
+# -----------------------------
+class _Reader:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def tok(self, pos: int) -> tuple[str, str, int] | None:
+        """(kind, value, end) of the token starting at/after pos, or None at EOF."""
+        pos = SPACE_RE.match(self.text, pos).end()
+        m = TOKEN_RE.match(self.text, pos)
+        if not m:
+            return None
+        return m.lastgroup, m.group(), m.end()
+
+    def expect(self, pos: int, value: str) -> int | None:
+        t = self.tok(pos)
+        return t[2] if t and t[1] == value else None
+
+    def object_literal(self, pos: int) -> tuple[dict[ChunkId, str], int] | None:
+        """{k:"v",...} with number/string/identifier keys and string values."""
+        t = self.tok(pos)
+        if not t or t[1] != "{":
+            return None
+        pos = t[2]
+        m = EMPTY_OBJ_RE.match(self.text, pos)
+        if m:
+            return {}, m.end()
+        out: dict[ChunkId, str] = {}
+        match = ENTRY_RE.match
+        while True:
+            m = match(self.text, pos)
+            if not m:
+                return None
+            key = m.group("key")
+            if key is None:
+                key = _unquote(m.group("skey"))
+            ckey: ChunkId = int(key) if key.isdigit() else key
+            out[ckey] = _unquote(m.group("val"))
+            pos = m.end()
+            if m.group("sep") == "}":
+                return out, pos
+            m = EMPTY_OBJ_RE.match(self.text, pos)  # trailing comma
+            if m:
+                return out, m.end()
+
+    def indexed_map(self, pos: int) -> tuple[dict[ChunkId, str], int] | None:
+        """{...}[e]"""
+        r = self.object_literal(pos)
+        if r is None:
+            return None
+        obj, pos = r
+        for want in ("[", None, "]"):
+            t = self.tok(pos)
+            if not t or (want is None and t[0] != "name") or (want and t[1] != want):
+                return None
+            pos = t[2]
+        return obj, pos
+
+    def operand(self, pos: int) -> tuple[tuple[str, object], int] | None:
+        t = self.tok(pos)
+        if not t:
+            return None
+        kind, value, end = t
+        if kind == "str":
+            return ("lit", _unquote(value)), end
+        if kind == "name":
+            return ("id", value), end
+        if value == "{":
+            r = self.indexed_map(pos)
+            return (("map", r[0]), r[1]) if r else None
+        if value == "(":
+            # ({...}[e]||e)  or a parenthesised string/identifier
+            r = self.indexed_map(end)
+            if r is not None:
+                obj, p = r
+                p2 = self.expect(p, "||")
+                if p2 is not None:
+                    t2 = self.tok(p2)
+                    if t2 and t2[0] == "name":
+                        p3 = self.expect(t2[2], ")")
+                        if p3 is not None:
+                            return ("namemap", obj), p3
+                p3 = self.expect(p, ")")
+                return (("map", obj), p3) if p3 is not None else None
+            r2 = self.operand(end)
+            if r2 is not None and r2[0][0] in ("lit", "id"):
+                p3 = self.expect(r2[1], ")")
+                if p3 is not None:
+                    return r2[0], p3
+        return None
+
+    def chain(self, pos: int) -> tuple[list[tuple[str, object]], int] | None:
+        """a + b + c ... (at least two operands)"""
+        first = self.operand(pos)
+        if first is None:
+            return None
+        parts = [first[0]]
+        pos = first[1]
+        while True:
+            p = self.expect(pos, "+")
+            if p is None:
+                break
+            nxt = self.operand(p)
+            if nxt is None:
+                break
+            parts.append(nxt[0])
+            pos = nxt[1]
+        if len(parts) < 2:
+            return None
+        return parts, pos
+
+
+def _template_from_chain(parts: list[tuple[str, object]]) -> ChunkTemplate | None:
+    last = parts[-1]
+    if last[0] != "lit" or not str(last[1]).endswith((".js", ".css")):
+        return None
+    bare = [i for i, (k, _) in enumerate(parts) if k == "map"]
+    if not bare:
+        return None
+    hash_idx = bare[-1]
+    hashes = parts[hash_idx][1]
+    if not hashes:
+        return None
+
+    tpl_parts: list[tuple[str, str]] = []
+    names: dict[ChunkId, str] = {}
+    for i, (k, v) in enumerate(parts):
+        if i == hash_idx:
+            tpl_parts.append(("hash", ""))
+        elif k == "lit":
+            tpl_parts.append(("lit", v))
+        elif k == "id":
+            tpl_parts.append(("id", ""))
+        else:
+            # ({..}[e]||e) name overrides, or a bare name map before the hash map
+            names.update(v)
+            tpl_parts.append(("name", ""))
+    return ChunkTemplate(tpl_parts, dict(hashes), names)
+
+
+def parse_runtime(runtime_text: str) -> RuntimeInfo:
+    """Single pass over the runtime; see module docstring for what is found."""
+    rd = _Reader(runtime_text)
+    info = RuntimeInfo()
+    pos = 0
+    search = SCAN_RE.search
+    while True:
+        m = search(runtime_text, pos)
+        if m is None:
+            break
+        kind = m.lastgroup
+
+        if kind == "str":
+            # a string literal not followed by `+` cannot start a chain
+            pos = m.end()
+            continue
+
+        # <ident>.p = "..."
+        if kind == "pp":
+            t = rd.tok(m.end())
+            if info.public_path is None and t and t[0] == "str" and len(t[1]) > 2:
+                info.public_path = _unquote(t[1])
+            pos = m.end()
+            continue
+
+        c = rd.chain(m.start())
+        if c is None:
+            pos = m.end()
+            continue
+
+        parts, chain_end = c
+        tpl = _template_from_chain(parts)
+        if tpl is not None:
+            if tpl.kind == "css":
+                info.css = info.css or tpl
+            else:
+                info.js = info.js or tpl
+        # a failed chain cannot contain a valid sub-chain (same final literal,
+        # subset of maps), so skip it entirely
+        pos = chain_end
+    return info
+
+
+# -----------------------------
+# Compatibility helpers
+# -----------------------------
+def extract_public_path(runtime_text: str) -> str | None:
+    return parse_runtime(runtime_text).public_path
+
+
+def parse_js_chunk_map(runtime_text: str) -> dict[ChunkId, str]:
+    info = parse_runtime(runtime_text)
+    if info.js is None:
+        raise ValueError("Could not find JS chunk hash map in runtime.")
+    return info.js.hashes
+
+
+def parse_css_chunk_map(runtime_text: str) -> tuple[dict[ChunkId, str], dict[ChunkId, str]]:
+    """
+    Returns: (name_overrides, hash_map)
+      - name_overrides: {10: "Vote"} part
+      - hash_map: {chunk_id: css_hash}
+    """
+    info = parse_runtime(runtime_text)
+    if info.css is None:
+        raise ValueError("Could not find CSS chunk hash map in runtime.")
+    return info.css.names, info.css.hashes
+
+
+def chunk_urls(origin: str, public_path: str, info: RuntimeInfo) -> list[str]:
+    """
+    Sorted, de-duplicated URLs of every JS/CSS chunk named by the runtime:
+      <origin><publicPath><template path>, e.g. /jsb-wap/static/css/Vote.f62c4f43.css
+    """
+    targets: list[str] = []
+    for tpl in (info.js, info.css):
+        if tpl is None:
+            continue
+        for path in tpl.paths().values():
+            targets.append(urljoin(origin, public_path + path))
+    return sorted(set(targets))
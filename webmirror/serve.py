@@ -0,0 +1,764 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local static server for a mirrored tree (e.g. jsb_web/ -> /jsb-wap/, /jsb-files/).
+
+Compared to `python3 -m http.server` it:
+  - serves each request on its own thread (ThreadingHTTPServer)
+  - pre-builds gzip (and brotli, if the `brotli` module is installed)
+    variants of text assets at startup and picks one from Accept-Encoding;
+    existing `.gz` / `.br` siblings on disk are used as-is
+  - answers image requests with the `<name>.png.webp` sibling `optimize`
+    made, when the client's Accept includes image/webp and it is smaller
+  - keeps small hot files in a byte-bounded in-memory LRU; larger ones
+    (vendor chunks, ctyunplayer, media) and their .gz/.br siblings go out
+    with os.sendfile() from a bounded cache of open, mapped files, full
+    bodies and ranges alike, without passing through Python buffers
+  - sends `Cache-Control: immutable` for content-hashed names
+    (12.d09be060270abc1839bd.js, heroes.42c6bba.jpg), ETag + no-cache otherwise
+  - answers single-range `Range:` requests (206/416) for media seeking
+  - with --pack, serves a `pack` archive: index read once, bodies sent with
+    os.sendfile() from one mapped file, no stat()/open() per request
+  - SPA history fallback: extension-less paths under an SPA prefix (deep
+    links such as /jsb-wap/tasks/1) get that prefix's index.html, held in
+    memory, without touching the disk
+  - with a `prefetch` manifest next to that index.html, answers SPA pages
+    with 103 Early Hints for the entry and route chunks, then a Link header
+    and <link rel=preload/prefetch> tags for the route in the page
+  - with --api, answers the SPA's API bases (/jsb-api/, /yundb/) from the
+    `apistub` fixtures (recording them from the live backend with
+    --api-record), with optional injected latency
+"""
+
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import mmap
+import os
+import posixpath
+import socket
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Iterator
+from urllib.parse import unquote, urlsplit
+
+from .mirror import is_content_hashed
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+if TYPE_CHECKING:
+    from .apistub import ApiStub
+    from .pack import PackArchive
+    from .prefetch import Hints, RouteHints
+
+
+COMPRESSIBLE_EXTS = frozenset((".js", ".css", ".html", ".htm", ".svg", ".json", ".txt", ".map"))
+WEBP_SOURCE_EXTS = (".png", ".jpg", ".jpeg", ".gif")
+MIN_COMPRESS_SIZE = 1024
+# bodies above this go out with sendfile() instead of the in-memory LRU
+MAX_CACHED_FILE = 256 * 1024
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("font/woff2", ".woff2")
+
+
+def content_type(path: str) -> str:
+    ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if ctype.startswith("text/") or ctype == "application/javascript":
+        ctype += "; charset=utf-8"
+    return ctype
+
+
+# -----------------------------
+# Caches
+# -----------------------------
+class LRUBytes:
+    """Thread-safe LRU of {key: bytes} bounded by total size, not entry count."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._data[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+
+
+class OpenFile:
+    """One file held open and mapped read-only; refs counts the senders using it."""
+
+    def __init__(self, path: str) -> None:
+        self.fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        try:
+            st = os.fstat(self.fd)
+            self.size = st.st_size
+            self.mtime_ns = st.st_mtime_ns
+            self.mm = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ) if self.size else None
+        except BaseException:
+            os.close(self.fd)
+            raise
+        self.refs = 0
+        self.evicted = False
+
+    def close(self) -> None:
+        if self.mm is not None:
+            self.mm.close()
+        os.close(self.fd)
+
+
+class OpenFileCache:
+    """
+    Thread-safe LRU of OpenFiles, bounded by count (file descriptors) and
+    mapped bytes. An entry evicted while a response is still being sent from
+    it is closed when that response releases it.
+    """
+
+    def __init__(self, max_files: int = 256, max_bytes: int = 1 << 30) -> None:
+        self.max_files = max(1, max_files)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._files: OrderedDict[str, OpenFile] = OrderedDict()
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _drop(self, path: str) -> None:
+        f = self._files.pop(path)
+        self.size -= f.size
+        f.evicted = True
+        if f.refs == 0:
+            f.close()
+
+    @contextmanager
+    def open(self, path: str, mtime_ns: int, size: int) -> Iterator[OpenFile]:
+        """The file as resolved (same mtime and size), reopened if it was replaced since."""
+        with self._lock:
+            f = self._files.get(path)
+            if f is not None and (f.mtime_ns != mtime_ns or f.size != size):
+                self._drop(path)
+                f = None
+            if f is not None:
+                self._files.move_to_end(path)
+                f.refs += 1
+        if f is None:
+            f = OpenFile(path)  # outside the lock: open() and mmap() may block
+            f.refs = 1
+            with self._lock:
+                self.opened += 1
+                if path in self._files:
+                    self._drop(path)
+                self._files[path] = f
+                self.size += f.size
+                while len(self._files) > 1 and (
+                    len(self._files) > self.max_files or self.size > self.max_bytes
+                ):
+                    self._drop(next(iter(self._files)))
+        try:
+            yield f
+        finally:
+            with self._lock:
+                f.refs -= 1
+                if f.refs == 0 and f.evicted:
+                    f.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for path in list(self._files):
+                self._drop(path)
+
+
+def sendfile(sock: socket.socket, fd: int, offset: int, count: int, mm: mmap.mmap | None) -> None:
+    """Send count bytes of fd from offset; zero-copy where os.sendfile() works, else from the mapping."""
+    try:
+        while count > 0:
+            sent = os.sendfile(sock.fileno(), fd, offset, count)
+            if sent == 0:
+                break
+            offset += sent
+            count -= sent
+    except (AttributeError, BlockingIOError):  # no sendfile / non-blocking socket
+        if mm is not None and count > 0:
+            with memoryview(mm) as view:
+                sock.sendall(view[offset:offset + count])
+
+
+@dataclass
+class Asset:
+    path: str
+    url_path: str
+    size: int
+    mtime_ns: int
+    content_type: str
+    vary: tuple[str, ...] = ()
+    # body (and gzip / br variants) in the site's pack archive: {encoding: [offset, length]}
+    spans: dict[str, list[int]] | None = None
+    links: str = ""  # Link header (SPA pages with prefetch hints)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.size:x}-{self.mtime_ns:x}"'
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime_ns / 1e9, usegmt=True)
+
+    @property
+    def cache_control(self) -> str:
+        return IMMUTABLE_CACHE if is_content_hashed(self.url_path) else REVALIDATE_CACHE
+
+
+# -----------------------------
+# Site
+# -----------------------------
+class StaticSite:
+    """
+    File lookup, precompressed variants and the body cache for one root.
+    Shared by all handler threads.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        *,
+        cache_bytes: int = 64 * 1024 * 1024,
+        max_cached_file: int = MAX_CACHED_FILE,
+        base: str = "",
+        pack: PackArchive | None = None,
+        max_open_files: int = 256,
+        use_sendfile: bool = True,
+    ) -> None:
+        self.root = os.path.abspath(root)
+        self.pack = pack
+        self.cache = LRUBytes(cache_bytes)
+        self.max_cached_file = max_cached_file
+        # bodies bigger than max_cached_file: open + mapped, sent with sendfile()
+        self.files = OpenFileCache(max_open_files)
+        self.use_sendfile = use_sendfile
+        # URL prefix the tree is mounted under (e.g. "/mirror"), stripped before lookup
+        self.base = "/" + base.strip("/") if base.strip("/") else ""
+        # abs path -> (mtime_ns, {"br": bytes, "gzip": bytes}); an Asset
+        # stands for a .gz/.br sibling too big for memory, sent from disk
+        self.variants: dict[str, tuple[int, dict[str, bytes | Asset]]] = {}
+        # SPA route table: (url prefix, index.html asset), longest prefix first,
+        # with the index bodies pinned in memory
+        self.spa_routes: list[tuple[str, Asset]] = []
+        self.pinned: dict[str, bytes] = {}
+        # images with a .webp sibling (abs paths), from scan_webp()
+        self.webp: set[str] = set()
+        # SPA prefix -> its prefetch manifest; (index path, route) -> page with the hints
+        self.route_hints: dict[str, RouteHints] = {}
+        self.hinted: dict[tuple[str, str], Asset] = {}
+        self._hinted_lock = threading.Lock()
+        # stub backend for the SPA's API requests (--api)
+        self.api: ApiStub | None = None
+
+    def _split(self, url_path: str) -> list[str] | None:
+        path = posixpath.normpath(unquote(url_path))
+        if self.base:
+            if path != self.base and not path.startswith(self.base + "/"):
+                return None
+            path = path[len(self.base):]
+        return [p for p in path.split("/") if p and p not in (".", "..")]
+
+    def resolve(self, url_path: str) -> Asset | None:
+        parts = self._split(url_path)
+        if parts is None:
+            return None
+        if self.pack is not None:
+            asset = self._resolve_packed(parts)
+            if asset is not None:
+                return asset
+        fs_path = os.path.join(self.root, *parts)
+        if os.path.isdir(fs_path):
+            fs_path = os.path.join(fs_path, "index.html")
+        try:
+            st = os.stat(fs_path)
+        except OSError:
+            return None
+        if not os.path.isfile(fs_path):
+            return None
+        return Asset(fs_path, "/" + "/".join(parts), st.st_size, st.st_mtime_ns, content_type(fs_path))
+
+    def _resolve_packed(self, parts: list[str]) -> Asset | None:
+        key = "/" + "/".join(parts)
+        entry = self.pack.files.get(key)
+        if entry is None:
+            parts = parts + ["index.html"]
+            entry = self.pack.files.get(key.rstrip("/") + "/index.html")
+            if entry is None:
+                return None
+        return Asset(
+            os.path.join(self.root, *parts),
+            key,
+            entry["size"],
+            entry["mtime_ns"],
+            entry["type"],
+            spans=entry["spans"],
+        )
+
+    # ---- SPA routes ----
+    def add_spa(self, prefix: str) -> Asset:
+        """
+        Register prefix (e.g. "/jsb-wap/") whose index.html answers every
+        extension-less path below it that is not a file. The page is read once, here, and so
+        is the `prefetch` manifest next to it, if any.
+        """
+        from .prefetch import load_route_hints
+
+        prefix = "/" + prefix.strip("/") + "/" if prefix.strip("/") else "/"
+        asset = self.resolve(self.base + prefix + "index.html")
+        if asset is None:
+            raise FileNotFoundError(f"no index.html under {prefix} in {self.root}")
+        if asset.spans is not None:
+            self.pinned[asset.path] = bytes(self.pack.view(asset.spans["identity"]))
+        else:
+            with open(asset.path, "rb") as f:
+                self.pinned[asset.path] = f.read()
+        self.spa_routes.append((self.base + prefix, asset))
+        self.spa_routes.sort(key=lambda r: len(r[0]), reverse=True)
+        hints = load_route_hints(os.path.dirname(asset.path))
+        if hints is not None:
+            self.route_hints[self.base + prefix] = hints
+            # longest prefix first, like spa_routes: /jsb-wap/app/ before /jsb-wap/
+            self.route_hints = dict(sorted(self.route_hints.items(), key=lambda r: len(r[0]), reverse=True))
+        return asset
+
+    def detect_spas(self) -> list[str]:
+        """Top-level folders of root that contain an index.html."""
+        found = []
+        for name in sorted(os.listdir(self.root)):
+            if os.path.isfile(os.path.join(self.root, name, "index.html")):
+                found.append(f"/{name}/")
+        return found
+
+    def spa_route(self, url_path: str) -> Asset | None:
+        """index.html for deep links / the SPA root itself; real files are resolved first."""
+        if not self.spa_routes:
+            return None
+        path = unquote(url_path)
+        last = path.rsplit("/", 1)[-1]
+        if "." in last and last != "index.html":
+            return None  # looks like an asset; missing assets must 404, not get HTML
+        for prefix, asset in self.spa_routes:
+            if path.startswith(prefix) or path + "/" == prefix:
+                return asset
+        return None
+
+    def page_hints(self, url_path: str) -> Hints | None:
+        """Prefetch hints for an SPA page (deep link or the SPA root)."""
+        path = unquote(url_path)
+        for prefix, hints in self.route_hints.items():
+            if path.startswith(prefix) or path + "/" == prefix:
+                return hints.match(path[len(prefix):])
+        return None
+
+    def hinted_page(self, asset: Asset, hints: Hints) -> Asset:
+        """The SPA page with the route's <link> tags and Link header (built once per route)."""
+        key = (asset.path, hints.route)
+        page = self.hinted.get(key)
+        if page is not None:
+            return page
+        body = self.pinned[asset.path]
+        tags = hints.html().encode("utf-8")
+        if tags:
+            at = body.lower().find(b"</head>")
+            body = body[:at] + tags + body[at:] if at >= 0 else tags + body
+        page = Asset(
+            f"{asset.path}?{hints.route}",
+            asset.url_path,
+            len(body),
+            max(asset.mtime_ns, hints.mtime_ns),
+            asset.content_type,
+            links=hints.link_header(),
+        )
+        with self._hinted_lock:
+            self.pinned[page.path] = body
+            self.hinted[key] = page
+        return page
+
+    # ---- bodies ----
+    def body(self, asset: Asset) -> bytes | memoryview | None:
+        """Whole file from memory (loading it into the LRU), or None if too big: see send_file()."""
+        data = self.pinned.get(asset.path)
+        if data is not None:
+            return data
+        if asset.spans is not None:
+            return self.pack.view(asset.spans["identity"])
+        if asset.size > self.max_cached_file:
+            return None
+        key = f"{asset.path}:{asset.mtime_ns}"
+        data = self.cache.get(key)
+        if data is None:
+            with open(asset.path, "rb") as f:
+                data = f.read()
+            self.cache.put(key, data)
+        return data
+
+    def send_file(self, sock: socket.socket, asset: Asset, offset: int, count: int) -> None:
+        """Bytes [offset, offset + count) of an asset on disk, through the open-file cache."""
+        with self.files.open(asset.path, asset.mtime_ns, asset.size) as f:
+            if self.use_sendfile:
+                sendfile(sock, f.fd, offset, count, f.mm)
+            elif f.mm is not None:
+                with memoryview(f.mm) as view:
+                    sock.sendall(view[offset:offset + count])
+
+    def variant(self, asset: Asset, accept_encoding: str) -> tuple[str, bytes | tuple[int, int] | Asset] | None:
+        """
+        (encoding, body) - for packed assets the body is an (offset, length)
+        in the archive, for large .gz/.br siblings the sibling's Asset.
+        """
+        if asset.spans is not None:
+            found: dict = asset.spans
+        else:
+            entry = self.variants.get(asset.path)
+            if entry is None or entry[0] != asset.mtime_ns:
+                return None
+            found = entry[1]
+        accepted = {e.split(";", 1)[0].strip().lower() for e in accept_encoding.split(",")}
+        for enc in ("br", "gzip"):
+            if enc in accepted and enc in found:
+                return enc, tuple(found[enc]) if asset.spans is not None else found[enc]
+        return None
+
+    def webp_variant(self, asset: Asset, accept: str) -> Asset | None:
+        """The image's .webp sibling if the client takes WebP and it is current and smaller."""
+        if asset.path not in self.webp or "image/webp" not in accept:
+            return None
+        webp = self.resolve(self.base + asset.url_path + ".webp")
+        if webp is None or webp.size >= asset.size or webp.mtime_ns < asset.mtime_ns:
+            return None
+        webp.url_path, webp.vary = asset.url_path, asset.vary
+        return webp
+
+    # ---- startup ----
+    def scan_webp(self) -> int:
+        if self.pack is not None:
+            for key in self.pack.files:
+                if key.endswith(".webp") and key[:-5].lower().endswith(WEBP_SOURCE_EXTS):
+                    self.webp.add(os.path.join(self.root, *key[:-5].split("/")))
+            return len(self.webp)
+        for dirpath, _, files in os.walk(self.root):
+            names = set(files)
+            for name in files:
+                if name.lower().endswith(WEBP_SOURCE_EXTS) and name + ".webp" in names:
+                    self.webp.add(os.path.join(dirpath, name))
+        return len(self.webp)
+
+    def _build_variants(self, path: str) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        out: dict[str, bytes | Asset] = {}
+        for enc, ext in (("gzip", ".gz"), ("br", ".br")):
+            sib = path + ext
+            try:
+                sst = os.stat(sib)
+            except OSError:
+                continue
+            if sst.st_mtime_ns < st.st_mtime_ns:
+                continue
+            if sst.st_size > self.max_cached_file:
+                out[enc] = Asset(sib, sib, sst.st_size, sst.st_mtime_ns, "application/octet-stream")
+            else:
+                with open(sib, "rb") as f:
+                    out[enc] = f.read()
+        if "gzip" not in out or ("br" not in out and brotli is not None):
+            with open(path, "rb") as f:
+                raw = f.read()
+            if "gzip" not in out:
+                out["gzip"] = gzip.compress(raw, compresslevel=9, mtime=0)
+            if "br" not in out and brotli is not None:
+                out["br"] = brotli.compress(raw, quality=11)
+        # only keep variants that actually save bytes
+        out = {k: v for k, v in out.items() if (v.size if isinstance(v, Asset) else len(v)) < st.st_size}
+        if out:
+            self.variants[path] = (st.st_mtime_ns, out)
+
+    def precompress(self, workers: int | None = None) -> int:
+        paths = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTS:
+                    continue
+                full = os.path.join(dirpath, name)
+                if os.path.getsize(full) >= MIN_COMPRESS_SIZE:
+                    paths.append(full)
+        from concurrent.futures import ThreadPoolExecutor  # only at startup, not on import
+
+        # zlib / brotli release the GIL, so threads compress in parallel
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(self._build_variants, paths))
+        return len(self.variants)
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single `bytes=` range into an inclusive (start, end).
+    Returns None for unsatisfiable or multi-range requests.
+    """
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[6:].strip().partition("-")
+    try:
+        if start_s == "":
+            n = int(end_s)
+            if n <= 0:
+                return None
+            return max(0, size - n), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class MirrorRequestHandler(BaseHTTPRequestHandler):
+    server_version = "webmirror"
+    protocol_version = "HTTP/1.1"
+    site: StaticSite  # set by make_server()
+    quiet = False
+    early_hints = True
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def do_HEAD(self) -> None:
+        self.handle_get(head=True)
+
+    def do_GET(self) -> None:
+        self.handle_get(head=False)
+
+    def do_POST(self) -> None:
+        self.handle_other()
+
+    do_PUT = do_DELETE = do_PATCH = do_POST
+
+    def handle_other(self) -> None:
+        api = self.site.api
+        if api is not None and api.handles(urlsplit(self.path).path):
+            self.send_api(head=False)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_plain(HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def send_api(self, head: bool) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        method = "GET" if head else self.command
+        res = self.site.api.respond(method, self.path, dict(self.headers.items()), body)
+        self.send_response(res.status)
+        self.send_header("Content-Type", res.content_type)
+        self.send_header("Content-Length", str(len(res.body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if not head:
+            self.wfile.write(res.body)
+
+    def send_plain(self, status: HTTPStatus, head: bool = False) -> None:
+        body = f"{status.value} {status.phrase}\n".encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def not_modified(self, asset: Asset) -> bool:
+        inm = self.headers.get("If-None-Match")
+        if inm is not None:
+            return asset.etag in (t.strip() for t in inm.split(",")) or inm.strip() == "*"
+        ims = self.headers.get("If-Modified-Since")
+        if ims:
+            try:
+                return int(asset.mtime_ns / 1e9) <= parsedate_to_datetime(ims).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_common(self, asset: Asset) -> None:
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("ETag", asset.etag)
+        self.send_header("Last-Modified", asset.last_modified)
+        self.send_header("Cache-Control", asset.cache_control)
+        self.send_header("Accept-Ranges", "bytes")
+        encoded = asset.path in self.site.variants or (asset.spans is not None and len(asset.spans) > 1)
+        vary = asset.vary + (("Accept-Encoding",) if encoded else ())
+        if vary:
+            self.send_header("Vary", ", ".join(vary))
+        if asset.links:
+            self.send_header("Link", asset.links)
+
+    def send_early_hints(self, hints: Hints) -> None:
+        """103 Early Hints: the browser starts fetching while the page is on its way."""
+        links = hints.link_header(prefetch=False)
+        if not links or not self.early_hints or self.request_version == "HTTP/1.0":
+            return  # 1xx responses are HTTP/1.1+
+        self.send_response_only(HTTPStatus.EARLY_HINTS)
+        self.send_header("Link", links)
+        self.end_headers()
+
+    def handle_get(self, *, head: bool) -> None:
+        site = self.site
+        url_path = urlsplit(self.path).path
+        if site.api is not None and site.api.handles(url_path):
+            self.send_api(head)
+            return
+        asset = site.resolve(url_path)
+        spa = site.spa_route(url_path)
+        if asset is None:
+            asset = spa  # deep link: no such file, so the SPA's index.html
+        elif spa is not None and asset.path != spa.path:
+            spa = None  # a real file under the SPA (/jsb-wap/LICENSE) wins
+        if asset is None:
+            self.send_plain(HTTPStatus.NOT_FOUND, head)
+            return
+        hints = site.page_hints(url_path) if spa is not None and site.route_hints else None
+        if hints is not None:
+            if not head:
+                self.send_early_hints(hints)
+            asset = site.hinted_page(asset, hints)
+        if asset.path in site.webp:
+            asset.vary = ("Accept",)
+            asset = site.webp_variant(asset, self.headers.get("Accept", "")) or asset
+
+        if self.not_modified(asset):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_common(asset)
+            self.end_headers()
+            return
+
+        range_header = self.headers.get("Range")
+        if range_header:
+            rng = parse_range(range_header, asset.size)
+            if rng is None:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{asset.size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_range(asset, rng, head)
+            return
+
+        enc = site.variant(asset, self.headers.get("Accept-Encoding", ""))
+        self.send_response(HTTPStatus.OK)
+        self.send_common(asset)
+        if enc is not None:
+            body = enc[1]
+            if isinstance(body, tuple):
+                length = body[1]
+            else:
+                length = body.size if isinstance(body, Asset) else len(body)
+            self.send_header("Content-Encoding", enc[0])
+            self.send_header("Content-Length", str(length))
+            self.end_headers()
+            if head:
+                return
+            if isinstance(body, tuple):
+                site.pack.sendfile(self.connection, *body)
+            elif isinstance(body, Asset):
+                self.wfile.flush()
+                site.send_file(self.connection, body, 0, body.size)
+            else:
+                self.wfile.write(body)
+            return
+
+        self.send_header("Content-Length", str(asset.size))
+        self.end_headers()
+        if head:
+            return
+        if asset.spans is not None and asset.path not in site.pinned:
+            site.pack.sendfile(self.connection, *asset.spans["identity"])
+            return
+        data = site.body(asset)
+        if data is not None:
+            self.wfile.write(data)
+        else:
+            self.wfile.flush()
+            site.send_file(self.connection, asset, 0, asset.size)
+
+    def send_range(self, asset: Asset, rng: tuple[int, int], head: bool) -> None:
+        start, end = rng
+        length = end - start + 1
+        self.send_response(HTTPStatus.PARTIAL_CONTENT)
+        self.send_common(asset)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{asset.size}")
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+        if head:
+            return
+        if asset.spans is not None:
+            self.site.pack.sendfile(self.connection, asset.spans["identity"][0] + start, length)
+            return
+        data = self.site.body(asset)
+        if data is not None:
+            self.wfile.write(data[start:end + 1])
+            return
+        self.wfile.flush()
+        self.site.send_file(self.connection, asset, start, length)
+
+
+class MirrorHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_server(
+    site: StaticSite,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    *,
+    quiet: bool = False,
+    early_hints: bool = True,
+) -> MirrorHTTPServer:
+    handler = type(
+        "BoundHandler",
+        (MirrorRequestHandler,),
+        {"site": site, "quiet": quiet, "early_hints": early_hints},
+    )
+    return MirrorHTTPServer((host, port), handler)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""
+Versioned snapshots: one mirror tree per release, keyed by runtime hash.
+
+  <out>/snapshots/2c059b5cf33ac3cb1752/jsb-wap/...   release with runtime.2c059b5cf33ac3cb1752.js
+  <out>/snapshots/2c059b5cf33ac3cb1752/.snapshot.json
+  <out>/snapshots/LATEST                              key of the newest complete snapshot
+  <out>/latest -> snapshots/<key>                     convenience symlink (where supported)
+
+A new snapshot hard-links every content-hashed file it shares with the
+previous one (Mirror(reuse_from=...)), so only chunks whose `{cid: hash}`
+entry changed are downloaded. diff_chunks() compares two parsed runtimes
+chunk by chunk and needs no network.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+from .fsutil import atomic_write_bytes
+from .runtime import RuntimeInfo, parse_runtime
+
+
+SNAPSHOTS_DIR = "snapshots"
+LATEST_NAME = "LATEST"
+META_NAME = ".snapshot.json"
+
+RUNTIME_NAME_RE = re.compile(r"runtime\.([0-9a-f]{8,})\.js$")
+
+
+def snapshot_key(runtime_url: str) -> str | None:
+    """"2c059b5cf33ac3cb1752" for .../runtime.2c059b5cf33ac3cb1752.js"""
+    m = RUNTIME_NAME_RE.search(runtime_url.split("?", 1)[0])
+    return m.group(1) if m else None
+
+
+def snapshot_dir(out_root: str, key: str) -> str:
+    return os.path.join(out_root, SNAPSHOTS_DIR, key)
+
+
+def latest_snapshot(out_root: str) -> str | None:
+    try:
+        with open(os.path.join(out_root, SNAPSHOTS_DIR, LATEST_NAME), "r", encoding="utf-8") as f:
+            key = f.read().strip()
+    except OSError:
+        return None
+    return key if key and os.path.isdir(snapshot_dir(out_root, key)) else None
+
+
+def set_latest(out_root: str, key: str) -> None:
+    atomic_write_bytes(os.path.join(out_root, SNAPSHOTS_DIR, LATEST_NAME), (key + "\n").encode("ascii"))
+    link = os.path.join(out_root, "latest")
+    tmp = link + ".tmp"
+    try:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        os.symlink(os.path.join(SNAPSHOTS_DIR, key), tmp)
+        os.replace(tmp, link)
+    except OSError:
+        pass  # no symlinks here (e.g. Windows without privileges); LATEST is enough
+
+
+def write_meta(
+    snap_dir: str,
+    *,
+    key: str,
+    runtime_url: str,
+    public_path: str,
+    previous: str | None,
+    info: RuntimeInfo,
+) -> None:
+    meta = {
+        "key": key,
+        "runtime_url": runtime_url,
+        "public_path": public_path,
+        "previous": previous,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "chunks": {f"{kind}:{cid}": path for (kind, cid), path in sorted(chunk_paths(info).items(), key=str)},
+    }
+    data = json.dumps(meta, indent=1, ensure_ascii=False).encode("utf-8")
+    atomic_write_bytes(os.path.join(snap_dir, META_NAME), data)
+
+
+# -----------------------------
+# Offline diff
+# -----------------------------
+def find_runtime(path: str) -> str:
+    """A runtime.*.js file, or the single one inside a snapshot / mirror folder."""
+    if os.path.isfile(path):
+        return path
+    found = sorted(glob.glob(os.path.join(path, "**", "runtime.*.js"), recursive=True))
+    if len(found) != 1:
+        raise ValueError(
+            f"expected one runtime.*.js under {path}, found {len(found)}"
+            + (": " + ", ".join(found) if found else "")
+        )
+    return found[0]
+
+
+def load_runtime_info(path: str) -> RuntimeInfo:
+    with open(find_runtime(path), "r", encoding="utf-8", errors="replace") as f:
+        return parse_runtime(f.read())
+
+
+def chunk_paths(info: RuntimeInfo) -> dict[tuple[str, object], str]:
+    """{("js"|"css", chunk id): path relative to publicPath}"""
+    out: dict[tuple[str, object], str] = {}
+    for tpl in (info.js, info.css):
+        if tpl is None:
+            continue
+        for cid, path in tpl.paths().items():
+            out[(tpl.kind, cid)] = path
+    return out
+
+
+@dataclass
+class ChunkDiff:
+    # (kind, chunk id, path) / (kind, chunk id, old path, new path)
+    added: list[tuple[str, object, str]] = field(default_factory=list)
+    removed: list[tuple[str, object, str]] = field(default_factory=list)
+    changed: list[tuple[str, object, str, str]] = field(default_factory=list)
+    unchanged: int = 0
+
+
+def diff_chunks(old: RuntimeInfo, new: RuntimeInfo) -> ChunkDiff:
+    a = chunk_paths(old)
+    b = chunk_paths(new)
+    d = ChunkDiff()
+    for k in sorted(a.keys() | b.keys(), key=str):
+        if k not in b:
+            d.removed.append((k[0], k[1], a[k]))
+        elif k not in a:
+            d.added.append((k[0], k[1], b[k]))
+        elif a[k] != b[k]:
+            d.changed.append((k[0], k[1], a[k], b[k]))
+        else:
+            d.unchanged += 1
+    return d
+
+
+def format_diff(d: ChunkDiff, *, verbose: bool = True) -> str:
+    lines = [
+        f"added={len(d.added)} removed={len(d.removed)} "
+        f"changed={len(d.changed)} unchanged={d.unchanged}"
+    ]
+    if verbose:
+        for kind, cid, path in d.added:
+            lines.append(f"  + {kind:<3} {cid}: {path}")
+        for kind, cid, path in d.removed:
+            lines.append(f"  - {kind:<3} {cid}: {path}")
+        for kind, cid, old, new in d.changed:
+            lines.append(f"  ~ {kind:<3} {cid}: {old} -> {new}")
+    return "\n".join(lines)
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+"""
+Transports: where a FetchPool gets its HTTP sessions from.
+
+  requests  one requests.Session per worker thread, with an HTTPAdapter
+            sized for the run (hosts kept warm, idle connections per host)
+            instead of the library defaults. HTTP/1.1 only, so every
+            in-flight request to a host is its own TCP (+TLS) connection.
+  http2     one shared httpx.Client (needs `pip install httpx[h2]`). All
+            workers multiplex their requests over a single connection per
+            origin, which is what hundreds of small webpack chunks want;
+            raise --per-host well above 6 to make use of it. Servers that do
+            not offer h2 through TLS ALPN get HTTP/1.1 from the same client.
+
+Both hand out objects with the small part of the requests API that
+fetch.py uses (get(url, headers=, timeout=, stream=) and a response with
+status_code, headers, elapsed, iter_content, raw.tell(), content,
+raise_for_status), and httpx errors are re-raised as the matching requests
+exceptions, so the retry policy and throttling work unchanged.
+
+Both also report connect and TLS handshake time of new connections into
+the current metrics.Trace (urllib3 connection subclasses, httpx "trace"
+events).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .fetch import new_session
+from .metrics import current_trace
+
+# optional, only for transport="http2": imported by the first Http2Transport,
+# so requests-only runs never load httpx / h2 / anyio
+httpx = None
+
+
+def _import_httpx():
+    global httpx
+    if httpx is None:
+        try:
+            import httpx as module
+        except ImportError:
+            return None
+        httpx = module
+    return httpx
+
+
+TRANSPORTS = ("requests", "http2")
+
+# distinct hosts whose connections a session keeps (requests' default is 10;
+# --discover easily reaches more once CDNs are involved)
+DEFAULT_POOL_CONNECTIONS = 32
+# idle connections kept per host after a request finishes
+DEFAULT_POOL_MAXSIZE = 6
+# seconds an idle http2 connection stays open
+KEEPALIVE_EXPIRY = 30.0
+
+
+# -----------------------------
+# requests / HTTP/1.1
+# -----------------------------
+class _TimedConnect:
+    """DNS + TCP connect time of a new connection -> Trace.connect."""
+
+    def _new_conn(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            trace = current_trace()
+            if trace is not None:
+                trace.connect += time.perf_counter() - t0
+
+
+class _TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    def connect(self) -> None:
+        # connect() = _new_conn() + TLS handshake
+        trace = current_trace()
+        t0 = time.perf_counter()
+        before = trace.connect if trace is not None else 0.0
+        super().connect()
+        if trace is not None:
+            trace.tls += max(0.0, time.perf_counter() - t0 - (trace.connect - before))
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class RequestsTransport:
+    """
+    - pool_connections: hosts per session whose connections are kept
+    - pool_maxsize: idle connections kept per host
+    - keep_alive: False sends "Connection: close" (one connection per request)
+    """
+
+    def __init__(
+        self,
+        *,
+        user_agent: str,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        keep_alive: bool = True,
+    ) -> None:
+        self.user_agent = user_agent
+        self.pool_connections = max(1, pool_connections)
+        self.pool_maxsize = max(1, pool_maxsize)
+        self.keep_alive = keep_alive
+        self._local = threading.local()
+        self._sessions: list[requests.Session] = []
+        self._lock = threading.Lock()
+
+    # requests.Session is not thread-safe, so each worker gets its own.
+    def session(self) -> requests.Session:
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            sess = self._local.session = self._new_session()
+            with self._lock:
+                self._sessions.append(sess)
+        return sess
+
+    def _new_session(self) -> requests.Session:
+        s = new_session(self.user_agent)
+        # pool_block=False: a full pool opens an extra connection rather
+        # than stalling the worker; the host throttle bounds the total
+        adapter = _TimedAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        if not self.keep_alive:
+            s.headers["Connection"] = "close"
+        return s
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for s in sessions:
+            s.close()
+
+
+# -----------------------------
+# httpx / HTTP/2
+# -----------------------------
+@contextmanager
+def _as_requests_errors() -> Iterator[None]:
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.Timeout(str(e)) from e
+    except httpx.DecodingError as e:
+        raise requests.exceptions.ContentDecodingError(str(e)) from e
+    except httpx.TransportError as e:
+        raise requests.ConnectionError(str(e)) from e
+
+
+def _trace_event(event: str, info: dict) -> None:
+    """httpx "trace" extension: connect_tcp / start_tls durations -> Trace."""
+    trace = current_trace()
+    if trace is None or not event.startswith("connection."):
+        return
+    name, _, stage = event[len("connection."):].rpartition(".")
+    if name not in ("connect_tcp", "start_tls"):
+        return
+    if stage == "started":
+        if trace._marks is None:
+            trace._marks = {}
+        trace._marks[name] = time.perf_counter()
+        return
+    t0 = (trace._marks or {}).pop(name, None)
+    if t0 is None:
+        return
+    if name == "connect_tcp":
+        trace.connect += time.perf_counter() - t0
+    else:
+        trace.tls += time.perf_counter() - t0
+
+
+class _Raw:
+    """r.raw.tell(): bytes read off the wire, before content decoding."""
+
+    def __init__(self, resp: httpx.Response) -> None:
+        self._resp = resp
+
+    def tell(self) -> int:
+        return self._resp.num_bytes_downloaded
+
+
+class H2Response:
+    def __init__(self, resp: httpx.Response, elapsed: float) -> None:
+        self._resp = resp
+        self.status_code = resp.status_code
+        self.headers = resp.headers  # case-insensitive, like requests'
+        self.url = str(resp.url)
+        self.reason = resp.reason_phrase
+        self.http_version = resp.http_version
+        self.elapsed = timedelta(seconds=elapsed)
+        self.raw = _Raw(resp)
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        with _as_requests_errors():
+            yield from self._resp.iter_bytes(chunk_size)
+
+    @property
+    def content(self) -> bytes:
+        with _as_requests_errors():
+            return self._resp.read()
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.HTTPError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}", response=self
+            )
+
+    def close(self) -> None:
+        self._resp.close()
+
+    def __enter__(self) -> H2Response:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class H2Session:
+    """The requests.Session.get() subset fetch.py needs, on a shared httpx.Client."""
+
+    def __init__(self, client: httpx.Client) -> None:
+        self.client = client
+
+    def get(
+        self,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        timeout: float = 30,
+        stream: bool = False,
+    ) -> H2Response:
+        t0 = time.perf_counter()
+        with _as_requests_errors():
+            req = self.client.build_request(
+                "GET", url, headers=headers, timeout=timeout, extensions={"trace": _trace_event}
+            )
+            resp = self.client.send(req, stream=True)
+        r = H2Response(resp, time.perf_counter() - t0)
+        if not stream:
+            try:
+                r.content
+            finally:
+                r.close()
+        return r
+
+
+class Http2Transport:
+    """
+    - max_connections: cap on open connections (all origins)
+    - keep_alive: False closes each connection once it is idle
+    - prior_knowledge: speak h2 without TLS/ALPN (h2c), e.g. to a local
+      stub server; http:// URLs then never fall back to HTTP/1.1
+    """
+
+    def __init__(
+        self,
+        *,
+        user_agent: str,
+        max_connections: int = 100,
+        keep_alive: bool = True,
+        prior_knowledge: bool = False,
+    ) -> None:
+        if _import_httpx() is None:
+            raise RuntimeError('the http2 transport needs httpx with HTTP/2 support: pip install "httpx[h2]"')
+        limits = httpx.Limits(
+            max_connections=max(1, max_connections),
+            max_keepalive_connections=max(1, max_connections) if keep_alive else 0,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        try:
+            self.client = httpx.Client(
+                http1=not prior_knowledge,
+                http2=True,
+                limits=limits,
+                headers={"User-Agent": user_agent},
+                follow_redirects=True,
+            )
+        except ImportError as e:  # httpx without the h2 extra
+            raise RuntimeError(f'the http2 transport needs httpx[h2]: {e}') from e
+        self._session = H2Session(self.client)
+
+    def session(self) -> H2Session:
+        return self._session
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def make_transport(
+    name: str,
+    *,
+    user_agent: str,
+    concurrency: int,
+    per_host: int,
+    keep_alive: bool = True,
+) -> RequestsTransport | Http2Transport:
+    """A transport sized for `concurrency` workers and `per_host` requests per host."""
+    if name == "requests":
+        return RequestsTransport(
+            user_agent=user_agent,
+            pool_maxsize=min(per_host, concurrency),
+            keep_alive=keep_alive,
+        )
+    if name == "http2":
+        return Http2Transport(user_agent=user_agent, max_connections=max(concurrency, 10), keep_alive=keep_alive)
+    raise ValueError(f"transport must be one of {', '.join(TRANSPORTS)}, not {name!r}")
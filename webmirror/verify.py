@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+
+"""
+Integrity check for a mirror tree, and targeted repair.
+
+What a file is checked against depends on what is known about it:
+
+  runtime map   every chunk a runtime.*.js names must exist; JS chunks must
+                be a complete JSONP `....push([[<id>],{...}]);` and CSS
+                chunks must end after a closing `}` (a cut-off download
+                almost never does)
+  journal       size and sha256 of the last real download (status OK) in
+                the .mirror-journal.jsonl of the mirror the file belongs to
+  file name     file-loader assets such as heroes.42c6bba.jpg carry the
+                first 7 hex digits of the md5 of their bytes
+  optimize      images recompressed by `optimize` are checked against the
+                result recorded in its .optimize-cache.json, and their
+                journal / name hash against the original they came from
+  any file      must not be empty
+
+Chunks whose hash is 31d6cfe0d16ae931b73c (md4 of nothing) are empty in the
+build: servers answer them with 404 or, behind an SPA fallback, with
+index.html. Such a chunk may be missing or empty, but not an HTML page, and
+--repair writes it as an empty file instead of asking the server again.
+
+The chunk names' 20-hex hashes are webpack [chunkhash]es of the module
+graph, not of the output bytes, so they cannot be recomputed here.
+
+Files are checked by a process pool. Hashing reads through mmap, so the
+workers spend their time inside hashlib (which drops the GIL and never
+copies the file into Python objects) rather than in a read loop.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlparse
+
+from .journal import JOURNAL_NAME
+from .fsutil import atomic_write_bytes
+from .mirror import Mirror, local_path_for
+from .optimize import CACHE_NAME as OPTIMIZE_CACHE_NAME, load_cache as load_optimize_cache
+from .runtime import ChunkId, guess_origin, normalize_public_path, parse_runtime
+from .snapshot import RUNTIME_NAME_RE, chunk_paths
+
+
+# [name].[hash:7].[ext] from file-loader / url-loader (md5 of the content);
+# .js/.css names carry chunk hashes instead
+NAME_HASH_RE = re.compile(r"\.([0-9a-f]{7,8})\.(?!js$|css$)\w+$")
+SOURCE_MAP_RE = re.compile(rb"\s*(?://[#@] sourceMappingURL=[^\n]*|/\*[#@] sourceMappingURL=.*?\*/)\s*$", re.S)
+JSONP_PUSH_RE = re.compile(rb"\.push\(\[\[\s*[\"']?([\w$.~-]+)[\"']?\s*[,\]]")
+CHUNK_HASH_RE = re.compile(r"\.([0-9a-f]{8,32})\.(?:js|css)$")
+
+# webpack's (md4) hash of empty content
+EMPTY_CHUNK_HASH = "31d6cfe0d16ae931b73c59d7e0c089c0"
+
+HEAD_BYTES = 512
+TAIL_BYTES = 4096
+
+
+@dataclass
+class Expect:
+    path: str
+    url: str = ""
+    size: int | None = None
+    sha256: str | None = None
+    kind: str = ""  # "js" / "css" for chunks named by a runtime map
+    cid: ChunkId | None = None
+    empty: bool = False  # chunk with EMPTY_CHUNK_HASH
+    optimized: dict | None = None  # .optimize-cache.json entry
+
+
+@dataclass
+class Problem:
+    expect: Expect
+    reason: str
+
+
+@dataclass
+class VerifyReport:
+    root: str
+    checked: int = 0
+    bytes_hashed: int = 0
+    seconds: float = 0.0
+    runtimes: list[str] = field(default_factory=list)
+    problems: list[Problem] = field(default_factory=list)
+    # name-hash convention: (files that match, files that do not)
+    name_hash: tuple[int, int] = (0, 0)
+
+
+# -----------------------------
+# Per-file check (runs in worker processes)
+# -----------------------------
+def _digests(f, size: int, names: list[str]) -> dict[str, str]:
+    hs = {n: hashlib.new(n) for n in names}
+    if size:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for h in hs.values():
+                h.update(m)
+    return {n: h.hexdigest() for n, h in hs.items()}
+
+
+def _structure(f, size: int, e: Expect) -> str:
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        head = m[:HEAD_BYTES]
+        tail = m[max(0, size - TAIL_BYTES):]
+    tail = SOURCE_MAP_RE.sub(b"", tail).rstrip()
+    if head.lstrip()[:14].lower().startswith((b"<!doctype", b"<html")):
+        what = "an empty chunk" if e.empty else ("a script" if e.kind == "js" else "a stylesheet")
+        return f"HTML page instead of {what} (server's SPA fallback?)"
+    if e.kind == "js":
+        pushed = JSONP_PUSH_RE.search(head)
+        if pushed is None:
+            return "not a webpack chunk (no .push([[id]...)"
+        if e.cid is not None and pushed.group(1).decode("ascii", "replace") != str(e.cid):
+            return f"chunk id {pushed.group(1).decode('ascii', 'replace')}, runtime says {e.cid}"
+        if not tail.endswith(b");"):
+            return "truncated (chunk does not end with `);`)"
+    elif e.kind == "css":
+        tail = re.sub(rb"/\*(?:(?!\*/).)*\*/\s*$", b"", tail, flags=re.S).rstrip()
+        if not tail.endswith(b"}"):
+            return "truncated (stylesheet does not end with `}`)"
+    return ""
+
+
+def check_file(e: Expect) -> tuple[str, bool | None, int]:
+    """(problem or "", name-hash match or None, bytes hashed) for one file."""
+    try:
+        f = open(e.path, "rb")
+    except FileNotFoundError:
+        return ("" if e.empty else "missing"), None, 0
+    except OSError as exc:
+        return f"unreadable: {exc}", None, 0
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return ("" if e.empty else "empty"), None, 0
+        opt = e.optimized
+        recompressed = opt is not None and size == opt.get("size")
+        if e.size is not None and size != e.size and not recompressed:
+            return f"size {size}, expected {e.size}", None, 0
+
+        m = NAME_HASH_RE.search(os.path.basename(e.path))
+        names = (["sha256"] if e.sha256 or recompressed else []) + (["md5"] if m else [])
+        digests = _digests(f, size, names)
+        md5 = digests.get("md5")
+        if recompressed and digests["sha256"] == opt.get("sha256"):
+            # optimize's output: what it started from must be the journalled download
+            if e.sha256 and opt.get("source_sha256") != e.sha256:
+                return "optimised from a different download", None, size * len(names)
+            md5 = opt.get("source_md5", md5)
+        elif e.sha256 and digests["sha256"] != e.sha256:
+            return "sha256 mismatch", None, size * len(names)
+        name_ok = md5.startswith(m.group(1)) if m else None
+
+        problem = _structure(f, size, e) if e.kind else ""
+        return problem, name_ok, size * len(names)
+
+
+# -----------------------------
+# Expectations
+# -----------------------------
+def _done_records(path: str) -> dict[str, dict]:
+    """{url: last record of a real download}; later SKIP/304 lines carry no size/hash."""
+    out: dict[str, dict] = {}
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except OSError:
+        return out
+    with f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict) and rec.get("state") == "done" and rec.get("status") == "OK":
+                out[rec["url"]] = rec
+    return out
+
+
+def _journal_path(out_root: str, url: str) -> str:
+    """Where a journalled URL lives: keep_host layout if that file / host folder exists."""
+    flat = local_path_for(out_root, url)
+    hosted = local_path_for(out_root, url, keep_host=True)
+    if os.path.exists(hosted) or (
+        not os.path.exists(flat) and os.path.isdir(os.path.join(out_root, urlparse(url).netloc))
+    ):
+        return hosted
+    return flat
+
+
+def _runtime_base(runtime_path: str, paths: dict[tuple[str, ChunkId], str], public_path: str, root: str) -> str:
+    """The folder chunk paths are relative to, e.g. jsb_web/jsb-wap for .../jsb-wap/static/js/runtime.*.js."""
+    here = os.path.dirname(runtime_path)
+    for (kind, _), rel in paths.items():
+        if kind == "js":
+            sub = os.path.dirname(rel)
+            if sub and here.replace(os.sep, "/").endswith("/" + sub.strip("/")):
+                return here[: len(here) - len(sub.strip("/"))].rstrip(os.sep)
+            break
+    return os.path.join(root, urlparse(public_path).path.lstrip("/"))
+
+
+def collect(root: str, *, origin: str = "") -> tuple[dict[str, Expect], list[str]]:
+    """({path: Expect} for every file under root plus every missing one we know of, runtimes)."""
+    expects: dict[str, Expect] = {}
+    runtimes: list[str] = []
+    urls: dict[str, str] = {}  # local path -> URL, from journals
+
+    def get(path: str) -> Expect:
+        path = os.path.normpath(path)
+        e = expects.get(path)
+        if e is None:
+            e = expects[path] = Expect(path)
+        return e
+
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            path = os.path.join(dirpath, name)
+            if name == JOURNAL_NAME:
+                for url, rec in _done_records(path).items():
+                    e = get(_journal_path(dirpath, url))
+                    e.url = url
+                    e.size = rec.get("size")
+                    e.sha256 = rec.get("sha256")
+                    urls[e.path] = url
+                continue
+            if name == OPTIMIZE_CACHE_NAME:
+                for rel, entry in load_optimize_cache(dirpath).items():
+                    img = os.path.join(dirpath, *rel.split("/"))
+                    if os.path.isfile(img):
+                        get(img).optimized = entry
+                continue
+            if name.startswith(".") or os.path.islink(path):
+                continue
+            get(path)
+            if RUNTIME_NAME_RE.search(name):
+                runtimes.append(path)
+
+    for rt in runtimes:
+        with open(rt, "r", encoding="utf-8", errors="replace") as f:
+            info = parse_runtime(f.read())
+        paths = chunk_paths(info)
+        pp = info.public_path or "/"
+        base = _runtime_base(rt, paths, pp, root)
+        rt_url = urls.get(os.path.normpath(rt), "")
+        site = origin or (guess_origin(rt_url) if rt_url else "")
+        for (kind, cid), rel in paths.items():
+            e = get(os.path.join(base, rel))
+            e.kind, e.cid = kind, cid
+            h = CHUNK_HASH_RE.search(rel)
+            e.empty = h is not None and EMPTY_CHUNK_HASH.startswith(h.group(1))
+            if not e.url and site:
+                prefix = pp if pp.startswith(("http://", "https://", "//")) else normalize_public_path(pp)
+                e.url = urljoin(site, prefix + rel)
+    return expects, runtimes
+
+
+# -----------------------------
+# Verify / repair
+# -----------------------------
+def verify_tree(root: str, *, origin: str = "", jobs: int | None = None) -> VerifyReport:
+    t0 = time.perf_counter()
+    expects, runtimes = collect(root, origin=origin)
+    report = VerifyReport(root, runtimes=runtimes)
+    _check(report, list(expects.values()), jobs=jobs)
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+def _check(report: VerifyReport, items: list[Expect], *, jobs: int | None) -> None:
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(items) < 64:
+        results = list(map(check_file, items))
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # multiprocessing only for large trees
+
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            results = list(ex.map(check_file, items, chunksize=max(1, len(items) // (jobs * 8))))
+
+    name_mismatch: list[Expect] = []
+    matched = 0
+    for e, (problem, name_ok, hashed) in zip(items, results):
+        report.checked += 1
+        report.bytes_hashed += hashed
+        if problem:
+            report.problems.append(Problem(e, problem))
+        elif name_ok is False:
+            name_mismatch.append(e)
+        elif name_ok:
+            matched += 1
+    report.name_hash = (matched, len(name_mismatch))
+    # only trust the md5-in-name convention when the tree actually follows it
+    if matched:
+        report.problems += [Problem(e, "content does not match the hash in its name") for e in name_mismatch]
+    report.problems.sort(key=lambda p: p.expect.path)
+
+
+def _mirror_root(path: str, url: str) -> tuple[str, bool] | None:
+    """(out_root, keep_host) that Mirror would use to put url at path."""
+    for keep_host in (True, False):
+        rel = local_path_for("", url, keep_host=keep_host)
+        if os.path.normpath(path).endswith(os.sep + os.path.normpath(rel)):
+            return os.path.normpath(path)[: -len(os.path.normpath(rel)) - 1], keep_host
+    return None
+
+
+def repair(
+    report: VerifyReport,
+    *,
+    user_agent: str,
+    concurrency: int = 4,
+    jobs: int | None = None,
+) -> VerifyReport:
+    """Re-download the broken files that have a known URL, then check them again."""
+    groups: dict[tuple[str, bool], list[Expect]] = {}
+    emptied = 0
+    for p in report.problems:
+        if p.expect.empty:
+            atomic_write_bytes(p.expect.path, b"")
+            emptied += 1
+            continue
+        where = _mirror_root(p.expect.path, p.expect.url) if p.expect.url else None
+        if where is None:
+            print(f"[!] No URL known for {p.expect.path}; not repaired")
+            continue
+        groups.setdefault(where, []).append(p.expect)
+
+    for (out_root, keep_host), items in sorted(groups.items()):
+        print(f"[+] Refetching {len(items)} files into {out_root}")
+        # force: a truncated chunk still has its content-hashed name;
+        # resume: append to the journal instead of starting a new one
+        mirror = Mirror(
+            out_root,
+            user_agent=user_agent,
+            concurrency=concurrency,
+            per_host=concurrency,
+            keep_host=keep_host,
+            force=True,
+            resume=True,
+            report_every=1,
+        )
+        mirror.run([e.url for e in items])
+        mirror.close()
+
+    if emptied:
+        print(f"[+] Emptied {emptied} chunks webpack built empty")
+
+    after = VerifyReport(report.root, runtimes=report.runtimes)
+    if groups or emptied:
+        t0 = time.perf_counter()
+        # re-read sizes / hashes the repair just journalled
+        fresh, _ = collect(report.root)
+        _check(after, [fresh.get(p.expect.path, p.expect) for p in report.problems], jobs=jobs)
+        after.seconds = time.perf_counter() - t0
+    else:
+        after.problems = list(report.problems)
+    return after
+
+
+def format_report(report: VerifyReport, *, limit: int = 50) -> str:
+    lines = [
+        f"{report.checked} files, {len(report.runtimes)} runtimes, "
+        f"{report.bytes_hashed / 1e6:.1f} MB hashed in {report.seconds:.2f}s; "
+        f"{len(report.problems)} problems"
+    ]
+    matched, mismatched = report.name_hash
+    if mismatched and not matched:
+        lines.append(f"    ({mismatched} names look hashed but do not follow the md5 convention; not checked)")
+    for p in report.problems[:limit]:
+        lines.append(f"  {p.reason}: {p.expect.path}")
+    if len(report.problems) > limit:
+        lines.append(f"  ... {len(report.problems) - limit} more")
+    return "\n".join(lines)